@@ -394,6 +394,9 @@ async function createDatabase() {
                 KEY idx_symbol (symbol),
                 KEY idx_position_id (position_id),
                 KEY idx_conta_id (conta_id),
+                KEY idx_created_at (created_at),
+                KEY idx_symbol_created_at (symbol, created_at),
+                KEY idx_checker_pending (divap_confirmado, cancelado_checker, id),
                 CONSTRAINT webhook_signals_ibfk_1 FOREIGN KEY (position_id) REFERENCES posicoes (id) ON DELETE SET NULL
             ) ENGINE=InnoDB AUTO_INCREMENT=303 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
         `);
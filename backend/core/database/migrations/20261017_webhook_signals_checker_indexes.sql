@@ -0,0 +1,16 @@
+-- Índices para as consultas do checker DIVAP (backend/indicators/analysis/divap_check.py)
+--
+--   idx_created_at         sinais por período (created_at >= ...) e get_unanalyzed_signals
+--                          (ORDER BY created_at DESC LIMIT, anti-join por divap_analysis.signal_id)
+--   idx_symbol_created_at  get_signals_by_date_symbol com símbolo (symbol = ? AND created_at em [dia, dia+1))
+--   idx_checker_pending    monitor em tempo real (divap_confirmado IS NULL AND cancelado_checker IS NULL
+--                          AND id > ? ORDER BY id) e o MIN(id) dos pendentes
+--
+-- Idempotente (MariaDB 10.6+): pode ser reaplicada sem erro.
+-- Uso: mysql -u <usuario> -p <banco> < 20261017_webhook_signals_checker_indexes.sql
+
+ALTER TABLE webhook_signals
+    ADD INDEX IF NOT EXISTS idx_created_at (created_at),
+    ADD INDEX IF NOT EXISTS idx_symbol_created_at (symbol, created_at),
+    ADD INDEX IF NOT EXISTS idx_checker_pending (divap_confirmado, cancelado_checker, id),
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,83 @@
+"""
+Cache em memória das contas ativas (tabela contas).
+
+O snapshot é recarregado quando fica mais velho que o TTL ou depois de
+invalidate(). Quem altera as contas em outro processo não tem como invalidar
+este cache, então o TTL é o limite de defasagem; invalidate() serve para quem
+detecta um snapshot desatualizado (ex.: um INSERT recusado). Se uma recarga
+falhar, o snapshot anterior continua sendo servido e a idade dele
+(staleness_seconds) segue crescendo.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class AccountSnapshotCache:
+    def __init__(self, loader: Callable[[], List[Dict]], ttl_seconds: float = 30.0):
+        """
+        Args:
+            loader: Função que consulta o banco e retorna as contas ativas
+            ttl_seconds: Idade máxima do snapshot antes de recarregar
+        """
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._accounts: Optional[List[Dict]] = None
+        self._loaded_at: Optional[float] = None
+        self._invalidated = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def invalidate(self) -> None:
+        """Força a recarga na próxima leitura."""
+        self._invalidated = True
+
+    def _is_fresh(self) -> bool:
+        return (self._accounts is not None and not self._invalidated
+                and time.monotonic() - self._loaded_at < self.ttl_seconds)
+
+    def get_accounts(self) -> List[Dict]:
+        """
+        Retorna as contas ativas do snapshot, recarregando se necessário.
+        Levanta a exceção do loader apenas se nunca houve um snapshot.
+        """
+        if self._is_fresh():
+            self.hits += 1
+            return self._accounts
+
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto esperávamos o lock
+            if self._is_fresh():
+                self.hits += 1
+                return self._accounts
+            try:
+                accounts = self._loader()
+            except Exception as e:
+                self.reload_errors += 1
+                if self._accounts is None:
+                    raise
+                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [CONTAS] ⚠️ Falha ao recarregar contas, usando snapshot de {self.staleness_seconds():.0f}s atrás: {e}")
+                return self._accounts
+            self._accounts = accounts
+            self._loaded_at = time.monotonic()
+            self._invalidated = False
+            self.reloads += 1
+            return accounts
+
+    def staleness_seconds(self) -> Optional[float]:
+        """Idade do snapshot em segundos (None se nunca foi carregado)."""
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def get_stats(self) -> Dict:
+        return {
+            "accounts": len(self._accounts) if self._accounts is not None else 0,
+            "staleness_seconds": self.staleness_seconds(),
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
@@ -0,0 +1,239 @@
+"""
+Benchmark das consultas do checker DIVAP antes e depois da migração de índices
+(backend/core/database/migrations/20261017_webhook_signals_checker_indexes.sql).
+
+Cria um banco separado (BENCH_DB_NAME, padrão 'starboy_bench') no mesmo
+servidor do .env, popula webhook_signals e divap_analysis com linhas
+sintéticas e mede a latência de cada consulta em três situações:
+
+    1. forma antiga das consultas, sem os índices novos
+    2. forma nova (predicados de intervalo / NOT EXISTS), sem os índices novos
+    3. forma nova, com os índices da migração
+
+Uso:
+    python bench_checker_queries.py --rows 2000000 --repeat 5
+    python bench_checker_queries.py --skip-seed      # reaproveita os dados já gerados
+"""
+import argparse
+import os
+import pathlib
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+
+env_path = pathlib.Path(__file__).parents[3] / 'config' / '.env'
+load_dotenv(dotenv_path=env_path)
+
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'starboy_bench')
+MIGRATION_PATH = (pathlib.Path(__file__).parents[3] / 'backend' / 'core' / 'database' / 'migrations'
+                  / '20261017_webhook_signals_checker_indexes.sql')
+MIGRATION_INDEXES = ('idx_created_at', 'idx_symbol_created_at', 'idx_checker_pending')
+
+SEED_BATCH_SIZE = 5000
+SEED_DAYS = 730            # Sinais espalhados pelos últimos 2 anos
+PENDING_RATIO = 0.001      # Fração de sinais ainda sem divap_confirmado/cancelado_checker
+UNANALYZED_RATIO = 0.002   # Fração de sinais sem linha em divap_analysis
+SYMBOLS = [f"SYM{i:03d}USDT" for i in range(200)]
+
+
+def connect(database=None):
+    config = {
+        "host": os.getenv('DB_HOST'),
+        "user": os.getenv('DB_USER'),
+        "password": os.getenv('DB_PASSWORD'),
+    }
+    if os.getenv('DB_PORT'):
+        config["port"] = int(os.getenv('DB_PORT'))
+    if database:
+        config["database"] = database
+    return mysql.connector.connect(**config)
+
+
+def create_schema(cursor):
+    # Mesmas colunas e índices de webhook_signals/divap_analysis usados pelo checker (createDb.js, sem os índices novos)
+    cursor.execute("DROP TABLE IF EXISTS divap_analysis")
+    cursor.execute("DROP TABLE IF EXISTS webhook_signals")
+    cursor.execute("""
+        CREATE TABLE webhook_signals (
+            id INT NOT NULL AUTO_INCREMENT,
+            symbol VARCHAR(50) NOT NULL,
+            timeframe VARCHAR(10) DEFAULT NULL,
+            side VARCHAR(10) NOT NULL,
+            status VARCHAR(50) NOT NULL DEFAULT 'PENDING',
+            position_id INT DEFAULT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            divap_confirmado TINYINT(1) DEFAULT NULL,
+            cancelado_checker TINYINT(1) DEFAULT NULL,
+            conta_id INT DEFAULT 1,
+            PRIMARY KEY (id),
+            KEY idx_status (status),
+            KEY idx_symbol (symbol),
+            KEY idx_position_id (position_id),
+            KEY idx_conta_id (conta_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+    cursor.execute("""
+        CREATE TABLE divap_analysis (
+            id INT NOT NULL AUTO_INCREMENT,
+            signal_id INT DEFAULT NULL,
+            divap_confirmed TINYINT(1) DEFAULT NULL,
+            analyzed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id),
+            UNIQUE KEY signal_id (signal_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+
+
+def seed(conn, rows):
+    cursor = conn.cursor()
+    create_schema(cursor)
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=SEED_DAYS)
+    step_seconds = SEED_DAYS * 86400 / rows
+    t0 = time.perf_counter()
+
+    for first in range(0, rows, SEED_BATCH_SIZE):
+        signals, analyses = [], []
+        for i in range(first, min(first + SEED_BATCH_SIZE, rows)):
+            pending = rng.random() < PENDING_RATIO
+            confirmed = None if pending else rng.randint(0, 1)
+            signals.append((
+                rng.choice(SYMBOLS), rng.choice(('15m', '1h', '4h')), rng.choice(('COMPRA', 'VENDA')),
+                start + timedelta(seconds=i * step_seconds), confirmed, None if pending else 1 - confirmed,
+            ))
+            if not pending and rng.random() >= UNANALYZED_RATIO:
+                analyses.append((i + 1, confirmed))  # ids do AUTO_INCREMENT começam em 1, na ordem de inserção
+        cursor.executemany("""
+            INSERT INTO webhook_signals (symbol, timeframe, side, created_at, divap_confirmado, cancelado_checker)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, signals)
+        if analyses:
+            cursor.executemany("INSERT INTO divap_analysis (signal_id, divap_confirmed) VALUES (%s, %s)", analyses)
+        conn.commit()
+        done = min(first + SEED_BATCH_SIZE, rows)
+        if done % (SEED_BATCH_SIZE * 40) == 0 or done == rows:
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BENCH] {done:,} / {rows:,} sinais ({time.perf_counter() - t0:.0f}s)")
+
+    cursor.execute("ANALYZE TABLE webhook_signals, divap_analysis")
+    cursor.fetchall()
+    cursor.close()
+
+
+def drop_migration_indexes(cursor):
+    for index in MIGRATION_INDEXES:
+        cursor.execute(f"ALTER TABLE webhook_signals DROP INDEX IF EXISTS {index}")
+
+
+def apply_migration(cursor):
+    sql = "\n".join(line for line in MIGRATION_PATH.read_text(encoding='utf-8').splitlines()
+                    if not line.lstrip().startswith('--'))
+    for statement in filter(None, (s.strip() for s in sql.split(';'))):
+        cursor.execute(statement)
+    cursor.execute("ANALYZE TABLE webhook_signals")
+    cursor.fetchall()
+
+
+def build_queries(cursor):
+    """Pares (forma antiga, forma nova) das consultas do checker, com parâmetros realistas."""
+    cursor.execute("SELECT MAX(created_at) FROM webhook_signals")
+    day = (cursor.fetchone()[0] - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+    cursor.execute("SELECT MIN(id) FROM webhook_signals WHERE divap_confirmado IS NULL AND cancelado_checker IS NULL")
+    watermark = (cursor.fetchone()[0] or 1) - 1
+    symbol = SYMBOLS[7]
+
+    return [
+        ("sinais do dia",
+         ("SELECT * FROM webhook_signals WHERE DATE(created_at) = %s ORDER BY created_at DESC", (day.date(),)),
+         ("SELECT * FROM webhook_signals WHERE created_at >= %s AND created_at < %s ORDER BY created_at DESC",
+          (day, day + timedelta(days=1)))),
+        ("sinais do dia + símbolo",
+         ("SELECT * FROM webhook_signals WHERE DATE(created_at) = %s AND symbol = %s ORDER BY created_at DESC",
+          (day.date(), symbol)),
+         ("SELECT * FROM webhook_signals WHERE created_at >= %s AND created_at < %s AND symbol = %s ORDER BY created_at DESC",
+          (day, day + timedelta(days=1), symbol))),
+        ("não analisados (LIMIT 100)",
+         ("""SELECT ws.* FROM webhook_signals ws LEFT JOIN divap_analysis da ON ws.id = da.signal_id
+             WHERE da.signal_id IS NULL ORDER BY ws.created_at DESC LIMIT 100""", ()),
+         ("""SELECT ws.* FROM webhook_signals ws
+             WHERE NOT EXISTS (SELECT 1 FROM divap_analysis da WHERE da.signal_id = ws.id)
+             ORDER BY ws.created_at DESC LIMIT 100""", ())),
+        ("últimos 7 dias (LIMIT 100)",
+         ("SELECT * FROM webhook_signals WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY) ORDER BY created_at DESC LIMIT 100", ()),
+         ("SELECT * FROM webhook_signals WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY) ORDER BY created_at DESC LIMIT 100", ())),
+        ("pendentes após marca d'água",
+         ("""SELECT id, symbol, timeframe, side, created_at FROM webhook_signals
+             WHERE id > %s AND divap_confirmado IS NULL AND cancelado_checker IS NULL ORDER BY id ASC LIMIT 100""", (watermark,)),
+         ("""SELECT id, symbol, timeframe, side, created_at FROM webhook_signals
+             WHERE id > %s AND divap_confirmado IS NULL AND cancelado_checker IS NULL ORDER BY id ASC LIMIT 100""", (watermark,))),
+        ("menor ID pendente",
+         ("SELECT MIN(id) FROM webhook_signals WHERE divap_confirmado IS NULL AND cancelado_checker IS NULL", ()),
+         ("SELECT MIN(id) FROM webhook_signals WHERE divap_confirmado IS NULL AND cancelado_checker IS NULL", ())),
+    ]
+
+
+def time_query(cursor, sql, params, repeat):
+    """Mediana em ms de repeat execuções (após uma execução de aquecimento) e o índice escolhido."""
+    cursor.execute("EXPLAIN " + sql, params)
+    key_column = cursor.column_names.index('key')
+    keys = sorted({str(row[key_column]) for row in cursor.fetchall() if row[key_column]})
+    cursor.execute(sql, params)
+    cursor.fetchall()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), ",".join(keys) or "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das consultas do checker DIVAP antes/depois dos índices")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Sinais sintéticos a gerar")
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções medidas por consulta")
+    parser.add_argument("--skip-seed", action="store_true", help="Reaproveita os dados já existentes no banco de benchmark")
+    args = parser.parse_args()
+
+    if BENCH_DB_NAME == os.getenv('DB_NAME'):
+        raise SystemExit("BENCH_DB_NAME não pode ser o banco de produção (DB_NAME)")
+
+    server = connect()
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS {BENCH_DB_NAME} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    server.close()
+
+    conn = connect(BENCH_DB_NAME)
+    if not args.skip_seed:
+        print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BENCH] Gerando {args.rows:,} sinais em '{BENCH_DB_NAME}'...")
+        seed(conn, args.rows)
+
+    cursor = conn.cursor()
+    queries = build_queries(cursor)
+
+    drop_migration_indexes(cursor)
+    results = {}
+    for name, (old_sql, old_params), (new_sql, new_params) in queries:
+        results[name] = [time_query(cursor, old_sql, old_params, args.repeat),
+                         time_query(cursor, new_sql, new_params, args.repeat)]
+
+    print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BENCH] Aplicando {MIGRATION_PATH.name}...")
+    apply_migration(cursor)
+    for name, _, (new_sql, new_params) in queries:
+        results[name].append(time_query(cursor, new_sql, new_params, args.repeat))
+
+    cursor.execute("SELECT COUNT(*) FROM webhook_signals")
+    total = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+
+    print(f"\n📊 Latência mediana ({args.repeat} execuções, {total:,} sinais)\n")
+    print(f"{'Consulta':<30} {'antiga s/ índ.':>15} {'nova s/ índ.':>13} {'nova c/ índ.':>13}  índice usado (nova c/ índ.)")
+    for name, ((old_ms, _), (new_ms, _), (idx_ms, idx_keys)) in results.items():
+        print(f"{name:<30} {old_ms:>12.1f} ms {new_ms:>10.1f} ms {idx_ms:>10.1f} ms  {idx_keys}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Armazenamento local de candles OHLCV em disco.
+
+Cada (símbolo, timeframe) é guardado como um arquivo .npy com uma matriz
+float64 de N x 6 colunas (timestamp em ms, open, high, low, close, volume),
+ordenada por timestamp e lida com memory-map. Um arquivo .json ao lado guarda
+o intervalo já consultado na exchange, de modo que apenas o início ou o fim
+que faltam sejam buscados novamente. Somente candles fechados são gravados, e
+o intervalo coberto só avança até o último candle de fato recebido: uma
+resposta curta ou vazia da exchange é buscada de novo na próxima chamada.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("DIVAP_CandleStore")
+
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+FETCH_PAGE_LIMIT = 1000  # Máximo de candles por chamada à exchange
+
+_TIMEFRAME_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def timeframe_to_ms(timeframe: str) -> Optional[int]:
+    """Converte um timeframe no formato da Binance (ex.: '15m', '4h') em milissegundos."""
+    match = re.fullmatch(r'(\d+)([mhdw])', timeframe or '')
+    if not match:
+        return None
+    return int(match.group(1)) * _TIMEFRAME_MS[match.group(2)]
+
+
+class CandleStore:
+    def __init__(self, base_dir: str, page_limit: int = FETCH_PAGE_LIMIT):
+        self.base_dir = Path(base_dir)
+        self.page_limit = page_limit
+        # Um lock por (símbolo, timeframe): buscas de pares diferentes correm em paralelo
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, symbol: str, timeframe: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, timeframe), threading.Lock())
+
+    def _paths(self, symbol: str, timeframe: str) -> Tuple[Path, Path]:
+        safe_symbol = re.sub(r'[^A-Za-z0-9]', '', symbol)
+        directory = self.base_dir / safe_symbol
+        return directory / f"{timeframe}.npy", directory / f"{timeframe}.json"
+
+    def load(self, symbol: str, timeframe: str) -> Optional[np.ndarray]:
+        """Retorna todos os candles gravados (memory-map somente leitura) ou None."""
+        data_path, _ = self._paths(symbol, timeframe)
+        if not data_path.exists():
+            return None
+        return np.load(data_path, mmap_mode='r')
+
+    def _load_coverage(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        _, meta_path = self._paths(symbol, timeframe)
+        if not meta_path.exists():
+            return None
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Metadados inválidos em {meta_path}, ignorando cache: {e}")
+            return None
+
+    def _save(self, symbol: str, timeframe: str, data: np.ndarray, coverage: Dict) -> None:
+        data_path, meta_path = self._paths(symbol, timeframe)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Grava em arquivo temporário e substitui, para nunca deixar um arquivo parcial
+        tmp_data = data_path.with_suffix('.tmp.npy')
+        np.save(tmp_data, data)
+        os.replace(tmp_data, data_path)
+
+        tmp_meta = meta_path.with_suffix('.tmp')
+        with open(tmp_meta, 'w') as f:
+            json.dump(coverage, f)
+        os.replace(tmp_meta, meta_path)
+
+    def get_range(self, symbol: str, timeframe: str, start_ms: int, end_ms: int) -> np.ndarray:
+        """
+        Retorna os candles gravados com start_ms <= timestamp < end_ms como uma
+        fatia (view) do memory-map, sem cópia.
+        """
+        data = self.load(symbol, timeframe)
+        if data is None:
+            return np.empty((0, len(COLUMNS)))
+        timestamps = data[:, 0]
+        lo = np.searchsorted(timestamps, start_ms, side='left')
+        hi = np.searchsorted(timestamps, end_ms, side='left')
+        return data[lo:hi]
+
+    def find_gaps(self, symbol: str, timeframe: str) -> List[Tuple[int, int]]:
+        """
+        Lista os buracos nos candles gravados como (último timestamp antes do
+        buraco, primeiro timestamp depois dele).
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        data = self.load(symbol, timeframe)
+        if data is None or tf_ms is None or len(data) < 2:
+            return []
+        timestamps = data[:, 0]
+        holes = np.flatnonzero(np.diff(timestamps) != tf_ms)
+        return [(int(timestamps[i]), int(timestamps[i + 1])) for i in holes]
+
+    def _fetch_from_exchange(self, exchange, symbol: str, timeframe: str, tf_ms: int,
+                             start_ms: int, end_ms: int) -> np.ndarray:
+        rows = []
+        since = start_ms
+        while since < end_ms:
+            candles = exchange.fetch_ohlcv(symbol=symbol, timeframe=timeframe, since=since, limit=self.page_limit)
+            candles = [c for c in candles or [] if since <= c[0] < end_ms]
+            if not candles:
+                break
+            rows.extend(candles)
+            since = int(candles[-1][0]) + tf_ms
+        if not rows:
+            return np.empty((0, len(COLUMNS)))
+        return np.asarray(rows, dtype=np.float64)
+
+    def get_candles(self, exchange, symbol: str, timeframe: str, start_ms: int, end_ms: int) -> np.ndarray:
+        """
+        Retorna os candles fechados com start_ms <= timestamp < end_ms, buscando
+        na exchange apenas o trecho anterior ou posterior ao já gravado.
+
+        Args:
+            exchange: Instância ccxt usada para completar o intervalo
+            timeframe: Timeframe no formato da Binance (ex.: '15m')
+
+        Returns:
+            Matriz N x 6 (ver COLUMNS), view do memory-map quando possível
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        if tf_ms is None:
+            raise ValueError(f"Timeframe não suportado pelo armazenamento de candles: {timeframe}")
+
+        # Candle só é gravado depois de fechado (abertura + duração <= agora)
+        now_ms = int(time.time() * 1000)
+        fetch_end = min(end_ms, now_ms - tf_ms + 1)
+
+        with self._lock_for(symbol, timeframe):
+            coverage = self._load_coverage(symbol, timeframe)
+            stored = self.load(symbol, timeframe)
+            if stored is None:
+                coverage = None
+
+            pieces = []
+            if coverage is None:
+                fetched = np.empty((0, len(COLUMNS)))
+                if start_ms < fetch_end:
+                    fetched = self._fetch_from_exchange(exchange, symbol, timeframe, tf_ms, start_ms, fetch_end)
+                    pieces.append(fetched)
+                # Cobertura vai só até o último candle recebido
+                new_coverage = {"start": start_ms, "end": int(fetched[-1, 0]) + tf_ms if len(fetched) else start_ms}
+            else:
+                new_coverage = dict(coverage)
+                if start_ms < coverage["start"]:
+                    head = self._fetch_from_exchange(exchange, symbol, timeframe, tf_ms,
+                                                     start_ms, coverage["start"])
+                    pieces.append(head)
+                    # Só estende o início se a busca chegou até o trecho já gravado
+                    if len(head) and int(head[-1, 0]) + tf_ms >= coverage["start"]:
+                        new_coverage["start"] = start_ms
+                if fetch_end > coverage["end"]:
+                    tail = self._fetch_from_exchange(exchange, symbol, timeframe, tf_ms,
+                                                     coverage["end"], fetch_end)
+                    pieces.append(tail)
+                    if len(tail):
+                        new_coverage["end"] = max(coverage["end"], int(tail[-1, 0]) + tf_ms)
+
+            if new_coverage != coverage or any(len(piece) for piece in pieces):
+                if stored is not None:
+                    pieces.append(np.asarray(stored))
+                merged = np.concatenate(pieces) if pieces else np.empty((0, len(COLUMNS)))
+                # Remove duplicados e ordena por timestamp
+                _, unique_idx = np.unique(merged[:, 0], return_index=True)
+                merged = merged[unique_idx]
+                self._save(symbol, timeframe, merged, new_coverage)
+
+                gaps = self.find_gaps(symbol, timeframe)
+                if gaps:
+                    logger.warning(f"{len(gaps)} buraco(s) nos candles gravados de {symbol} {timeframe} (primeiro após {gaps[0][0]})")
+
+        return self.get_range(symbol, timeframe, start_ms, end_ms)
@@ -2,17 +2,24 @@ import ccxt
 import pandas as pd
 import numpy as np
 import mysql.connector
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import vectorbt as vbt
 import logging
 import os
 import time
 import sys
+import threading
 import traceback
-from typing import Dict, Tuple, Union, List, Optional
+import concurrent.futures
+import multiprocessing.util
+import json
+from typing import Dict, Iterator, Tuple, Union, List, Optional
 from dotenv import load_dotenv
 import pathlib
 import re
+from indicator_engine import IndicatorEngine
+from candle_store import CandleStore, timeframe_to_ms
+from window_cache import OHLCVWindowCache
 
 # Configuração de logging
 logging.basicConfig(
@@ -58,18 +65,71 @@ BINANCE_CONFIG = {
     "enableRateLimit": True
 }
 
+# Diretório do armazenamento local de candles (vazio desativa o cache em disco)
+CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR', str(pathlib.Path(__file__).parents[1] / 'data' / 'candles'))
+
 # Parâmetros dos indicadores
 RSI_PERIODS = 14
 VOLUME_SMA_PERIODS = 20
 PIVOT_LEFT = 2  # Períodos à esquerda para determinar pivôs
+MAX_CATCH_UP_CANDLES = 100  # Candles máximos buscados para avançar o estado incremental
+OHLCV_CACHE_SIZE = 128  # Janelas OHLCV mantidas em memória (LRU)
+BATCH_WINDOW_CANDLES = 1000  # Tamanho máximo da janela buscada por lote em analyze_signals_batch
+
+# Monitoramento em tempo real
+REALTIME_POLL_MIN_INTERVAL = 0.25  # Segundos entre consultas logo após um sinal
+REALTIME_POLL_MAX_INTERVAL = 5.0  # Intervalo máximo quando não chegam sinais
+REALTIME_POLL_BACKOFF = 1.5  # Fator de aumento do intervalo a cada consulta vazia
+REALTIME_BATCH_SIZE = 100  # Sinais lidos por consulta
+REALTIME_SWEEP_INTERVAL = 300  # Segundos entre buscas de sinais pendentes abaixo da marca d'água
+REALTIME_SWEEP_MAX_ATTEMPTS = 5  # Varreduras em que um sinal pode seguir pendente antes de ser cancelado
+
+# Leitura paginada (keyset) para reanálises longas
+STREAM_PAGE_SIZE = 500  # Sinais por página processada
+STREAM_FETCH_SIZE = 100  # Linhas por fetchmany dentro de uma página
+CHECKPOINT_DIR = os.getenv('DIVAP_CHECKPOINT_DIR', str(pathlib.Path(__file__).parents[1] / 'data' / 'checkpoints'))
+
+def last_two_pivots(pivot_mask: np.ndarray, price: np.ndarray,
+                    rsi: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Para cada candle, retorna preço/RSI do último e do penúltimo pivô ocorridos
+    até ele (inclusive), propagados para frente. Antes do primeiro (ou segundo)
+    pivô os valores são NaN.
+
+    Returns:
+        (last_price, last_rsi, second_last_price, second_last_rsi)
+    """
+    pivot_idx = np.flatnonzero(pivot_mask)
+    # Posição (em pivot_idx) do último pivô visto em cada candle; -1 = nenhum
+    last_pos = np.cumsum(pivot_mask, dtype=np.int64) - 1
+    second_pos = np.where(last_pos >= 1, last_pos - 1, -1)
+
+    # Um NaN extra no fim permite indexar "sem pivô" com -1
+    pivot_price = np.append(price[pivot_idx], np.nan)
+    pivot_rsi = np.append(rsi[pivot_idx], np.nan)
+
+    return (pivot_price[last_pos], pivot_rsi[last_pos],
+            pivot_price[second_pos], pivot_rsi[second_pos])
 
 class DIVAPAnalyzer:
-    def __init__(self, db_config: Dict, binance_config: Dict):
+    def __init__(self, db_config: Dict, binance_config: Dict, thread_local_exchange: bool = False):
+        """
+        Args:
+            thread_local_exchange: Se True, cada thread usa sua própria instância ccxt
+                                   (criada no primeiro uso, com os mercados já carregados),
+                                   para analyze_signal ser chamado de várias threads
+        """
         self.db_config = db_config
         self.binance_config = binance_config
+        self.thread_local_exchange = thread_local_exchange
+        self._local = threading.local()
+        self._markets = None  # (markets, currencies) do load_markets de connect_exchange
         self.exchange = None
         self.conn = None
         self.cursor = None
+        self.indicator_engine = IndicatorEngine(RSI_PERIODS, VOLUME_SMA_PERIODS, PIVOT_LEFT)
+        self.candle_store = CandleStore(CANDLE_STORE_DIR) if CANDLE_STORE_DIR else None
+        self.ohlcv_cache = OHLCVWindowCache(OHLCV_CACHE_SIZE)
 
     def connect_db(self) -> None:
         try:
@@ -80,10 +140,30 @@ class DIVAPAnalyzer:
             logger.error(f"Erro ao conectar ao banco de dados: {e}")
             raise
 
+    @property
+    def exchange(self):
+        if not self.thread_local_exchange:
+            return self._exchange
+        exchange = getattr(self._local, "exchange", None)
+        if exchange is None and self._markets is not None:
+            # Instância da thread reaproveita os mercados em vez de chamar load_markets de novo
+            exchange = ccxt.binanceusdm(self.binance_config)
+            exchange.set_markets(*self._markets)
+            self._local.exchange = exchange
+        return exchange
+
+    @exchange.setter
+    def exchange(self, value) -> None:
+        if self.thread_local_exchange:
+            self._local.exchange = value
+        else:
+            self._exchange = value
+
     def connect_exchange(self) -> None:
         try:
             self.exchange = ccxt.binanceusdm(self.binance_config)
             self.exchange.load_markets()
+            self._markets = (self.exchange.markets, self.exchange.currencies)
             #logger.info("Conexão com a Binance estabelecida com sucesso")
         except Exception as e:
             logger.error(f"Erro ao conectar à Binance: {e}")
@@ -100,12 +180,13 @@ class DIVAPAnalyzer:
         try:
             # Converte a data de DD-MM-AAAA para AAAA-MM-DD para a consulta SQL
             date_obj = datetime.strptime(date_str, "%d-%m-%Y")
-            sql_date_str = date_obj.strftime("%Y-%m-%d")
             
-            query = "SELECT * FROM webhook_signals WHERE DATE(created_at) = %s"
-            params = [sql_date_str]
+            # Intervalo [dia, dia seguinte) em vez de DATE(created_at), para usar os índices de created_at
+            query = "SELECT * FROM webhook_signals WHERE created_at >= %s AND created_at < %s"
+            params = [date_obj, date_obj + timedelta(days=1)]
             
             if symbol:
+                # Com símbolo, usa idx_symbol_created_at (symbol, created_at)
                 query += " AND symbol = %s"
                 params.append(symbol)
                 
@@ -124,20 +205,40 @@ class DIVAPAnalyzer:
             raise
 
     def fetch_ohlcv_data(self, symbol: str, timeframe: str, since_dt: datetime, limit: int = 100) -> pd.DataFrame:
+        """
+        Candles a partir de since_dt. Datetimes sem fuso são tratados como UTC, a mesma
+        convenção do índice do DataFrame retornado (e de candle_times), independente
+        do fuso da máquina.
+        """
         try:
+            if since_dt.tzinfo is None:
+                since_dt = since_dt.replace(tzinfo=timezone.utc)
             since_ts = int(since_dt.timestamp() * 1000)
             normalized_timeframe = self._normalize_timeframe(timeframe)
             logger.info(f"Buscando dados OHLCV para {symbol} no timeframe {timeframe} (normalizado para {normalized_timeframe})")
             
-            candles = self.exchange.fetch_ohlcv(symbol=symbol, timeframe=normalized_timeframe, since=since_ts, limit=limit)
-            
-            if not candles:
-                logger.warning(f"Nenhum dado OHLCV encontrado para {symbol} no timeframe {timeframe}")
-                return pd.DataFrame()
-            
-            df = pd.DataFrame(candles, columns=["timestamp", "open", "high", "low", "close", "volume"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            df.set_index("timestamp", inplace=True)
+            tf_ms = timeframe_to_ms(normalized_timeframe)
+            if self.candle_store and tf_ms:
+                # Candles fechados vêm do disco; só o trecho que falta é buscado na Binance
+                candles = self.candle_store.get_candles(self.exchange, symbol, normalized_timeframe,
+                                                        since_ts, since_ts + limit * tf_ms)
+                if len(candles) == 0:
+                    logger.warning(f"Nenhum dado OHLCV encontrado para {symbol} no timeframe {timeframe}")
+                    return pd.DataFrame()
+
+                df = pd.DataFrame(candles[:, 1:], columns=["open", "high", "low", "close", "volume"],
+                                  index=pd.to_datetime(candles[:, 0].astype(np.int64), unit="ms"), copy=False)
+                df.index.name = "timestamp"
+            else:
+                candles = self.exchange.fetch_ohlcv(symbol=symbol, timeframe=normalized_timeframe, since=since_ts, limit=limit)
+
+                if not candles:
+                    logger.warning(f"Nenhum dado OHLCV encontrado para {symbol} no timeframe {timeframe}")
+                    return pd.DataFrame()
+
+                df = pd.DataFrame(candles, columns=["timestamp", "open", "high", "low", "close", "volume"])
+                df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+                df.set_index("timestamp", inplace=True)
             logger.info(f"Dados OHLCV obtidos: {len(df)} candles de {df.index[0]} a {df.index[-1]}")
             return df
         except Exception as e:
@@ -164,20 +265,24 @@ class DIVAPAnalyzer:
             (abs(df['body_size']) < 0.3 * df['candle_size'])
         )
             
-        bull_engulfing = pd.Series(False, index=df.index)
-        bear_engulfing = pd.Series(False, index=df.index)
-        
-        for i in range(1, len(df)):
-            prev = df.iloc[i-1]
-            curr = df.iloc[i]
-            if (prev['close'] < prev['open'] and curr['close'] > curr['open'] and
-                curr['open'] <= prev['close'] and curr['close'] >= prev['open']):
-                bull_engulfing.iloc[i] = True
-            
-            if (prev['close'] > prev['open'] and curr['close'] < curr['open'] and
-                curr['open'] >= prev['close'] and curr['close'] <= prev['open']):
-                bear_engulfing.iloc[i] = True
-        
+        # Engolfo calculado com arrays deslocados (candle anterior = posição i-1)
+        open_ = df['open'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+        prev_open = np.roll(open_, 1)
+        prev_close = np.roll(close, 1)
+
+        bull_engulfing = (
+            (prev_close < prev_open) & (close > open_) &
+            (open_ <= prev_close) & (close >= prev_open)
+        )
+        bear_engulfing = (
+            (prev_close > prev_open) & (close < open_) &
+            (open_ >= prev_close) & (close <= prev_open)
+        )
+        # O primeiro candle não possui anterior
+        bull_engulfing[:1] = False
+        bear_engulfing[:1] = False
+
         df['bull_engulfing'] = bull_engulfing
         df['bear_engulfing'] = bear_engulfing
         return df
@@ -195,39 +300,35 @@ class DIVAPAnalyzer:
         df['pivot_high'] = df["high"] == df["high"].rolling(window=window_pivot, min_periods=1).max()
         
         df = self.detect_candlestick_patterns(df)
-        
-        var_pivot_low_price_1 = pd.Series(np.nan, index=df.index)
-        var_pivot_low_rsi_1 = pd.Series(np.nan, index=df.index)
-        var_pivot_high_price_1 = pd.Series(np.nan, index=df.index)
-        var_pivot_high_rsi_1 = pd.Series(np.nan, index=df.index)
 
-        bull_div = pd.Series(False, index=df.index)
-        bear_div = pd.Series(False, index=df.index)
-        
-        last_low_pivot_price, last_low_pivot_rsi = np.nan, np.nan
-        second_last_low_pivot_price, second_last_low_pivot_rsi = np.nan, np.nan
-        last_high_pivot_price, last_high_pivot_rsi = np.nan, np.nan
-        second_last_high_pivot_price, second_last_high_pivot_rsi = np.nan, np.nan
+        rsi = df["RSI"].to_numpy(dtype=float)
+        last_low_price, last_low_rsi, second_low_price, second_low_rsi = last_two_pivots(
+            df["pivot_low"].to_numpy(dtype=bool), df["low"].to_numpy(dtype=float), rsi
+        )
+        last_high_price, last_high_rsi, second_high_price, second_high_rsi = last_two_pivots(
+            df["pivot_high"].to_numpy(dtype=bool), df["high"].to_numpy(dtype=float), rsi
+        )
 
-        for i in range(len(df)):
-            if df["pivot_low"].iloc[i]:
-                second_last_low_pivot_price, second_last_low_pivot_rsi = last_low_pivot_price, last_low_pivot_rsi
-                last_low_pivot_price, last_low_pivot_rsi = df["low"].iloc[i], df["RSI"].iloc[i]
-            
-            if df["pivot_high"].iloc[i]:
-                second_last_high_pivot_price, second_last_high_pivot_rsi = last_high_pivot_price, last_high_pivot_rsi
-                last_high_pivot_price, last_high_pivot_rsi = df["high"].iloc[i], df["RSI"].iloc[i]
+        # Último e penúltimo pivô (preço e RSI) vistos até cada candle
+        df['last_low_pivot_price'] = last_low_price
+        df['last_low_pivot_rsi'] = last_low_rsi
+        df['second_last_low_pivot_price'] = second_low_price
+        df['second_last_low_pivot_rsi'] = second_low_rsi
+        df['last_high_pivot_price'] = last_high_price
+        df['last_high_pivot_rsi'] = last_high_rsi
+        df['second_last_high_pivot_price'] = second_high_price
+        df['second_last_high_pivot_rsi'] = second_high_rsi
 
-            if not pd.isna(last_low_pivot_price) and not pd.isna(second_last_low_pivot_price):
-                if (last_low_pivot_price < second_last_low_pivot_price and 
-                    last_low_pivot_rsi > second_last_low_pivot_rsi):
-                    bull_div.iloc[i] = True
+        with np.errstate(invalid='ignore'):
+            bull_div = (
+                ~np.isnan(last_low_price) & ~np.isnan(second_low_price) &
+                (last_low_price < second_low_price) & (last_low_rsi > second_low_rsi)
+            )
+            bear_div = (
+                ~np.isnan(last_high_price) & ~np.isnan(second_high_price) &
+                (last_high_price > second_high_price) & (last_high_rsi < second_high_rsi)
+            )
 
-            if not pd.isna(last_high_pivot_price) and not pd.isna(second_last_high_pivot_price):
-                if (last_high_pivot_price > second_last_high_pivot_price and 
-                    last_high_pivot_rsi < second_last_high_pivot_rsi):
-                    bear_div.iloc[i] = True
-        
         df['bull_div'] = bull_div
         df['bear_div'] = bear_div
         
@@ -241,14 +342,7 @@ class DIVAPAnalyzer:
 
     def analyze_signal(self, signal: Dict) -> Dict:
         symbol = signal["symbol"]
-        
-        # Garantir que timeframe seja válido mesmo quando NULL ou vazio
-        timeframe = signal.get("timeframe")
-        if not timeframe or timeframe.strip() == "":
-            timeframe = "15m"  # Valor padrão quando vazio ou NULL
-            logger.warning(f"Sinal #{signal['id']} - {symbol} com timeframe vazio, usando padrão: {timeframe}")
-    
-        side = signal["side"]
+        timeframe = self._get_signal_timeframe(signal)
         created_at = signal["created_at"]
         
         symbol_formatted = self._format_symbol_for_binance(symbol)
@@ -256,25 +350,118 @@ class DIVAPAnalyzer:
         if not tf_minutes:
             return {"error": f"Timeframe inválido: {timeframe}"}
 
+        candle_times = self._get_signal_candle_times(created_at, timeframe, tf_minutes)
+
+        # Primeiro tenta o estado incremental; só monta o DataFrame completo se necessário
+        candles_data = self._get_candles_from_indicator_state(symbol_formatted, timeframe, tf_minutes, candle_times)
+
+        if candles_data is None:
+            # Sinais no mesmo candle (ex.: os dois grupos de origem) reutilizam a mesma janela
+            cache_key = (symbol_formatted, self._normalize_timeframe(timeframe), candle_times[0])
+            df = self.ohlcv_cache.get(cache_key)
+
+            if df is None:
+                required_candles = max(RSI_PERIODS, VOLUME_SMA_PERIODS) + PIVOT_LEFT + 30
+                since_dt = created_at - timedelta(minutes=tf_minutes * required_candles)
+
+                df = self.fetch_ohlcv_data(symbol_formatted, timeframe, since_dt, limit=500)
+                if df.empty:
+                    return {"error": f"Não foi possível obter dados para {symbol}"}
+
+                self._seed_indicator_state(symbol_formatted, timeframe, tf_minutes, df, candle_times[0])
+                df = self.calculate_indicators(df)
+                self.ohlcv_cache.put(cache_key, df, self._window_cache_expiry(candle_times[0], tf_minutes))
+
+            # Se existirem no DataFrame, vamos armazená-los
+            candles_data = [df.loc[ct] if ct in df.index else None for ct in candle_times]
+
+        return self._build_analysis_result(signal, timeframe, candle_times, candles_data)
+
+    def analyze_signals_batch(self, signals: List[Dict]) -> List[Dict]:
+        """
+        Analisa vários sinais agrupando-os por (símbolo, timeframe): cada grupo
+        busca uma única janela OHLCV que cobre todos os seus sinais e calcula os
+        indicadores uma vez; cada sinal é avaliado pelos candles n-1..n-3 da janela.
+
+        Args:
+            signals: Sinais no formato da tabela webhook_signals
+
+        Returns:
+            Lista de resultados na mesma ordem de signals (mesmo formato de analyze_signal)
+        """
+        results: List[Optional[Dict]] = [None] * len(signals)
+        groups: Dict[Tuple[str, str], List[Tuple[int, str, int, List[datetime]]]] = {}
+
+        for pos, signal in enumerate(signals):
+            timeframe = self._get_signal_timeframe(signal)
+            tf_minutes = self._get_timeframe_delta(timeframe)
+            if not tf_minutes:
+                results[pos] = {"error": f"Timeframe inválido: {timeframe}"}
+                continue
+            candle_times = self._get_signal_candle_times(signal["created_at"], timeframe, tf_minutes)
+            key = (self._format_symbol_for_binance(signal["symbol"]), self._normalize_timeframe(timeframe))
+            groups.setdefault(key, []).append((pos, timeframe, tf_minutes, candle_times))
+
         required_candles = max(RSI_PERIODS, VOLUME_SMA_PERIODS) + PIVOT_LEFT + 30
-        since_dt = created_at - timedelta(minutes=tf_minutes * required_candles)
-        
-        df = self.fetch_ohlcv_data(symbol_formatted, timeframe, since_dt, limit=500)
-        if df.empty:
-            return {"error": f"Não foi possível obter dados para {symbol}"}
-        
-        df = self.calculate_indicators(df)
+        for (symbol_formatted, normalized_timeframe), members in groups.items():
+            members.sort(key=lambda m: m[3][0])
+            tf_minutes = members[0][2]
 
+            # Divide o grupo em janelas de no máximo BATCH_WINDOW_CANDLES candles
+            chunks, current = [], []
+            for member in members:
+                if current:
+                    span = int((member[3][0] - current[0][3][0]) / timedelta(minutes=tf_minutes))
+                    if span + required_candles + 3 > BATCH_WINDOW_CANDLES:
+                        chunks.append(current)
+                        current = []
+                current.append(member)
+            if current:
+                chunks.append(current)
+
+            for chunk in chunks:
+                first_time, last_time = chunk[0][3][0], chunk[-1][3][0]
+                since_dt = first_time - timedelta(minutes=tf_minutes * required_candles)
+                limit = int((last_time - since_dt) / timedelta(minutes=tf_minutes)) + 3
+                logger.info(f"Lote {symbol_formatted} {normalized_timeframe}: {len(chunk)} sinais em uma janela de {limit} candles")
+
+                try:
+                    df = self.fetch_ohlcv_data(symbol_formatted, normalized_timeframe, since_dt, limit=limit)
+                    if not df.empty:
+                        df = self.calculate_indicators(df)
+                except Exception as e:
+                    for pos, *_ in chunk:
+                        results[pos] = {"error": f"Erro ao buscar dados do lote: {e}", "signal_id": signals[pos]["id"]}
+                    continue
+
+                for pos, timeframe, _, candle_times in chunk:
+                    if df.empty:
+                        results[pos] = {"error": f"Não foi possível obter dados para {signals[pos]['symbol']}"}
+                        continue
+                    candles_data = [df.loc[ct] if ct in df.index else None for ct in candle_times]
+                    results[pos] = self._build_analysis_result(signals[pos], timeframe, candle_times, candles_data)
+
+        return results
+
+    def _get_signal_timeframe(self, signal: Dict) -> str:
+        # Garantir que timeframe seja válido mesmo quando NULL ou vazio
+        timeframe = signal.get("timeframe")
+        if not timeframe or timeframe.strip() == "":
+            timeframe = "15m"  # Valor padrão quando vazio ou NULL
+            logger.warning(f"Sinal #{signal['id']} - {signal['symbol']} com timeframe vazio, usando padrão: {timeframe}")
+        return timeframe
+
+    def _get_signal_candle_times(self, created_at: datetime, timeframe: str, tf_minutes: int) -> List[datetime]:
         # Captura até 3 candles anteriores (n-1, n-2, n-3)
         candle_times = []
         candle_times.append(self._get_previous_candle_time(created_at, timeframe))  # Candle n-1
         candle_times.append(candle_times[-1] - timedelta(minutes=tf_minutes))       # Candle n-2
         candle_times.append(candle_times[-1] - timedelta(minutes=tf_minutes))       # Candle n-3
+        return candle_times
 
-        # Se existirem no DataFrame, vamos armazená-los
-        candles_data = []
-        for ct in candle_times:
-            candles_data.append(df.loc[ct] if ct in df.index else None)
+    def _build_analysis_result(self, signal: Dict, timeframe: str, candle_times: List[datetime],
+                               candles_data: List) -> Dict:
+        side = signal["side"]
 
         # Verifica se pelo menos um dos 3 candles teve Volume > Média
         high_volume_any = any(c is not None and c.get("high_volume", False) for c in candles_data)
@@ -292,10 +479,10 @@ class DIVAPAnalyzer:
         # Monta o dicionário de resultado
         result = {
             "signal_id": signal["id"],
-            "symbol": symbol,
+            "symbol": signal["symbol"],
             "timeframe": timeframe,
             "side": side,
-            "created_at": created_at,
+            "created_at": signal["created_at"],
             "candles_used": [t for t in candle_times],
             "is_bull_divap": is_bull_divap,
             "is_bear_divap": is_bear_divap,
@@ -316,6 +503,79 @@ class DIVAPAnalyzer:
         
         return result
 
+    def _get_candles_from_indicator_state(self, symbol: str, timeframe: str, tf_minutes: int,
+                                          candle_times: List[datetime]) -> Optional[List[Dict]]:
+        """
+        Obtém os candles n-1..n-3 do estado incremental, avançando-o apenas com os
+        candles fechados que faltam até o candle n-1.
+
+        Returns:
+            Lista de snapshots na ordem de candle_times, ou None se o estado não
+            cobre esses candles (sem estado, sinal antigo ou atraso grande demais)
+            ou se foi recomeçado por um gap e ainda não aqueceu.
+        """
+        normalized_timeframe = self._normalize_timeframe(timeframe)
+        state = self.indicator_engine.get_state(symbol, normalized_timeframe)
+        if state is None:
+            return None
+
+        target_time = candle_times[0]
+        if state.last_open_time < target_time:
+            missing = int((target_time - state.last_open_time) / timedelta(minutes=tf_minutes))
+            if missing > MAX_CATCH_UP_CANDLES:
+                return None
+
+            next_open = state.next_open_time()
+            df = self.fetch_ohlcv_data(symbol, timeframe, next_open, limit=missing + 1)
+            if df.empty or df.index[0] != next_open:
+                return None
+
+            for row in df.loc[:target_time].itertuples():
+                self.indicator_engine.update(symbol, normalized_timeframe, tf_minutes, row.Index.to_pydatetime(),
+                                             row.open, row.high, row.low, row.close, row.volume)
+            state = self.indicator_engine.get_state(symbol, normalized_timeframe)
+            if state is None or state.last_open_time != target_time:
+                return None
+
+        candles_data = [state.get(ct) for ct in candle_times]
+        if any(c is None for c in candles_data):
+            return None
+        # Estado recomeçado por um gap e ainda frio (RSI, média de volume ou pivôs
+        # incompletos): usa a janela completa, como calculate_indicators
+        if not all(state.is_warm(ct) for ct in candle_times):
+            return None
+
+        logger.info(f"Usando estado incremental de indicadores para {symbol} {normalized_timeframe} (último candle: {state.last_open_time})")
+        return candles_data
+
+    def _window_cache_expiry(self, last_closed_time: datetime, tf_minutes: int) -> float:
+        """
+        Epoch (segundos) em que a janela do candle last_closed_time deixa de valer:
+        o fechamento do candle seguinte. Janelas históricas, cujo candle seguinte
+        já fechou, valem por mais um timeframe.
+        """
+        tf_seconds = tf_minutes * 60
+        next_close = (last_closed_time + timedelta(minutes=2 * tf_minutes)).replace(tzinfo=timezone.utc).timestamp()
+        now = time.time()
+        return next_close if next_close > now else now + tf_seconds
+
+    def _seed_indicator_state(self, symbol: str, timeframe: str, tf_minutes: int,
+                              df: pd.DataFrame, last_closed_time: datetime) -> None:
+        """
+        Reconstrói o estado incremental a partir de um DataFrame OHLCV já buscado,
+        usando apenas candles fechados (até last_closed_time). Não retrocede um
+        estado que já esteja mais adiante.
+        """
+        normalized_timeframe = self._normalize_timeframe(timeframe)
+        state = self.indicator_engine.get_state(symbol, normalized_timeframe)
+        if state is not None and state.last_open_time >= last_closed_time:
+            return
+
+        closed_df = df.loc[:last_closed_time]
+        if closed_df.empty:
+            return
+        self.indicator_engine.seed(symbol, normalized_timeframe, tf_minutes, closed_df)
+
     def _get_timeframe_delta(self, timeframe: str) -> Optional[int]:
         if not timeframe: return None
         tf = timeframe.strip().lower()
@@ -588,10 +848,11 @@ class DIVAPAnalyzer:
             Lista de sinais não analisados
         """
         try:
+            # Percorre idx_created_at de trás para frente e para no LIMIT; cada
+            # sinal é testado pela chave única divap_analysis.signal_id
             query = """
                 SELECT ws.* FROM webhook_signals ws
-                LEFT JOIN divap_analysis da ON ws.id = da.signal_id
-                WHERE da.signal_id IS NULL
+                WHERE NOT EXISTS (SELECT 1 FROM divap_analysis da WHERE da.signal_id = ws.id)
                 ORDER BY ws.created_at DESC
                 LIMIT %s
             """
@@ -607,7 +868,86 @@ class DIVAPAnalyzer:
             logger.error(f"Erro ao buscar sinais não analisados: {e}")
             raise
 
-    def monitor_all_signals(self, period_days: int = None, limit: int = 100) -> Dict:
+    def iter_signals(self, where: str = "", params: Tuple = (), page_size: int = STREAM_PAGE_SIZE,
+                     after_key: Optional[Tuple[datetime, int]] = None) -> Iterator[List[Dict]]:
+        """
+        Percorre webhook_signals em páginas, do mais recente para o mais antigo.
+
+        Cada página continua da chave (created_at, id) do último sinal da página
+        anterior, em vez de OFFSET, então o custo por página é constante e a
+        leitura pode ser retomada de qualquer chave. Sinais com created_at nulo
+        não são percorridos.
+
+        Args:
+            where: Condição SQL adicional sobre ws (sem o WHERE)
+            params: Parâmetros da condição
+            page_size: Sinais por página
+            after_key: Retoma logo após esta chave (created_at, id)
+
+        Yields:
+            Listas de até page_size sinais
+        """
+        base_where = "ws.created_at IS NOT NULL" + (f" AND ({where})" if where else "")
+        while True:
+            query = f"SELECT ws.* FROM webhook_signals ws WHERE {base_where}"
+            query_params = list(params)
+            if after_key is not None:
+                # Forma expandida da comparação de tupla, que usa o índice de created_at
+                query += " AND (ws.created_at < %s OR (ws.created_at = %s AND ws.id < %s))"
+                query_params += [after_key[0], after_key[0], after_key[1]]
+            query += " ORDER BY ws.created_at DESC, ws.id DESC LIMIT %s"
+            query_params.append(page_size)
+
+            self.cursor.execute(query, tuple(query_params))
+            page = []
+            while True:
+                rows = self.cursor.fetchmany(STREAM_FETCH_SIZE)
+                if not rows:
+                    break
+                page.extend(rows)
+            if not page:
+                return
+            after_key = (page[-1]["created_at"], page[-1]["id"])
+            yield page
+            if len(page) < page_size:
+                return
+
+    def iter_unanalyzed_signals(self, page_size: int = STREAM_PAGE_SIZE,
+                                after_key: Optional[Tuple[datetime, int]] = None) -> Iterator[List[Dict]]:
+        """Versão paginada de get_unanalyzed_signals, sem limite de quantidade."""
+        return self.iter_signals("NOT EXISTS (SELECT 1 FROM divap_analysis da WHERE da.signal_id = ws.id)",
+                                 page_size=page_size, after_key=after_key)
+
+    def _load_checkpoint(self, name: str) -> Optional[Dict]:
+        path = pathlib.Path(CHECKPOINT_DIR) / f"{name}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            checkpoint["key"] = (datetime.fromisoformat(checkpoint["created_at"]), checkpoint["id"])
+            return checkpoint
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Checkpoint {path.name} ignorado: {e}")
+            return None
+
+    def _save_checkpoint(self, name: str, key: Tuple[datetime, int], results: Dict) -> None:
+        path = pathlib.Path(CHECKPOINT_DIR) / f"{name}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"created_at": key[0].isoformat(), "id": key[1], "results": results}, f)
+        os.replace(tmp_path, path)
+
+    def _clear_checkpoint(self, name: str) -> None:
+        try:
+            os.remove(pathlib.Path(CHECKPOINT_DIR) / f"{name}.json")
+        except FileNotFoundError:
+            pass
+
+    def monitor_all_signals(self, period_days: int = None, limit: int = 100, batch: bool = True,
+                            workers: int = 1, stream: bool = False, page_size: int = STREAM_PAGE_SIZE,
+                            checkpoint: Optional[str] = None) -> Dict:
         """
         Monitora e analisa múltiplos sinais, salvando os resultados.
         
@@ -615,10 +955,22 @@ class DIVAPAnalyzer:
             period_days: Se fornecido, analisa sinais dos últimos X dias. 
                          Se None, analisa sinais não analisados.
             limit: Número máximo de sinais a processar
+            batch: Se True, agrupa os sinais por símbolo/timeframe (analyze_signals_batch);
+                   se False, analisa um sinal por vez
+            workers: Número de processos; acima de 1 os símbolos são distribuídos
+                     entre processos, cada um com suas próprias conexões
+            stream: Se True, lê os sinais em páginas de page_size (iter_signals) em vez
+                    de carregar todos; limit=None percorre a tabela inteira
+            page_size: Sinais por página no modo stream
+            checkpoint: Nome do checkpoint (modo stream); a chave da última página
+                        processada é gravada após cada página e a execução seguinte
+                        com o mesmo nome continua dali. Removido ao terminar.
             
         Returns:
             Dicionário com estatísticas da análise
         """
+        if stream:
+            return self._monitor_signals_stream(period_days, limit, batch, workers, page_size, checkpoint)
         try:
             if period_days:
                 # Busca sinais dos últimos X dias
@@ -639,113 +991,230 @@ class DIVAPAnalyzer:
                 logger.info(f"Nenhum sinal {period_desc} encontrado para monitorar")
                 return {"total": 0, "success": 0, "error": 0, "divap_confirmed": 0}
             
-            results = {
-                "total": len(signals),
-                "success": 0,
-                "error": 0,
-                "divap_confirmed": 0,
-                "symbols": {}
-            }
-            
             logger.info(f"Monitorando {len(signals)} sinais {period_desc}...")
             
-            for i, signal in enumerate(signals):
-                symbol = signal['symbol']
-                if symbol not in results["symbols"]:
-                    results["symbols"][symbol] = {"total": 0, "confirmed": 0}
-                results["symbols"][symbol]["total"] += 1
-                
-                logger.info(f"Processando {i+1}/{len(signals)}: #{signal['id']} - {symbol} {signal.get('timeframe', 'N/A')} {signal['side']}")
-                
-                try:
-                    result = self.analyze_signal(signal)
-                    
-                    if "error" in result:
-                        results["error"] += 1
-                        logger.error(f"Erro: {result['error']}")
-                    else:
-                        results["success"] += 1
-                        self.save_analysis_result(result)
-                        
-                        if result.get("divap_confirmed", False):
-                            results["divap_confirmed"] += 1
-                            results["symbols"][symbol]["confirmed"] += 1
-                            logger.info(f"DIVAP confirmado: {result.get('message', '')}")
-                        else:
-                            logger.info(f"DIVAP não confirmado: {result.get('message', '')}")
-                    
-                except Exception as e:
-                    logger.error(f"Erro ao processar sinal #{signal['id']}: {e}")
-                    results["error"] += 1
+            if workers > 1 and len({s['symbol'] for s in signals}) > 1:
+                return self._process_signals_parallel(signals, batch, workers)
+            
+            results = self._process_signals(signals, batch)
             
+            cache_stats = self.ohlcv_cache.get_stats()
+            logger.info(f"Cache OHLCV: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas, {cache_stats['entries']} janelas em memória")
             return results
         
         except Exception as e:
             logger.error(f"Erro no monitoramento de sinais: {e}")
             raise
 
+    def _monitor_signals_stream(self, period_days: Optional[int], limit: Optional[int], batch: bool,
+                                workers: int, page_size: int, checkpoint: Optional[str]) -> Dict:
+        """monitor_all_signals página a página, em memória constante e retomável."""
+        results = {"total": 0, "success": 0, "error": 0, "divap_confirmed": 0, "symbols": {}}
+        after_key = None
+        if checkpoint:
+            saved = self._load_checkpoint(checkpoint)
+            if saved:
+                after_key = saved["key"]
+                results = saved.get("results", results)
+                logger.info(f"Retomando '{checkpoint}' após sinal #{after_key[1]} ({after_key[0]}), {results['total']} já processados")
+
+        if period_days:
+            pages = self.iter_signals("ws.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)", (period_days,),
+                                      page_size=page_size, after_key=after_key)
+            period_desc = f"dos últimos {period_days} dias"
+        else:
+            pages = self.iter_unanalyzed_signals(page_size=page_size, after_key=after_key)
+            period_desc = "não analisados"
+
+        # Um único pool de processos para todas as páginas: cada processo conecta ao
+        # banco e carrega os mercados uma vez por execução, não uma vez por página
+        executor = None
+        try:
+            processed = 0
+            for page in pages:
+                if limit is not None:
+                    page = page[:limit - processed]
+                if not page:
+                    break
+                logger.info(f"Página de {len(page)} sinais {period_desc} (até #{page[-1]['id']}, {page[-1]['created_at']})")
+
+                if workers > 1 and len({s['symbol'] for s in page}) > 1:
+                    if executor is None:
+                        executor = self._create_monitor_executor(workers)
+                    partial = self._process_signals_parallel(page, batch, workers, executor=executor)
+                else:
+                    partial = self._process_signals(page, batch)
+                _merge_stats(results, partial)
+                processed += len(page)
+
+                if checkpoint:
+                    self._save_checkpoint(checkpoint, (page[-1]["created_at"], page[-1]["id"]), results)
+                if limit is not None and processed >= limit:
+                    break
+
+            if checkpoint and (limit is None or processed < limit):
+                # Percorreu até o fim: a próxima execução começa do zero
+                self._clear_checkpoint(checkpoint)
+
+            logger.info(f"Monitoramento paginado concluído: {results['total']} sinais, {results['success']} sucesso, {results['error']} erros, {results['divap_confirmed']} DIVAP confirmados")
+            return results
+
+        except Exception as e:
+            logger.error(f"Erro no monitoramento paginado de sinais: {e}")
+            raise
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    def _process_signals(self, signals: List[Dict], batch: bool = True) -> Dict:
+        """Analisa e salva os sinais, retornando as estatísticas no formato de monitor_all_signals."""
+        results = {
+            "total": len(signals),
+            "success": 0,
+            "error": 0,
+            "divap_confirmed": 0,
+            "symbols": {}
+        }
+        
+        batch_results = None
+        if batch:
+            try:
+                batch_results = self.analyze_signals_batch(signals)
+            except Exception as e:
+                logger.error(f"Erro na análise em lote, analisando sinal a sinal: {e}")
+        
+        for i, signal in enumerate(signals):
+            symbol = signal['symbol']
+            if symbol not in results["symbols"]:
+                results["symbols"][symbol] = {"total": 0, "confirmed": 0}
+            results["symbols"][symbol]["total"] += 1
+            
+            logger.info(f"Processando {i+1}/{len(signals)}: #{signal['id']} - {symbol} {signal.get('timeframe', 'N/A')} {signal['side']}")
+            
+            try:
+                result = batch_results[i] if batch_results is not None else self.analyze_signal(signal)
+                
+                if "error" in result:
+                    results["error"] += 1
+                    logger.error(f"Erro: {result['error']}")
+                else:
+                    results["success"] += 1
+                    self.save_analysis_result(result)
+                    
+                    if result.get("divap_confirmed", False):
+                        results["divap_confirmed"] += 1
+                        results["symbols"][symbol]["confirmed"] += 1
+                        logger.info(f"DIVAP confirmado: {result.get('message', '')}")
+                    else:
+                        logger.info(f"DIVAP não confirmado: {result.get('message', '')}")
+                
+            except Exception as e:
+                logger.error(f"Erro ao processar sinal #{signal['id']}: {e}")
+                results["error"] += 1
+        
+        return results
+
+    def _create_monitor_executor(self, workers: int) -> concurrent.futures.ProcessPoolExecutor:
+        """Pool de processos para _process_signals_parallel, cada um com seu próprio DIVAPAnalyzer."""
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_monitor_worker,
+            initargs=(self.db_config, self.binance_config))
+
+    def _process_signals_parallel(self, signals: List[Dict], batch: bool, workers: int,
+                                  executor: Optional[concurrent.futures.ProcessPoolExecutor] = None) -> Dict:
+        """
+        Distribui os sinais por símbolo entre processos. Cada símbolo é tratado
+        inteiro por um único processo, que mantém seu próprio DIVAPAnalyzer
+        (banco, exchange e armazenamento de candles), e as estatísticas são somadas.
+
+        Args:
+            executor: Pool criado por _create_monitor_executor para reaproveitar entre
+                      chamadas; se None, um pool é criado e encerrado nesta chamada
+        """
+        by_symbol: Dict[str, List[Dict]] = {}
+        for signal in signals:
+            by_symbol.setdefault(signal['symbol'], []).append(signal)
+
+        own_executor = executor is None
+        if own_executor:
+            workers = min(workers, len(by_symbol))
+            executor = self._create_monitor_executor(workers)
+        logger.info(f"Distribuindo {len(by_symbol)} símbolos entre {workers} processos")
+
+        results = {"total": 0, "success": 0, "error": 0, "divap_confirmed": 0, "symbols": {}}
+        try:
+            # Símbolos com mais sinais primeiro, para equilibrar a carga no fim
+            futures = {
+                executor.submit(_process_symbol_signals, symbol_signals, batch): symbol
+                for symbol, symbol_signals in sorted(by_symbol.items(), key=lambda item: -len(item[1]))
+            }
+            for future in concurrent.futures.as_completed(futures):
+                symbol = futures[future]
+                symbol_signals = by_symbol[symbol]
+                try:
+                    partial = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao processar sinais de {symbol} em paralelo: {e}")
+                    partial = {"total": len(symbol_signals), "success": 0, "error": len(symbol_signals),
+                               "divap_confirmed": 0, "symbols": {symbol: {"total": len(symbol_signals), "confirmed": 0}}}
+
+                _merge_stats(results, partial)
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+
+        logger.info(f"Processamento paralelo concluído: {results['success']} sucesso, {results['error']} erros, {results['divap_confirmed']} DIVAP confirmados")
+        return results
+
     def monitor_signals_realtime(self):
         """
         Monitora a tabela webhook_signals em tempo real.
         Processa apenas sinais com divap_confirmado=NULL e cancelado_checker=NULL,
         realizando análise e salvando o resultado.
+
+        Usa o último ID lido como marca d'água (id > último visto), com uma única
+        consulta por ciclo. Sem sinais novos, o intervalo entre consultas cresce
+        até REALTIME_POLL_MAX_INTERVAL; ao encontrar sinais, consulta de novo na hora.
+        A cada REALTIME_SWEEP_INTERVAL, _sweep_pending_signals revisita os pendentes
+        abaixo da marca d'água.
+        """
+        # Faixa de idx_checker_pending (divap_confirmado, cancelado_checker, id)
+        pending_query = """
+            SELECT id, symbol, timeframe, side, created_at
+            FROM webhook_signals
+            WHERE id > %s
+            AND divap_confirmado IS NULL
+            AND cancelado_checker IS NULL
+            ORDER BY id ASC
+            LIMIT %s
         """
         try:
-            # Verificar quantos sinais existem no total na tabela
-            self.cursor.execute("SELECT COUNT(*) AS total_signals FROM webhook_signals")
-            total_signals_row = self.cursor.fetchone()
-            total_signals = total_signals_row["total_signals"] or 0
-            
-            # Verificar quantos sinais pendentes existem
+            # Marca d'água inicial: logo antes do sinal pendente mais antigo ou, sem pendentes, o maior ID
             self.cursor.execute("""
-                SELECT COUNT(*) AS total_pending 
-                FROM webhook_signals 
-                WHERE divap_confirmado IS NULL 
-                AND cancelado_checker IS NULL
+                SELECT
+                    (SELECT MIN(id) FROM webhook_signals
+                     WHERE divap_confirmado IS NULL AND cancelado_checker IS NULL) AS min_pending_id,
+                    (SELECT MAX(id) FROM webhook_signals) AS max_id
             """)
-            pending_count_row = self.cursor.fetchone()
-            total_pending = pending_count_row["total_pending"] or 0
-            
-            # Obter o ID mais recente no banco para referência
-            self.cursor.execute("SELECT MAX(id) AS max_id FROM webhook_signals")
-            max_id_row = self.cursor.fetchone()
-            max_id = max_id_row["max_id"] or 0
-            
-            # Próximo ID esperado seria max_id + 1
-            next_expected_id = max_id + 1
-            
-            # Obter o menor ID de sinal não processado (se existir)
-            next_id_to_process = None
-            if total_pending > 0:
-                self.cursor.execute("""
-                    SELECT MIN(id) AS min_id 
-                    FROM webhook_signals 
-                    WHERE divap_confirmado IS NULL 
-                    AND cancelado_checker IS NULL
-                """)
-                row = self.cursor.fetchone()
-                next_id_to_process = row["min_id"]
-                last_processed_id = next_id_to_process - 1
-            else:
-                # Se não houver sinais pendentes, o último processado é o máximo atual
-                last_processed_id = max_id
-            
-            if total_pending > 0:
-                logger.info(f"Sinais pendentes: {total_pending}")
-                logger.info(f"Próximo sinal a ser processado: ID {next_id_to_process}")
+            row = self.cursor.fetchone()
+            if row["min_pending_id"] is not None:
+                last_seen_id = row["min_pending_id"] - 1
+                logger.info(f"Próximo sinal a ser processado: ID {row['min_pending_id']}")
             else:
+                last_seen_id = row["max_id"] or 0
                 logger.info(f"Nenhum sinal pendente encontrado")
-                #logger.info(f"Todos os {total_signals} sinais existentes já foram processados")
             
-            #logger.info(f"Maior ID atual no banco: {max_id}")
-            logger.info(f"Aguardando novos sinais (Próximo ID: {next_expected_id})...")
+            logger.info(f"Aguardando novos sinais (Próximo ID: {last_seen_id + 1})...")
 
             # Log detalhado da situação atual
             logger.info(f"Monitoramento iniciado...")
-            #logger.info(f"Total de sinais na tabela: {total_signals}")
             
+            poll_interval = REALTIME_POLL_MIN_INTERVAL
             last_check_had_signals = False
             last_status_time = datetime.now()
+            last_sweep_time = datetime.now()
+            sweep_attempts: Dict[int, int] = {}  # Varreduras em que cada sinal apareceu pendente
             
             while True:
                 # Verificar conexão a cada iteração
@@ -753,101 +1222,37 @@ class DIVAPAnalyzer:
                     logger.warning("[ALERTA] Conexão perdida, reconectando...")
                     self.connect_db()
                 
-                # Buscar apenas sinais não processados (com ambos campos NULL)
-                self.cursor.execute("""
-                    SELECT * FROM webhook_signals 
-                    WHERE divap_confirmado IS NULL 
-                    AND cancelado_checker IS NULL
-                    ORDER BY id ASC
-                """)
+                # Sinais com ID menor que a marca d'água cujo INSERT foi confirmado atrasado
+                # ou cuja análise falhou
+                if (datetime.now() - last_sweep_time).total_seconds() >= REALTIME_SWEEP_INTERVAL:
+                    last_sweep_time = datetime.now()
+                    sweep_attempts = self._sweep_pending_signals(last_seen_id, sweep_attempts)
+                
+                self.cursor.execute(pending_query, (last_seen_id, REALTIME_BATCH_SIZE))
                 new_signals = self.cursor.fetchall()
                 
                 # Só mostra mensagens se encontrou sinais
                 if new_signals:
                     logger.info(f"Encontrados {len(new_signals)} sinais não processados!")
-                    
-                    # Processa os sinais
-                    for signal in new_signals:
-                        logger.info(f"Processando sinal #{signal['id']} - {signal['symbol']} {signal.get('timeframe', 'N/A')} {signal['side']}")
-                        result = self.analyze_signal(signal)
-                        self.save_analysis_result(result)
-                        last_processed_id = signal["id"]
+                    self._process_realtime_signals(new_signals)
+                    last_seen_id = new_signals[-1]["id"]
                     
                     last_check_had_signals = True
                     last_status_time = datetime.now()
-                    
-                    # Após processar todos, verificar quantos ainda estão pendentes
-                    self.cursor.execute("""
-                        SELECT COUNT(*) AS remaining_pending 
-                        FROM webhook_signals 
-                        WHERE divap_confirmado IS NULL 
-                        AND cancelado_checker IS NULL
-                    """)
-                    remaining_row = self.cursor.fetchone()
-                    remaining = remaining_row["remaining_pending"] or 0
-                    
-                    if remaining > 0:
-                        self.cursor.execute("""
-                            SELECT MIN(id) AS next_id 
-                            FROM webhook_signals 
-                            WHERE divap_confirmado IS NULL 
-                            AND cancelado_checker IS NULL
-                        """)
-                        next_row = self.cursor.fetchone()
-                        next_id = next_row["next_id"]
-                        logger.info(f"Restam {remaining} sinais pendentes. Próximo ID a ser processado: {next_id}")
-                    else:
-                        # Atualizar o total de sinais e o próximo esperado
-                        self.cursor.execute("SELECT COUNT(*) AS total_signals FROM webhook_signals")
-                        current_total_row = self.cursor.fetchone()
-                        current_total = current_total_row["total_signals"] or 0
-                        
-                        self.cursor.execute("SELECT MAX(id) AS current_max FROM webhook_signals")
-                        current_max_row = self.cursor.fetchone()
-                        current_max = current_max_row["current_max"] or 0
-                        
-                        next_expected = current_max + 1
-                        logger.info(f"Todos os {current_total} sinais foram processados! Aguardando novo sinal (próximo ID esperado: {next_expected})")
-            
+                    poll_interval = REALTIME_POLL_MIN_INTERVAL
+                    # Consulta de novo imediatamente: pode haver mais sinais na fila
+                    continue
+                
                 # Mostrar mensagem apenas se mudou de estado ou se passou tempo suficiente
-                elif last_check_had_signals or (datetime.now() - last_status_time).total_seconds() >= 1800:  # 30 minutos
-                    # Verificar se há algum novo sinal pendente
-                    self.cursor.execute("""
-                        SELECT COUNT(*) AS current_pending 
-                        FROM webhook_signals 
-                        WHERE divap_confirmado IS NULL 
-                        AND cancelado_checker IS NULL
-                    """)
-                    current_row = self.cursor.fetchone()
-                    current_pending = current_row["current_pending"] or 0
-                    
-                    # Obter total atualizado e próximo ID esperado
-                    self.cursor.execute("SELECT COUNT(*) AS total_signals FROM webhook_signals")
-                    current_total_row = self.cursor.fetchone()
-                    current_total = current_total_row["total_signals"] or 0
-                    
-                    self.cursor.execute("SELECT MAX(id) AS current_max FROM webhook_signals")
-                    current_max_row = self.cursor.fetchone()
-                    current_max = current_max_row["current_max"] or 0
-                    
-                    next_expected = current_max + 1
-                    
-                    if current_pending > 0:
-                        self.cursor.execute("""
-                            SELECT MIN(id) AS next_id 
-                            FROM webhook_signals 
-                            WHERE divap_confirmado IS NULL 
-                            AND cancelado_checker IS NULL
-                        """)
-                        next_row = self.cursor.fetchone()
-                        next_id = next_row["next_id"]
-                        logger.info(f"Existem {current_pending} sinais pendentes de {current_total} total. Próximo ID a ser processado: {next_id}")
-                    else:
-                        logger.info(f"Nenhum sinal pendente encontrado. Total de sinais: {current_total}, Último ID: {current_max}")
-                        logger.info(f"Aguardando novos sinais (próximo ID esperado: {next_expected})...")
+                if last_check_had_signals or (datetime.now() - last_status_time).total_seconds() >= 1800:  # 30 minutos
+                    logger.info(f"Nenhum sinal pendente encontrado. Último ID processado: {last_seen_id}")
+                    logger.info(f"Aguardando novos sinais (próximo ID esperado: {last_seen_id + 1})...")
+                    last_check_had_signals = False
+                    last_status_time = datetime.now()
                 
-                # Importante: pausa entre verificações
-                time.sleep(2)
+                # Pausa entre verificações, crescendo enquanto não chegam sinais
+                time.sleep(poll_interval)
+                poll_interval = min(poll_interval * REALTIME_POLL_BACKOFF, REALTIME_POLL_MAX_INTERVAL)
     
         except KeyboardInterrupt:
             logger.info("\nMonitoramento interrompido pelo usuário.")
@@ -855,7 +1260,86 @@ class DIVAPAnalyzer:
         except Exception as e:
             logger.error(f"Erro no monitoramento em tempo real: {e}")
             traceback.print_exc()
+
+    def _sweep_pending_signals(self, last_seen_id: int, attempts: Dict[int, int]) -> Dict[int, int]:
+        """
+        Percorre, em páginas por id, os sinais pendentes com id <= last_seen_id e os
+        processa. Um sinal que segue pendente após REALTIME_SWEEP_MAX_ATTEMPTS
+        varreduras é cancelado com erro em vez de ser tentado para sempre.
+
+        Returns:
+            Contagem de varreduras por sinal ainda pendente (para a próxima chamada)
+        """
+        sweep_query = """
+            SELECT id, symbol, timeframe, side, created_at
+            FROM webhook_signals
+            WHERE id > %s AND id <= %s
+            AND divap_confirmado IS NULL
+            AND cancelado_checker IS NULL
+            ORDER BY id ASC
+            LIMIT %s
+        """
+        still_pending: Dict[int, int] = {}
+        after_id = 0
+        while True:
+            self.cursor.execute(sweep_query, (after_id, last_seen_id, REALTIME_BATCH_SIZE))
+            page = self.cursor.fetchall()
+            if not page:
+                break
+            after_id = page[-1]["id"]
+
+            retry, exhausted = [], []
+            for signal in page:
+                count = attempts.get(signal["id"], 0) + 1
+                still_pending[signal["id"]] = count
+                (exhausted if count > REALTIME_SWEEP_MAX_ATTEMPTS else retry).append(signal)
+
+            if retry:
+                logger.warning(f"Encontrados {len(retry)} sinais pendentes abaixo do ID {last_seen_id + 1} (até #{after_id})")
+                self._process_realtime_signals(retry)
+            for signal in exhausted:
+                # Mesmo caminho de um erro de análise: divap_confirmado=0, cancelado_checker=1, status CANCELED
+                self.save_analysis_result({
+                    "signal_id": signal["id"],
+                    "error": f"Sinal continuou pendente após {REALTIME_SWEEP_MAX_ATTEMPTS} tentativas do checker"
+                })
+
+            if len(page) < REALTIME_BATCH_SIZE:
+                break
+        return still_pending
+
+    def _process_realtime_signals(self, signals: List[Dict]) -> None:
+        for signal in signals:
+            logger.info(f"Processando sinal #{signal['id']} - {signal['symbol']} {signal.get('timeframe', 'N/A')} {signal['side']}")
+            try:
+                result = self.analyze_signal(signal)
+                self.save_analysis_result(result)
+            except Exception as e:
+                logger.error(f"Erro ao processar sinal #{signal['id']}: {e}")
             
+# Analisador próprio de cada processo de _process_signals_parallel
+_worker_analyzer: Optional[DIVAPAnalyzer] = None
+
+def _merge_stats(results: Dict, partial: Dict) -> None:
+    """Soma as estatísticas parciais de _process_signals em results."""
+    for key in ("total", "success", "error", "divap_confirmed"):
+        results[key] += partial[key]
+    for sym, stats in partial["symbols"].items():
+        merged = results["symbols"].setdefault(sym, {"total": 0, "confirmed": 0})
+        merged["total"] += stats["total"]
+        merged["confirmed"] += stats["confirmed"]
+
+def _init_monitor_worker(db_config: Dict, binance_config: Dict) -> None:
+    global _worker_analyzer
+    _worker_analyzer = DIVAPAnalyzer(db_config, binance_config)
+    _worker_analyzer.connect_db()
+    _worker_analyzer.connect_exchange()
+    # Fecha as conexões quando o processo do pool termina
+    multiprocessing.util.Finalize(None, _worker_analyzer.close_connections, exitpriority=10)
+
+def _process_symbol_signals(signals: List[Dict], batch: bool) -> Dict:
+    return _worker_analyzer._process_signals(signals, batch)
+
 def check_pending_signals():
     """
     Função principal para verificar sinais pendentes.
@@ -0,0 +1,243 @@
+"""
+Motor incremental de indicadores DIVAP por (símbolo, timeframe).
+
+Mantém, para cada par (símbolo, timeframe), o estado mínimo necessário para
+atualizar RSI, média de volume, pivôs e divergências a cada candle fechado em
+tempo constante, sem reconstruir um DataFrame. Os valores seguem a mesma
+definição usada em DIVAPAnalyzer.calculate_indicators.
+"""
+import math
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+
+class IndicatorState:
+    """
+    Estado incremental dos indicadores de um único (símbolo, timeframe).
+
+    O RSI segue o padrão do vectorbt usado no analisador (ewm=False): médias
+    simples de ganhos e perdas na janela de RSI. A média de volume usa
+    min_periods=1, e pivôs comparam a mínima/máxima com os últimos
+    pivot_left + 1 candles.
+    """
+
+    def __init__(self, tf_minutes: int, rsi_periods: int, volume_sma_periods: int,
+                 pivot_left: int, history_size: int = 10):
+        self.tf_minutes = tf_minutes
+        self.rsi_periods = rsi_periods
+        # Candles até RSI e média de volume usarem a janela cheia (o 1º candle não tem delta)
+        self.warmup_candles = max(rsi_periods + 1, volume_sma_periods, pivot_left + 1)
+
+        self.last_open_time: Optional[datetime] = None
+        self.last_close: float = math.nan
+
+        # Somas acumuladas de ganhos/perdas (como no vectorbt), com as
+        # rsi_periods + 1 últimas guardadas para obter a soma da janela
+        self._candle_count = 0
+        self._gain_cumsum = 0.0
+        self._loss_cumsum = 0.0
+        self._nan_count = 0
+        self._cumsums = deque(maxlen=rsi_periods + 1)
+        self._volumes = deque(maxlen=volume_sma_periods)
+        self._lows = deque(maxlen=pivot_left + 1)
+        self._highs = deque(maxlen=pivot_left + 1)
+
+        # (preço, RSI) do último e do penúltimo pivô
+        self._low_pivots = deque([(math.nan, math.nan)] * 2, maxlen=2)
+        self._high_pivots = deque([(math.nan, math.nan)] * 2, maxlen=2)
+        # Quantos dos dois pivôs guardados (de baixa / de alta) têm RSI já com janela cheia
+        self._warm_low_pivots = 0
+        self._warm_high_pivots = 0
+
+        # Últimos candles processados, indexados pelo horário de abertura, e se o
+        # estado já estava aquecido em cada um
+        self._history: Dict[datetime, Dict] = {}
+        self._warm: Dict[datetime, bool] = {}
+        self._history_order = deque(maxlen=history_size)
+
+    def _rsi(self, delta: float) -> float:
+        if math.isnan(delta):
+            self._nan_count += 1
+        else:
+            self._gain_cumsum += max(delta, 0.0)
+            self._loss_cumsum += abs(min(delta, 0.0))
+        self._cumsums.append((self._gain_cumsum, self._loss_cumsum, self._nan_count))
+        self._candle_count += 1
+
+        if self._candle_count <= self.rsi_periods:
+            window_len = self._candle_count - self._nan_count
+            roll_up_sum, roll_down_sum = self._gain_cumsum, self._loss_cumsum
+        else:
+            old_gain, old_loss, old_nan = self._cumsums[0]
+            window_len = self.rsi_periods - (self._nan_count - old_nan)
+            roll_up_sum = self._gain_cumsum - old_gain
+            roll_down_sum = self._loss_cumsum - old_loss
+        if window_len < self.rsi_periods:
+            return math.nan
+
+        roll_up = roll_up_sum / window_len
+        roll_down = roll_down_sum / window_len
+        if roll_down == 0:
+            return math.nan if roll_up == 0 else 100.0
+        return 100.0 - 100.0 / (1.0 + roll_up / roll_down)
+
+    @staticmethod
+    def _is_divergence(pivots: deque, bullish: bool) -> bool:
+        (prev_price, prev_rsi), (last_price, last_rsi) = pivots
+        if math.isnan(last_price) or math.isnan(prev_price):
+            return False
+        if bullish:
+            return last_price < prev_price and last_rsi > prev_rsi
+        return last_price > prev_price and last_rsi < prev_rsi
+
+    def update(self, open_time: datetime, open_: float, high: float, low: float,
+               close: float, volume: float) -> Dict:
+        """
+        Processa um candle fechado e retorna o snapshot dos indicadores nele.
+        """
+        rsi = self._rsi(close - self.last_close)
+
+        self._volumes.append(volume)
+        vol_values = [v for v in self._volumes if not math.isnan(v)]
+        vol_sma = sum(vol_values) / len(vol_values) if vol_values else math.nan
+
+        self._lows.append(low)
+        self._highs.append(high)
+        lows = [v for v in self._lows if not math.isnan(v)]
+        highs = [v for v in self._highs if not math.isnan(v)]
+        pivot_low = bool(lows) and low == min(lows)
+        pivot_high = bool(highs) and high == max(highs)
+
+        rsi_warm = self._candle_count >= self.rsi_periods + 1
+        if pivot_low:
+            self._low_pivots.append((low, rsi))
+            self._warm_low_pivots = min(self._warm_low_pivots + 1, 2) if rsi_warm else 0
+        if pivot_high:
+            self._high_pivots.append((high, rsi))
+            self._warm_high_pivots = min(self._warm_high_pivots + 1, 2) if rsi_warm else 0
+
+        snapshot = {
+            "timestamp": open_time,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "RSI": rsi,
+            "VolSMA": vol_sma,
+            "high_volume": volume > vol_sma,
+            "pivot_low": pivot_low,
+            "pivot_high": pivot_high,
+            "bull_div": self._is_divergence(self._low_pivots, bullish=True),
+            "bear_div": self._is_divergence(self._high_pivots, bullish=False),
+        }
+
+        if len(self._history_order) == self._history_order.maxlen:
+            self._history.pop(self._history_order[0], None)
+            self._warm.pop(self._history_order[0], None)
+        self._history_order.append(open_time)
+        self._history[open_time] = snapshot
+        # Aquecido: janelas cheias e os dois últimos pivôs de cada lado vistos com RSI válido,
+        # de modo que o snapshot é o mesmo de calculate_indicators numa janela mais longa
+        self._warm[open_time] = (self._candle_count >= self.warmup_candles
+                                 and self._warm_low_pivots == 2 and self._warm_high_pivots == 2)
+
+        self.last_open_time = open_time
+        self.last_close = close
+        return snapshot
+
+    def get(self, open_time: datetime) -> Optional[Dict]:
+        """Retorna o snapshot do candle aberto em open_time, se ainda estiver no histórico."""
+        return self._history.get(open_time)
+
+    def is_warm(self, open_time: datetime) -> bool:
+        """
+        Se o snapshot do candle open_time já não depende do início do estado.
+        Um estado recriado após um gap leva alguns candles para aquecer.
+        """
+        return self._warm.get(open_time, False)
+
+    def next_open_time(self) -> Optional[datetime]:
+        if self.last_open_time is None:
+            return None
+        return self.last_open_time + timedelta(minutes=self.tf_minutes)
+
+
+class IndicatorEngine:
+    """
+    Registro de IndicatorState por (símbolo, timeframe normalizado).
+
+    Candles devem ser entregues fechados e em ordem. Um candle que pula o
+    próximo horário esperado reinicia o estado, pois os indicadores
+    deixariam de ser válidos; um candle repetido ou antigo é ignorado.
+    """
+
+    def __init__(self, rsi_periods: int, volume_sma_periods: int, pivot_left: int,
+                 history_size: int = 10):
+        self.rsi_periods = rsi_periods
+        self.volume_sma_periods = volume_sma_periods
+        self.pivot_left = pivot_left
+        self.history_size = history_size
+        self._states: Dict[Tuple[str, str], IndicatorState] = {}
+        self._lock = threading.Lock()
+
+    def get_state(self, symbol: str, timeframe: str) -> Optional[IndicatorState]:
+        return self._states.get((symbol, timeframe))
+
+    def reset(self, symbol: str, timeframe: str) -> None:
+        with self._lock:
+            self._states.pop((symbol, timeframe), None)
+
+    def update(self, symbol: str, timeframe: str, tf_minutes: int, open_time: datetime,
+               open_: float, high: float, low: float, close: float,
+               volume: float) -> Optional[Dict]:
+        """
+        Atualiza o estado com um candle fechado. Retorna o snapshot do candle,
+        ou None quando o candle já foi processado.
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None and open_time <= state.last_open_time:
+                return None
+            if state is None or open_time != state.next_open_time():
+                # Sem estado ou com gap: recomeça a partir deste candle
+                state = IndicatorState(tf_minutes, self.rsi_periods, self.volume_sma_periods,
+                                       self.pivot_left, self.history_size)
+                self._states[key] = state
+            return state.update(open_time, float(open_), float(high), float(low),
+                                float(close), float(volume))
+
+    def seed(self, symbol: str, timeframe: str, tf_minutes: int, df: pd.DataFrame) -> Optional[IndicatorState]:
+        """
+        Reconstrói o estado a partir de um DataFrame OHLCV de candles fechados
+        (índice = horário de abertura), substituindo o estado anterior.
+
+        O estado é montado fora do lock e publicado de uma vez, então seeds e
+        updates concorrentes nunca veem um estado pela metade. Um estado que já
+        esteja mais adiante não é retrocedido.
+        """
+        key = (symbol, timeframe)
+        state = None
+        for row in df[["open", "high", "low", "close", "volume"]].itertuples():
+            open_time = row.Index.to_pydatetime()
+            if state is not None and open_time <= state.last_open_time:
+                continue
+            if state is None or open_time != state.next_open_time():
+                state = IndicatorState(tf_minutes, self.rsi_periods, self.volume_sma_periods,
+                                       self.pivot_left, self.history_size)
+            state.update(open_time, float(row.open), float(row.high), float(row.low),
+                         float(row.close), float(row.volume))
+        if state is None:
+            return self.get_state(symbol, timeframe)
+
+        with self._lock:
+            current = self._states.get(key)
+            if current is not None and current.last_open_time > state.last_open_time:
+                return current
+            self._states[key] = state
+        return state
@@ -0,0 +1,67 @@
+"""
+Cache em memória das janelas OHLCV já calculadas pelo analisador DIVAP.
+
+As entradas são indexadas por (símbolo, timeframe normalizado, abertura do
+último candle fechado) e expiram no fechamento do candle seguinte. O tamanho
+é limitado, com descarte do item usado há mais tempo (LRU).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+import pandas as pd
+
+
+class OHLCVWindowCache:
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            df, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def put(self, key: Hashable, df: pd.DataFrame, expires_at: float) -> None:
+        """Guarda a janela até expires_at (epoch em segundos)."""
+        with self._lock:
+            self._entries[key] = (df, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
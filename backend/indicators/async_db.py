@@ -0,0 +1,32 @@
+"""
+Fachada assíncrona para o acesso ao MySQL a partir do loop do Telethon.
+
+As funções de banco continuam síncronas (mysql.connector com o pool do
+divap.py) e rodam num pool de threads dedicado, de modo que o loop asyncio
+nunca bloqueia esperando o MySQL. Cada função usa no máximo uma conexão por
+vez; o pool de conexões do divap.py tem uma conexão por thread daqui, mais as
+do writer de signals_msg e do scheduler, para que uma thread do executor não
+precise esperar por conexão.
+"""
+import asyncio
+import concurrent.futures
+import functools
+from typing import Callable
+
+
+class AsyncDB:
+    def __init__(self, max_workers: int, name: str = "db"):
+        """
+        Args:
+            max_workers: Threads dedicadas ao banco (no máximo as conexões reservadas a elas no pool)
+            name: Prefixo do nome das threads
+        """
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Executa func(*args, **kwargs) numa thread de banco e aguarda o resultado."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
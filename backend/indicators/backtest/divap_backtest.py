@@ -30,6 +30,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger("DIVAP_Backtest")
 
+def ask_workers() -> int:
+    default_workers = os.cpu_count() or 1
+    workers = input(f"Processos em paralelo (padrão: {default_workers}): ").strip()
+    return int(workers) if workers.isdigit() and int(workers) > 0 else default_workers
+
 def interactive_mode():
     analyzer = DIVAPAnalyzer(DB_CONFIG, BINANCE_CONFIG)
     try:
@@ -99,18 +104,28 @@ def interactive_mode():
                 monitor_choice = input("\nEscolha uma opção (1-3): ").strip()
                 
                 if monitor_choice == "1":
-                    limit = input("Número máximo de sinais (padrão: 100): ").strip()
+                    limit = input("Número máximo de sinais (padrão: 100, 0 = todos em páginas retomáveis): ").strip()
                     limit = int(limit) if limit.isdigit() else 100
-                    analyzer.monitor_all_signals(period_days=None, limit=limit)
+                    workers = ask_workers()
+                    if limit == 0:
+                        analyzer.monitor_all_signals(period_days=None, limit=None, workers=workers,
+                                                     stream=True, checkpoint="nao_analisados")
+                    else:
+                        analyzer.monitor_all_signals(period_days=None, limit=limit, workers=workers)
                 
                 elif monitor_choice == "2":
                     days = input("Número de dias para análise (padrão: 7): ").strip()
                     days = int(days) if days.isdigit() else 7
                     
-                    limit = input("Número máximo de sinais (padrão: 100): ").strip()
+                    limit = input("Número máximo de sinais (padrão: 100, 0 = todos em páginas retomáveis): ").strip()
                     limit = int(limit) if limit.isdigit() else 100
+                    workers = ask_workers()
                     
-                    analyzer.monitor_all_signals(period_days=days, limit=limit)
+                    if limit == 0:
+                        analyzer.monitor_all_signals(period_days=days, limit=None, workers=workers,
+                                                     stream=True, checkpoint=f"ultimos_{days}_dias")
+                    else:
+                        analyzer.monitor_all_signals(period_days=days, limit=limit, workers=workers)
             
             elif choice == "4":
                 print("\nIniciando monitoramento em tempo real da tabela webhook_signals...")
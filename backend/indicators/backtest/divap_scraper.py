@@ -17,7 +17,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from divap import (
     extract_trade_info, format_trade_message, save_to_database, 
     save_message_to_database, initialize_divap_analyzer, verify_divap_pattern,
-    pers_api_id, pers_api_hash, DB_CONFIG, CONTA_ID
+    pers_api_id, pers_api_hash, DB_CONFIG, CONTA_ID, signals_msg_writer
 )
 
 # --- Configuração de Logging ---
@@ -559,7 +559,8 @@ class DivapScraper:
             print(f"   📊 Taxa de envio: {taxa_envio:.1f}%")
 
     async def encerrar(self):
-        """Encerra o cliente Telegram"""
+        """Grava as mensagens pendentes em signals_msg e encerra o cliente Telegram"""
+        signals_msg_writer.close()
         try:
             if self.client.is_connected():
                 await self.client.disconnect()
@@ -0,0 +1,143 @@
+"""
+Cliente HTTP compartilhado para a API REST da Binance Futures.
+
+Uma única requests.Session com pool de conexões keep-alive atende os
+atualizadores de brackets e de exchange info, então só a primeira requisição
+paga o handshake TCP+TLS. Falhas transitórias (429, 5xx, timeout, conexão
+caída) são repetidas com backoff exponencial com jitter, e o peso usado
+informado pela Binance (X-MBX-USED-WEIGHT-1M) é acompanhado para segurar
+novas requisições antes de estourar o limite do minuto.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE = int(os.getenv('BINANCE_HTTP_POOL_SIZE', 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('BINANCE_HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('BINANCE_HTTP_READ_TIMEOUT', 30))
+HTTP_MAX_RETRIES = int(os.getenv('BINANCE_HTTP_MAX_RETRIES', 4))
+HTTP_BACKOFF_BASE = 0.5   # Segundos; dobra a cada tentativa
+HTTP_BACKOFF_MAX = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}  # 418 (IP banido) não é repetido
+
+WEIGHT_LIMIT_PER_MINUTE = int(os.getenv('BINANCE_WEIGHT_LIMIT', 2400))
+WEIGHT_SAFETY_RATIO = 0.9  # Acima desta fração do limite, espera o próximo minuto
+
+
+class BinanceHTTPClient:
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, max_retries: int = HTTP_MAX_RETRIES,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._weight_lock = threading.Lock()
+        self.used_weight: Optional[int] = None
+        self.used_weight_minute: Optional[int] = None  # Minuto (epoch // 60) da última leitura
+        self.requests_sent = 0
+        self.retries = 0
+
+    def _track_weight(self, response: requests.Response) -> None:
+        header = response.headers.get('X-MBX-USED-WEIGHT-1M') or response.headers.get('X-MBX-USED-WEIGHT')
+        if header is None:
+            return
+        try:
+            weight = int(header)
+        except ValueError:
+            return
+        with self._weight_lock:
+            self.used_weight = weight
+            self.used_weight_minute = int(time.time() // 60)
+
+    def _wait_for_weight(self) -> None:
+        """Se o peso do minuto atual está perto do limite, dorme até o minuto virar."""
+        with self._weight_lock:
+            weight, minute = self.used_weight, self.used_weight_minute
+        if weight is None or weight < WEIGHT_LIMIT_PER_MINUTE * WEIGHT_SAFETY_RATIO:
+            return
+        now = time.time()
+        if int(now // 60) != minute:
+            return
+        wait = 60 - (now % 60) + random.uniform(0, 1)
+        print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BINANCE] ⏳ Peso usado {weight}/{WEIGHT_LIMIT_PER_MINUTE}, aguardando {wait:.1f}s")
+        time.sleep(wait)
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Backoff exponencial com jitter completo, respeitando Retry-After quando enviado."""
+        delay = random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get('Retry-After', 0)))
+            except ValueError:
+                pass
+        return delay
+
+    def get(self, url: str, params: Union[Dict, Callable[[], Dict], None] = None,
+            headers: Optional[Dict] = None) -> requests.Response:
+        """
+        GET com repetição das falhas transitórias.
+
+        Args:
+            url: URL completa do endpoint
+            params: Parâmetros da query, ou uma função que os monta; a função é
+                    chamada a cada tentativa (ex.: para renovar timestamp e assinatura)
+            headers: Cabeçalhos adicionais
+
+        Returns:
+            A última resposta recebida (pode ter status de erro se as tentativas acabaram)
+
+        Raises:
+            requests.exceptions.RequestException: se a última tentativa falhou sem resposta
+        """
+        attempt = 0
+        while True:
+            self._wait_for_weight()
+            request_params = params() if callable(params) else params
+            try:
+                self.requests_sent += 1
+                response = self.session.get(url, params=request_params, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BINANCE] ⚠️ {type(e).__name__}, nova tentativa em {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            else:
+                self._track_weight(response)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BINANCE] ⚠️ HTTP {response.status_code}, nova tentativa em {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            self.retries += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def get_stats(self) -> Dict:
+        return {
+            "requests_sent": self.requests_sent,
+            "retries": self.retries,
+            "used_weight": self.used_weight,
+        }
+
+
+_client: Optional[BinanceHTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_binance_client() -> BinanceHTTPClient:
+    """Cliente compartilhado pelo processo (criado na primeira chamada)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BinanceHTTPClient()
+    return _client
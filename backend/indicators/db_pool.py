@@ -0,0 +1,183 @@
+"""
+Pool de conexões MySQL para as funções de persistência do divap.py.
+
+As conexões são abertas sob demanda até o tamanho do pool e reaproveitadas.
+Quem pede uma conexão com o pool cheio espera (até o timeout) em vez de
+falhar, e o tempo de espera entra nas métricas. Uma conexão parada há mais
+de health_check_idle segundos recebe um ping antes de ser entregue; se não
+responder, é substituída por uma nova.
+
+A conexão entregue se comporta como uma conexão comum: conn.close() a
+devolve ao pool, desfazendo qualquer transação deixada aberta, e
+conn.is_connected() consulta a conexão real; se ela caiu, é descartada e a
+vaga volta ao pool na hora.
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import mysql.connector
+from mysql.connector import errors
+
+
+class PooledConnection:
+    """Conexão emprestada do pool; close() devolve em vez de fechar."""
+
+    def __init__(self, pool: "MySQLPool", conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise errors.OperationalError("Conexão já devolvida ao pool")
+        return getattr(self._conn, name)
+
+    def is_connected(self) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            connected = self._conn.is_connected()
+        except Exception:
+            connected = False
+        if not connected:
+            # Quem chama costuma pular close() quando a conexão caiu; descarta já e libera a vaga no pool
+            conn, self._conn = self._conn, None
+            self._pool._release(conn, broken=True)
+        return connected
+
+    def close(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn)
+
+
+class MySQLPool:
+    def __init__(self, config: Dict, size: int = 5, timeout: float = 10.0,
+                 health_check_idle: float = 30.0, name: str = "divap"):
+        """
+        Args:
+            config: Argumentos de mysql.connector.connect
+            size: Máximo de conexões abertas ao mesmo tempo
+            timeout: Espera máxima por uma conexão livre (segundos)
+            health_check_idle: Conexões paradas há mais que isso recebem ping antes do uso
+            name: Nome exibido nos logs
+        """
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self.name = name
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()  # (conexão, instante da devolução)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.health_check_failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.in_use = 0
+
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Empresta uma conexão, esperando por uma livre se o pool estiver cheio.
+
+        Raises:
+            mysql.connector.errors.PoolError: se nenhuma conexão ficou livre a tempo
+            mysql.connector.Error: se não foi possível abrir uma conexão nova
+        """
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout if timeout is None else timeout):
+            with self._stats_lock:
+                self.timeouts += 1
+            raise errors.PoolError(f"Pool '{self.name}' esgotado após {time.monotonic() - start:.1f}s de espera")
+        wait = time.monotonic() - start
+        try:
+            conn = self._take_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._stats_lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return PooledConnection(self, conn)
+
+    def _take_healthy(self):
+        while True:
+            try:
+                conn, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - released_at < self.health_check_idle:
+                return conn
+            try:
+                conn.ping(reconnect=False)
+                return conn
+            except Exception:
+                with self._stats_lock:
+                    self.health_check_failures += 1
+                self._discard(conn)
+
+        conn = mysql.connector.connect(**self.config)
+        with self._stats_lock:
+            self.connections_created += 1
+        return conn
+
+    def _discard(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _release(self, conn, broken: bool = False) -> None:
+        try:
+            if broken:
+                with self._stats_lock:
+                    self.health_check_failures += 1
+                self._discard(conn)
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put((conn, time.monotonic()))
+        except Exception:
+            # Conexão quebrada: descarta; a próxima retirada abre outra
+            self._discard(conn)
+        finally:
+            with self._stats_lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def close_all(self) -> None:
+        """Fecha as conexões ociosas (as emprestadas fecham ao serem devolvidas depois)."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connections_created": self.connections_created,
+                "health_check_failures": self.health_check_failures,
+                "avg_wait_ms": (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [DB-POOL] {self.name}: "
+              f"{stats['in_use']}/{stats['size']} em uso, {stats['idle']} ociosas | "
+              f"retiradas: {stats['checkouts']} | espera média: {stats['avg_wait_ms']:.1f} ms | "
+              f"espera máx.: {stats['max_wait_ms']:.1f} ms | timeouts: {stats['timeouts']} | "
+              f"conexões abertas: {stats['connections_created']}")
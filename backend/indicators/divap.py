@@ -1,5 +1,6 @@
 import asyncio
 from asyncio import Queue
+import atexit
 import concurrent.futures
 from datetime import datetime
 import os
@@ -14,17 +15,32 @@ import requests
 import logging
 import hmac
 import hashlib
+import importlib
 import json
 from urllib.parse import urlencode
 import warnings
-from telethon import TelegramClient, events
+from startup_timeline import StartupTimeline
+
+# Linha do tempo da inicialização (importações e fases), exibida quando o bot fica ativo
+startup_timeline = StartupTimeline()
+
+with startup_timeline.importing("telethon"):
+    from telethon import TelegramClient, events
 from dotenv import load_dotenv
 import pathlib
 from pathlib import Path
 from senhas import pers_api_hash, pers_api_id, API_KEY, API_SECRET, API_URL
 import schedule
-from exchange_bracket_updater import update_leverage_brackets, test_binance_credentials, test_database_connection
-from exchange_info_updater import update_exchange_info_database, CURRENT_EXCHANGE
+with startup_timeline.importing("exchange_bracket_updater"):
+    from exchange_bracket_updater import update_leverage_brackets, test_binance_credentials, test_database_connection, register_brackets_listener
+with startup_timeline.importing("exchange_info_updater"):
+    from exchange_info_updater import update_exchange_info_database, CURRENT_EXCHANGE, register_exchange_info_listener
+from leverage_brackets import LeverageBracketIndex
+from symbol_registry import SymbolRegistry
+from account_snapshot import AccountSnapshotCache
+from db_pool import MySQLPool
+from signals_msg_writer import SignalsMessageWriter
+from async_db import AsyncDB
 
 # --- Configuração de Logging e Avisos ---
 logging.basicConfig(level=logging.ERROR)
@@ -50,13 +66,16 @@ GRUPO_FONTE_MAPEAMENTO = {
 
 }
 
+# Inicialização rápida: o cliente Telegram conecta primeiro e o scheduler de
+# brackets e o analisador DIVAP (vectorbt, pandas, numpy, ccxt) carregam em segundo plano
+FAST_START = os.getenv('DIVAP_FAST_START', 'true').lower() in ('1', 'true', 'yes')
+
 # --- Importações e Configurações de Módulos Locais ---
+# analysis.divap_check é importado sob demanda por load_divap_analyzer_class()
 sys.path.append(str(Path(__file__).parent / 'analysis'))
-try:
-    from analysis.divap_check import DIVAPAnalyzer
-except ImportError as e:
-    print(f"[ERRO] Não foi possível importar DIVAPAnalyzer: {e}")
-    DIVAPAnalyzer = None
+DIVAPAnalyzer = None
+DIVAP_HEAVY_MODULES = ("numpy", "pandas", "ccxt", "vectorbt")
+divap_import_lock = threading.Lock()
 
 # --- Carregamento de Variáveis de Ambiente ---
 env_path = pathlib.Path(__file__).parents[2] / 'config' / '.env'
@@ -78,10 +97,41 @@ DB_CONFIG = {
     'autocommit': True
 }
 
+# Pool compartilhado pelas funções de persistência (commit explícito, como antes).
+# Uma conexão por thread do handler, mais uma para o writer de signals_msg e uma
+# para o scheduler (recargas de brackets/símbolos), para o handler nunca esperar por conexão
+DB_EXECUTOR_WORKERS = int(os.getenv('DIVAP_DB_WORKERS', 3))
+DB_POOL_SIZE = DB_EXECUTOR_WORKERS + 2
+DB_POOL_TIMEOUT = float(os.getenv('DIVAP_DB_POOL_TIMEOUT', 10))
+db_pool = MySQLPool(dict(DB_CONFIG, autocommit=False), size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+
+# Mensagens de signals_msg gravadas em lote por uma thread (write-behind)
+SIGNALS_MSG_BATCH_SIZE = 100
+SIGNALS_MSG_FLUSH_INTERVAL = 1.0  # segundos
+signals_msg_writer = SignalsMessageWriter(db_pool.get_connection, SIGNALS_MSG_BATCH_SIZE, SIGNALS_MSG_FLUSH_INTERVAL)
+# Quem importa este módulo (ex.: backtest/divap_scraper.py) nem sempre passa por shutdown();
+# na saída do processo as linhas ainda no buffer são gravadas (ou vão para o spill)
+atexit.register(signals_msg_writer.close)
+
+# Threads dedicadas ao banco para o handler do Telegram (cada uma usa no máximo uma conexão)
+async_db = AsyncDB(max_workers=DB_EXECUTOR_WORKERS, name="divap-db")
+
 # --- Cliente Telegram e Controles de Encerramento ---
 client = TelegramClient('divap', pers_api_id, pers_api_hash)
 shutdown_event = threading.Event()
 divap_analyzer = None
+divap_analyzer_lock = threading.Lock()
+
+# ===== VERIFICAÇÃO DIVAP FORA DO EVENT LOOP =====
+# A análise (ccxt + pandas) é bloqueante; roda em threads para não travar o Telethon
+DIVAP_MAX_WORKERS = 4
+DIVAP_VERIFICATION_TIMEOUT = 20  # segundos; ao estourar, o sinal é aceito sem confirmação
+DIVAP_EXCHANGE_TIMEOUT_MS = 8000  # timeout de cada requisição ccxt, para uma chamada travada liberar a thread
+divap_executor = concurrent.futures.ThreadPoolExecutor(max_workers=DIVAP_MAX_WORKERS, thread_name_prefix="divap")
+# wait_for não interrompe a thread: uma análise que estoura o prazo continua ocupando um worker
+divap_abandoned = set()  # futures abandonados ainda em execução
+divap_stats = {"verifications": 0, "timeouts": 0, "skipped_busy": 0}
+divap_init_future = None  # inicialização do analisador pedida por verify_divap_pattern, compartilhada entre sinais
 
 # ===== CONTROLE DE FILA E PROCESSAMENTO =====
 message_queue = Queue(maxsize=1000)  # Fila com limite para evitar overflow
@@ -192,6 +242,14 @@ async def print_queue_stats():
                 if queue_stats['last_processed']:
                     last = queue_stats['last_processed'].strftime('%H:%M:%S')
                     print(f"   🕐 Última processada: {last}")
+                account_stats = account_snapshot.get_stats()
+                if account_stats['staleness_seconds'] is not None:
+                    print(f"   👥 Contas: {account_stats['accounts']} ativas, snapshot de {account_stats['staleness_seconds']:.0f}s atrás ({account_stats['reloads']} recargas, {account_stats['reload_errors']} falhas)")
+                writer_stats = signals_msg_writer.get_stats()
+                print(f"   📝 signals_msg: {writer_stats['rows_written']} gravadas, {writer_stats['pending']} no buffer, {writer_stats['rows_spilled']} em spill, {writer_stats['rows_rejected']} rejeitadas")
+                print(f"   🔍 DIVAP: {divap_stats['verifications']} verificações, {divap_stats['timeouts']} estouraram o prazo ({len(divap_abandoned)} ainda em execução), {divap_stats['skipped_busy']} ignoradas com workers ocupados")
+                pool_stats = db_pool.get_stats()
+                print(f"   🗄️ Pool DB: {pool_stats['in_use']}/{pool_stats['size']} em uso | espera média {pool_stats['avg_wait_ms']:.1f} ms, máx. {pool_stats['max_wait_ms']:.1f} ms | {pool_stats['timeouts']} timeouts | {pool_stats['connections_created']} conexões abertas")
                 print()
                 
         except Exception as e:
@@ -245,6 +303,10 @@ def initialize_bracket_scheduler():
         # Capturar se houve mudanças nos brackets
         brackets_had_changes = update_leverage_brackets()
 
+        # Carrega o índice de brackets agora, fora do caminho das mensagens
+        if not len(leverage_bracket_index):
+            leverage_bracket_index.refresh()
+
         print("\n" + "═"*80)
         print("🟩 ATUALIZAÇÃO DE EXCHANGE INFO 🟩")
         print("═"*80)
@@ -252,6 +314,10 @@ def initialize_bracket_scheduler():
         # Capturar se houve mudanças no exchange info
         exchange_had_changes = update_exchange_info_database(CURRENT_EXCHANGE)
 
+        # Carrega o registro de símbolos agora, fora do caminho das mensagens
+        if not len(symbol_registry):
+            symbol_registry.refresh()
+
         print("\n" + "="*80)
         print("🟦🟦🟦   INICIALIZAÇÃO DO MONITORAMENTO   🟦🟦🟦")
         print("="*80 + "\n")
@@ -267,10 +333,10 @@ def initialize_bracket_scheduler():
 
 def get_database_connection():
     """
-    Obtém conexão com o banco de dados MySQL
+    Obtém conexão do pool do banco de dados MySQL (conn.close() devolve ao pool)
     """
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = db_pool.get_connection()
         return conn
     except mysql.connector.Error as e:
         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [DB] Erro ao conectar: {e}")
@@ -290,10 +356,18 @@ async def shutdown(client_instance):
         schedule.clear()
         #print("[INFO] Jobs do scheduler limpos.")
 
+        divap_executor.shutdown(wait=False)
+
         if divap_analyzer:
             divap_analyzer.close_connections()
             print("[INFO] Conexões do analisador DIVAP fechadas.")
 
+        # Espera as operações de banco em andamento e grava as mensagens ainda no buffer antes de fechar o pool
+        async_db.shutdown(wait=True)
+        signals_msg_writer.close()
+        db_pool.log_stats()
+        db_pool.close_all()
+
         if client_instance and client_instance.is_connected():
             await client_instance.disconnect()
             print("[INFO] Cliente Telegram desconectado.")
@@ -328,13 +402,7 @@ def get_leverage_brackets_from_database(symbol=None):
     Busca informações de leverage brackets do banco de dados MySQL
     """
     try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
+        conn = db_pool.get_connection()
         cursor = conn.cursor(dictionary=True)
 
         sql = """
@@ -382,56 +450,84 @@ def get_leverage_brackets_from_database(symbol=None):
 
 def load_leverage_brackets(symbol=None):
     """
-    Carrega os brackets de alavancagem do banco de dados MySQL
+    Carrega os brackets de alavancagem do índice em memória
     """
-    brackets_data = get_leverage_brackets_from_database(symbol)
+    if symbol:
+        symbol_brackets = leverage_bracket_index.get(symbol)
+        return {symbol: symbol_brackets} if symbol_brackets else {}
+    return leverage_bracket_index.get_all()
 
-    if symbol and symbol not in brackets_data:
-        cleaned_symbol = clean_symbol(symbol)
-        if cleaned_symbol != symbol and cleaned_symbol in brackets_data:
-            return {symbol: brackets_data[cleaned_symbol]}
+# Índice de brackets do processo: carregado no primeiro uso e recarregado
+# sempre que update_leverage_brackets aplica mudanças no banco
+leverage_bracket_index = LeverageBracketIndex(get_leverage_brackets_from_database)
+register_brackets_listener(leverage_bracket_index.refresh)
 
-        base_symbol = symbol.split('_')[0]
-        if base_symbol != symbol and base_symbol in brackets_data:
-            print(f"[INFO] Usando brackets de {base_symbol} para {symbol}")
-            return {symbol: brackets_data[base_symbol]}
-        
-        if "USDT" in symbol and "BTCUSDT" in brackets_data:
-            print(f"[INFO] Usando brackets de BTCUSDT como referência para {symbol}")
-            return {symbol: brackets_data["BTCUSDT"]}
+def get_symbol_filters_from_database():
+    """
+    Busca os símbolos da exchange com os filtros de preço, quantidade e notional mínimo
+    """
+    try:
+        conn = db_pool.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT es.symbol, es.status, es.price_precision, es.quantity_precision,
+                   ef.filter_type, ef.tick_size, ef.step_size, ef.min_notional
+            FROM exchange_symbols es
+            LEFT JOIN exchange_filters ef
+              ON ef.symbol_id = es.id AND ef.filter_type IN ('PRICE_FILTER', 'LOT_SIZE', 'MIN_NOTIONAL')
+            WHERE es.exchange = %s
+        """, (CURRENT_EXCHANGE,))
+        return cursor.fetchall()
 
-    return brackets_data
+    except Exception as e:
+        print(f"[ERRO] Falha ao buscar símbolos e filtros do banco de dados: {e}")
+        return []
+    finally:
+        if 'conn' in locals() and conn.is_connected():
+            cursor.close()
+            conn.close()
 
-def get_account_base_balance():
+# Registro de símbolos do processo: carregado no primeiro uso e recarregado
+# sempre que update_exchange_info_database aplica mudanças no banco
+symbol_registry = SymbolRegistry(get_symbol_filters_from_database)
+register_exchange_info_listener(symbol_registry.refresh)
+
+def load_active_accounts():
     """
-    Obtém o saldo base de cálculo da tabela conta (com fallback para contas)
+    Consulta as contas ativas (id, chat do Telegram e saldo base de cálculo)
     """
+    conn = db_pool.get_connection()
     try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
         cursor = conn.cursor(dictionary=True)
-        
-        sql = "SELECT saldo_base_calculo_futuros FROM contas WHERE ativa = 1 LIMIT 1"
-        cursor.execute(sql)
-        result = cursor.fetchone()
-            
-        if result and 'saldo_base_calculo_futuros' in result and result['saldo_base_calculo_futuros'] is not None:
-            return float(result['saldo_base_calculo_futuros'])
+        cursor.execute("SELECT id, telegram_chat_id, saldo_base_calculo_futuros FROM contas WHERE ativa = 1 ORDER BY id")
+        accounts = cursor.fetchall()
+        cursor.close()
+        return accounts
+    finally:
+        conn.close()
+
+# Snapshot das contas ativas usado por get_account_base_balance e save_to_database.
+# A tabela contas só é alterada pelo backend Node (rotas de contas e handlers da Binance),
+# em outro processo: não há ponto neste processo onde invalidar, então o TTL limita a
+# defasagem. invalidate() só é usado quando um INSERT falha (conta alterada/removida) e
+# quando o snapshot vem sem contas, antes de descartar o sinal.
+ACCOUNT_SNAPSHOT_TTL = float(os.getenv('DIVAP_ACCOUNT_SNAPSHOT_TTL', 30))  # segundos
+account_snapshot = AccountSnapshotCache(load_active_accounts, ACCOUNT_SNAPSHOT_TTL)
+
+def get_account_base_balance():
+    """
+    Obtém o saldo base de cálculo da primeira conta ativa (snapshot em memória)
+    """
+    try:
+        accounts = account_snapshot.get_accounts()
+        if accounts and accounts[0].get('saldo_base_calculo_futuros') is not None:
+            return float(accounts[0]['saldo_base_calculo_futuros'])
 
         return 1000.0
 
     except Exception as e:
         print(f"[ERRO] Falha ao buscar saldo base de cálculo: {e}")
         return 1000.0
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 def calculate_ideal_leverage(symbol, entry_price, stop_loss, capital_percent, side_raw=None):
     """
@@ -456,44 +552,13 @@ def calculate_ideal_leverage(symbol, entry_price, stop_loss, capital_percent, si
 
     try:
         account_balance = get_account_base_balance()
-        leverage_brackets = load_leverage_brackets(cleaned_symbol)
-        symbol_brackets = []
-
-        if cleaned_symbol in leverage_brackets:
-            symbol_brackets = leverage_brackets[cleaned_symbol]
-
-        if not symbol_brackets:
-            all_brackets = load_leverage_brackets()
-            base_symbol = cleaned_symbol.split('_')[0]
-
-            if base_symbol in all_brackets:
-                symbol_brackets = all_brackets[base_symbol]
-            elif "BTCUSDT" in all_brackets:
-                symbol_brackets = all_brackets["BTCUSDT"]
-
         order_value = account_balance * (capital_percent / 100)
         
-        max_leverage = 1
-        bracket_leverage_limits = []
+        # Maior alavancagem cujo bracket comporta a posição (busca binária no índice em memória)
+        max_leverage = leverage_bracket_index.max_leverage(cleaned_symbol, order_value)
         
-        for bracket in symbol_brackets:
-            if "initialLeverage" not in bracket:
-                continue
-                
-            bracket_leverage = int(bracket.get("initialLeverage", 1))
-            notional_floor = float(bracket.get("notionalFloor", 0))
-            notional_cap = float(bracket.get("notionalCap", float('inf')))
-            
-            position_value = order_value * bracket_leverage
-            
-            if position_value >= notional_floor and (notional_cap == float('inf') or position_value < notional_cap):
-                max_leverage = max(max_leverage, bracket_leverage)
-                bracket_leverage_limits.append(bracket_leverage)
-                print(f"[DEBUG] Bracket elegível: Alavancagem {bracket_leverage}x, Valor posição: {position_value:.2f}, Limite: {notional_cap:.2f}")
-        
-        if bracket_leverage_limits:
-            max_leverage = max(bracket_leverage_limits)
-            print(f"[DEBUG] Alavancagem máxima: {max_leverage}x")
+        if max_leverage > 0:
+            print(f"[DEBUG] Alavancagem máxima: {max_leverage}x, Valor posição: {order_value * max_leverage:.2f}")
             print(f"[DEBUG] {symbol}: Distância até SL: {sl_distance_pct:.6f} ({sl_distance_pct*100:.2f}%)")
         else:
             print(f"[AVISO] Nenhum bracket elegível encontrado para o valor da ordem. Usando alavancagem conservadora.")
@@ -528,26 +593,30 @@ def send_to_webhook(trade_data):
         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ❌ Erro ao enviar webhook: {e}")
         return False
 
+# innodb_autoinc_lock_mode do servidor, lido uma vez (0/1 = ids em sequência num INSERT multi-linha)
+_autoinc_lock_mode = None
+
+def get_autoinc_lock_mode(cursor):
+    global _autoinc_lock_mode
+    if _autoinc_lock_mode is None:
+        cursor.execute("SELECT @@innodb_autoinc_lock_mode AS mode")
+        _autoinc_lock_mode = int(cursor.fetchone()['mode'])
+    return _autoinc_lock_mode
+
 def save_to_database(trade_data):
     """
     Salva informações da operação no banco MySQL para todas as contas ativas,
     usando o telegram_chat_id de cada conta como chat_id na tabela webhook_signals.
+    Todas as contas entram num único INSERT multi-linha, numa transação.
     """
-    conn = None
-    cursor = None
     try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
-        cursor = conn.cursor(dictionary=True)
-
-        # Buscar todas as contas ativas e seus telegram_chat_id
-        cursor.execute("SELECT id, telegram_chat_id FROM contas WHERE ativa = 1")
-        contas_ativas = cursor.fetchall()
+        # Contas ativas e seus telegram_chat_id (snapshot em memória). Lidas antes de pegar
+        # uma conexão: se o snapshot expirou, o loader usa outra conexão do mesmo pool
+        contas_ativas = account_snapshot.get_accounts()
+        if not contas_ativas:
+            # Snapshot vazio pode estar desatualizado; confirma no banco antes de descartar o sinal
+            account_snapshot.invalidate()
+            contas_ativas = account_snapshot.get_accounts()
         if not contas_ativas:
             print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ⚠️ Nenhuma conta ativa encontrada. Sinal não será salvo.")
             return None
@@ -563,27 +632,24 @@ def save_to_database(trade_data):
         
         # chat_id_destino não é mais usado aqui, pois será sobrescrito pelo telegram_chat_id de cada conta
 
-        sql = """
+        columns_sql = """
         INSERT INTO webhook_signals
         (symbol, side, leverage, capital_pct, entry_price, sl_price,
          chat_id, status, timeframe, message_id, message_id_orig, chat_id_orig_sinal,
          tp1_price, tp2_price, tp3_price, tp4_price, tp5_price, message_source,
          divap_confirmado, cancelado_checker, error_message, conta_id)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
+        VALUES """
+        row_placeholders = "(" + ", ".join(["%s"] * 22) + ")"
 
-        signal_ids = []
-        for conta in contas_ativas:
-            conta_id = conta['id']
-            chat_id_destino = conta['telegram_chat_id']
-            values = (
+        def account_values(conta):
+            return (
                 trade_data["symbol"],
                 trade_data["side"],
                 trade_data["leverage"],
                 trade_data["capital_pct"],
                 trade_data["entry"],
                 trade_data["stop_loss"],
-                chat_id_destino,
+                conta['telegram_chat_id'],
                 trade_data.get("status", "PENDING"),
                 trade_data.get("timeframe", ""),
                 trade_data.get("message_id"),
@@ -594,16 +660,59 @@ def save_to_database(trade_data):
                 trade_data.get("divap_confirmado", None),
                 trade_data.get("cancelado_checker", None),
                 trade_data.get("error_message", None),
-                conta_id
+                conta['id']
             )
+
+        for attempt in range(2):
+            conn = db_pool.get_connection()
+            cursor = conn.cursor(dictionary=True)
             try:
-                cursor.execute(sql, values)
-                signal_id = cursor.lastrowid
-                signal_ids.append((conta_id, signal_id, chat_id_destino))
-                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ✅ Operação salva [ID: {signal_id}, Conta: {conta_id}, Chat: {chat_id_destino}] [{trade_data['symbol']}]")
-            except Exception as e:
-                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ❌ Erro ao salvar sinal para conta {conta_id}: {e}")
-        conn.commit()
+                conn.start_transaction()
+                params = [value for conta in contas_ativas for value in account_values(conta)]
+                cursor.execute(columns_sql + ", ".join([row_placeholders] * len(contas_ativas)), params)
+                first_id = cursor.lastrowid
+
+                if get_autoinc_lock_mode(cursor) in (0, 1):
+                    # Lock mode 0/1: um INSERT multi-linha recebe ids em sequência, na ordem das linhas,
+                    # espaçados por auto_increment_increment (> 1 em réplicas multi-primário). Lido a cada
+                    # vez porque a variável de sessão pode mudar sem reiniciar o servidor.
+                    cursor.execute("SELECT @@auto_increment_increment AS increment")
+                    increment = int(cursor.fetchone()['increment'])
+                    ids_by_conta = {conta['id']: first_id + i * increment for i, conta in enumerate(contas_ativas)}
+                else:
+                    # Lock mode 2 (intercalado): ids podem não ser consecutivos; lê de volta pela chave primária
+                    conta_ids = [conta['id'] for conta in contas_ativas]
+                    cursor.execute(f"""
+                        SELECT id, conta_id FROM webhook_signals
+                        WHERE id >= %s AND conta_id IN ({', '.join(['%s'] * len(conta_ids))})
+                          AND symbol = %s AND message_id <=> %s AND message_id_orig <=> %s
+                        ORDER BY id LIMIT %s
+                    """, (first_id, *conta_ids, trade_data["symbol"], trade_data.get("message_id"),
+                          trade_data.get("id_mensagem_origem_sinal"), len(conta_ids)))
+                    ids_by_conta = {row['conta_id']: row['id'] for row in cursor.fetchall()}
+                conn.commit()
+                break
+            except mysql.connector.Error as e:
+                conn.rollback()
+                # A conta pode ter sido alterada/removida desde o snapshot; relê e tenta uma vez mais
+                account_snapshot.invalidate()
+                if attempt:
+                    raise
+                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ⚠️ Erro ao salvar sinal ({e}), relendo contas ativas e tentando novamente")
+            finally:
+                cursor.close()
+                conn.close()
+            # Conexão já devolvida ao pool antes de reler as contas
+            contas_ativas = account_snapshot.get_accounts()
+            if not contas_ativas:
+                return None
+
+        signal_ids = []
+        for conta in contas_ativas:
+            conta_id, chat_id_destino = conta['id'], conta['telegram_chat_id']
+            signal_id = ids_by_conta.get(conta_id)
+            signal_ids.append((conta_id, signal_id, chat_id_destino))
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ✅ Operação salva [ID: {signal_id}, Conta: {conta_id}, Chat: {chat_id_destino}] [{trade_data['symbol']}]")
         return signal_ids if signal_ids else None
 
     except mysql.connector.Error as db_err:
@@ -612,11 +721,6 @@ def save_to_database(trade_data):
     except Exception as e_generic:
         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ❌ Erro genérico ao salvar no banco: {e_generic}")
         return None
-    finally:
-        if conn and conn.is_connected():
-            if cursor:
-                cursor.close()
-            conn.close()
 
 def extract_trade_info(message_text):
     """
@@ -682,6 +786,13 @@ def extract_trade_info(message_text):
         
         print(f"   ✅ Símbolo extraído: {symbol}")
         
+        # Rejeita símbolos fora da exchange antes de qualquer análise (registro vazio = banco indisponível, não filtra)
+        symbol_info = symbol_registry.get(symbol)
+        if len(symbol_registry) and (symbol_info is None or not symbol_info.is_trading):
+            motivo = "não listado na exchange" if symbol_info is None else f"status {symbol_info.status}"
+            print(f"   ❌ Símbolo {symbol} rejeitado: {motivo}")
+            return None
+        
         # ===== EXTRAÇÃO DO TIMEFRAME =====
         timeframe_patterns = [
             r'#[A-Z0-9]+\s+(\d+[mhdwMD])',         # #TRXUSDT 15m
@@ -829,6 +940,12 @@ def extract_trade_info(message_text):
         for _, tp_price in tp_matches_with_numbers:
             all_tps.append(tp_price)
         
+        # Preços ajustados ao tick size do símbolo
+        if symbol_info:
+            entry = symbol_info.round_price(entry)
+            stop_loss = symbol_info.round_price(stop_loss)
+            all_tps = [symbol_info.round_price(tp_price) for tp_price in all_tps]
+        
         # Remover duplicatas mantendo ordem
         seen = set()
         all_tps = [x for x in all_tps if not (x in seen or seen.add(x))]
@@ -914,28 +1031,13 @@ def save_message_to_database(message_id, chat_id, text, is_reply=False,
                             reply_to_message_id=None, symbol=None, signal_id=None, 
                             created_at=None, message_source=None):
     """
-    Salva uma mensagem do Telegram na tabela signals_msg
+    Enfileira uma mensagem do Telegram para a tabela signals_msg (gravada em lote por signals_msg_writer)
     """
     try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
-        cursor = conn.cursor()
-
         if not created_at:
             created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        sql = """
-              INSERT INTO signals_msg
-              (message_id, chat_id, text, is_reply, reply_to_message_id, symbol, signal_id, created_at, message_source)
-              VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-              """
-              
-        values = (
+        signals_msg_writer.enqueue((
             message_id,
             chat_id,
             text,
@@ -945,53 +1047,100 @@ def save_message_to_database(message_id, chat_id, text, is_reply=False,
             signal_id,
             created_at,
             message_source
-        )
-        
-        cursor.execute(sql, values)
-        conn.commit()
+        ))
         
     except Exception as e:
         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ❌ Erro ao registrar mensagem: {e}")
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
+
+def run_startup_phase(name, func):
+    """Executa uma fase da inicialização registrando sua duração na linha do tempo"""
+    with startup_timeline.phase(name):
+        result = func()
+    print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [STARTUP] {name} concluído em {startup_timeline.phase_duration(name):.2f}s")
+    return result
+
+def describe_brackets_startup():
+    """Estado real dos brackets para o banner (no FAST_START o scheduler ainda pode estar rodando)"""
+    duration = startup_timeline.phase_duration("scheduler de brackets")
+    if duration is None:
+        return f"Carregando em segundo plano (t+{startup_timeline.elapsed():.2f}s)"
+    if len(leverage_bracket_index):
+        return f"Atualizados ({len(leverage_bracket_index)} símbolos em {duration:.2f}s)"
+    return f"⚠️ Não carregados (scheduler terminou em {duration:.2f}s sem brackets)"
+
+def load_divap_analyzer_class():
+    """Importa analysis.divap_check (e suas dependências pesadas) na primeira chamada"""
+    global DIVAPAnalyzer
+    with divap_import_lock:
+        if DIVAPAnalyzer is None:
+            try:
+                for module_name in DIVAP_HEAVY_MODULES:
+                    with startup_timeline.importing(module_name):
+                        importlib.import_module(module_name)
+                with startup_timeline.importing("analysis.divap_check"):
+                    from analysis.divap_check import DIVAPAnalyzer as analyzer_class
+                DIVAPAnalyzer = analyzer_class
+            except ImportError as e:
+                print(f"[ERRO] Não foi possível importar DIVAPAnalyzer: {e}")
+        return DIVAPAnalyzer
 
 def initialize_divap_analyzer():
     """Inicializa o analisador DIVAP"""
     global divap_analyzer
-    if divap_analyzer is None and DIVAPAnalyzer:
-        try:
-            divap_analyzer = DIVAPAnalyzer(
-                db_config={
-                    "host": DB_HOST,
-                    "user": DB_USER,
-                    "password": DB_PASSWORD,
-                    "database": DB_NAME,
-                    "port": DB_PORT,
-                },
-                binance_config={
-                    "apiKey": API_KEY,
-                    "secret": API_SECRET,
-                    "enableRateLimit": True
-                }
-            )
-            divap_analyzer.connect_db()
-            divap_analyzer.connect_exchange()
-            print("                 [INFO] ✅ Analisador DIVAP inicializado com sucesso")
-            return True
-        except Exception as e:
-            print(f"[ERRO] ❌ Falha ao inicializar analisador DIVAP: {e}")
-            divap_analyzer = None
-            return False
-    return divap_analyzer is not None
+    # Pode ser chamada de threads do executor; evita criar dois analisadores
+    with divap_analyzer_lock:
+        if divap_analyzer is None and load_divap_analyzer_class():
+            try:
+                divap_analyzer = DIVAPAnalyzer(
+                    db_config={
+                        "host": DB_HOST,
+                        "user": DB_USER,
+                        "password": DB_PASSWORD,
+                        "database": DB_NAME,
+                        "port": DB_PORT,
+                    },
+                    binance_config={
+                        "apiKey": API_KEY,
+                        "secret": API_SECRET,
+                        "enableRateLimit": True,
+                        "timeout": DIVAP_EXCHANGE_TIMEOUT_MS
+                    },
+                    # analyze_signal roda em várias threads do divap_executor; cada uma com sua instância ccxt
+                    thread_local_exchange=True
+                )
+                divap_analyzer.connect_db()
+                divap_analyzer.connect_exchange()
+                print("                 [INFO] ✅ Analisador DIVAP inicializado com sucesso")
+                return True
+            except Exception as e:
+                print(f"[ERRO] ❌ Falha ao inicializar analisador DIVAP: {e}")
+                divap_analyzer = None
+                return False
+        return divap_analyzer is not None
 
 async def verify_divap_pattern(trade_info):
     """Verifica se o sinal corresponde a um padrão DIVAP válido"""
-    global divap_analyzer
+    global divap_analyzer, divap_init_future
     
     if not divap_analyzer:
-        success = initialize_divap_analyzer()
+        # No FAST_START o analisador ainda pode estar carregando: a espera tem o mesmo prazo da análise
+        if divap_init_future is None or divap_init_future.done():
+            divap_init_future = divap_executor.submit(initialize_divap_analyzer)
+        init_future = divap_init_future
+        try:
+            # shield: o prazo de um sinal não cancela a inicialização que os outros também esperam
+            success = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(init_future)),
+                                             timeout=DIVAP_VERIFICATION_TIMEOUT)
+        except asyncio.TimeoutError:
+            divap_stats["timeouts"] += 1
+            if not init_future.done():
+                divap_abandoned.add(init_future)
+                init_future.add_done_callback(divap_abandoned.discard)
+            print(f"[AVISO] Analisador DIVAP não inicializou em {DIVAP_VERIFICATION_TIMEOUT}s - {trade_info['symbol']} aceito sem confirmação")
+            return (True, None)
+        except Exception as e:
+            print(f"[ERRO] Falha ao inicializar analisador DIVAP: {e}")
+            return (True, None)
         if not success:
             print("[ERRO] Não foi possível inicializar analisador DIVAP")
             return (True, None)  # Permitir em caso de erro
@@ -1004,8 +1153,16 @@ async def verify_divap_pattern(trade_info):
         "created_at": datetime.now()
     }
     
+    if len(divap_abandoned) >= DIVAP_MAX_WORKERS:
+        # Todos os workers presos em análises abandonadas: esperar só estouraria o prazo de novo
+        divap_stats["skipped_busy"] += 1
+        print(f"[AVISO] {len(divap_abandoned)} verificações DIVAP abandonadas ainda em execução - {trade_info['symbol']} aceito sem confirmação")
+        return (True, None)
+
+    divap_stats["verifications"] += 1
+    future = divap_executor.submit(divap_analyzer.analyze_signal, mock_signal)
     try:
-        analysis_result = divap_analyzer.analyze_signal(mock_signal)
+        analysis_result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=DIVAP_VERIFICATION_TIMEOUT)
         
         if "error" in analysis_result:
             print(f"[AVISO] Erro na análise DIVAP: {analysis_result['error']}")
@@ -1036,6 +1193,13 @@ async def verify_divap_pattern(trade_info):
             
             return (False, error_msg)
             
+    except asyncio.TimeoutError:
+        divap_stats["timeouts"] += 1
+        if not future.done():
+            divap_abandoned.add(future)
+            future.add_done_callback(divap_abandoned.discard)
+        print(f"[AVISO] Verificação DIVAP de {trade_info['symbol']} excedeu {DIVAP_VERIFICATION_TIMEOUT}s - sinal aceito sem confirmação ({len(divap_abandoned)} abandonada(s) ainda em execução)")
+        return (True, None)
     except Exception as e:
         print(f"[ERRO] Falha na verificação DIVAP: {e}")
         return (True, None)
@@ -1145,7 +1309,8 @@ async def handle_new_message(event):
         if incoming_chat_id in GRUPOS_ORIGEM_IDS:
             #print(f"   ✅ Mensagem de grupo origem - processando...")
             
-            trade_info = extract_trade_info(incoming_text)
+            # Pode consultar o banco (carga inicial de brackets/símbolos); roda fora do loop
+            trade_info = await async_db.run(extract_trade_info, incoming_text)
 
             if trade_info:
                 #print(f"   🎯 Trade info extraído com sucesso!")
@@ -1184,7 +1349,7 @@ async def handle_new_message(event):
                     trade_info['cancelado_checker'] = 0
                     
                     # Salvar no banco
-                    signal_ids_info = save_to_database(trade_info)
+                    signal_ids_info = await async_db.run(save_to_database, trade_info)
                     if signal_ids_info:
                         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ✅ Sinal salvo com IDs: {signal_ids_info}")
                         for conta_id, signal_id, chat_id_destino in signal_ids_info:
@@ -1229,7 +1394,7 @@ async def handle_new_message(event):
                     trade_info['error_message'] = error_message
                     
                     # Salvar sinal cancelado
-                    save_to_database(trade_info)
+                    await async_db.run(save_to_database, trade_info)
                     
                     # Registrar mensagem original
                     save_message_to_database(
@@ -1314,7 +1479,7 @@ async def verificar_integridade_telegram():
         for i, message in enumerate(mensagens_teste):
             try:
                 # Verificar se a mensagem contém informações de trade válidas
-                trade_info = extract_trade_info(message.text)
+                trade_info = await async_db.run(extract_trade_info, message.text)
                 
                 if trade_info:
                     mensagem_valida = message
@@ -1370,23 +1535,27 @@ async def verificar_integridade_telegram():
             print(f"\n🔍 Testando verificação DIVAP...")
             
             try:
-                # Inicializar analyzer se necessário
-                if not divap_analyzer:
-                    if not initialize_divap_analyzer():
-                        print(f"⚠️ Falha ao inicializar DIVAP analyzer para teste")
-                        print(f"   Verificação DIVAP será desabilitada durante execução")
-                    else:
-                        print(f"✅ DIVAP analyzer inicializado com sucesso")
-                
-                # Testar verificação DIVAP
-                is_valid_divap, error_message = await verify_divap_pattern(trade_info_valido)
-                
-                if is_valid_divap:
-                    print(f"✅ Teste DIVAP: Padrão confirmado")
+                # Na inicialização rápida o analisador ainda pode estar carregando; não bloqueia o teste
+                if FAST_START and not divap_analyzer:
+                    print(f"⏳ Analisador DIVAP carregando em segundo plano - teste DIVAP ignorado")
                 else:
-                    print(f"⚠️ Teste DIVAP: Padrão não confirmado - {error_message}")
-                    print(f"   (Isso é normal para mensagens antigas)")
-                
+                    # Inicializar analyzer se necessário
+                    if not divap_analyzer:
+                        if not initialize_divap_analyzer():
+                            print(f"⚠️ Falha ao inicializar DIVAP analyzer para teste")
+                            print(f"   Verificação DIVAP será desabilitada durante execução")
+                        else:
+                            print(f"✅ DIVAP analyzer inicializado com sucesso")
+
+                    # Testar verificação DIVAP
+                    is_valid_divap, error_message = await verify_divap_pattern(trade_info_valido)
+
+                    if is_valid_divap:
+                        print(f"✅ Teste DIVAP: Padrão confirmado")
+                    else:
+                        print(f"⚠️ Teste DIVAP: Padrão não confirmado - {error_message}")
+                        print(f"   (Isso é normal para mensagens antigas)")
+
             except Exception as e:
                 print(f"⚠️ Erro no teste DIVAP: {e}")
                 print(f"   Sistema continuará sem verificação DIVAP")
@@ -1474,20 +1643,36 @@ async def main():
     print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] 🚀 INICIANDO DIVAP BOT...")
     print("="*80)
 
-    # 1. Inicializa o agendador de atualização de brackets
-    print(f"\n[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] 🔧 Inicializando scheduler de brackets...")
-    initialize_bracket_scheduler()
+    loop = asyncio.get_running_loop()
 
-    # 2. Inicializa o analisador de padrões DIVAP
-    if ENABLE_REVERSE_VERIFICATION:
-        #print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] 🔍 Inicializando analisador DIVAP...")
-        initialize_divap_analyzer()
+    # Regrava no banco mensagens que ficaram em spill numa execução anterior
+    signals_msg_writer.start()
+
+    if FAST_START:
+        # 1-2. Scheduler de brackets e analisador DIVAP carregam em segundo plano
+        print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ⚡ Inicialização rápida: scheduler e analisador DIVAP em segundo plano")
+        threading.Thread(target=run_startup_phase, args=("scheduler de brackets", initialize_bracket_scheduler),
+                         daemon=True, name="startup-brackets").start()
+        if ENABLE_REVERSE_VERIFICATION:
+            loop.run_in_executor(divap_executor, run_startup_phase, "analisador DIVAP", initialize_divap_analyzer)
+        else:
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ⚠️ Verificação DIVAP DESATIVADA")
     else:
-        print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ⚠️ Verificação DIVAP DESATIVADA")
+        # 1. Inicializa o agendador de atualização de brackets
+        print(f"\n[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] 🔧 Inicializando scheduler de brackets...")
+        run_startup_phase("scheduler de brackets", initialize_bracket_scheduler)
+
+        # 2. Inicializa o analisador de padrões DIVAP
+        if ENABLE_REVERSE_VERIFICATION:
+            #print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] 🔍 Inicializando analisador DIVAP...")
+            run_startup_phase("analisador DIVAP", initialize_divap_analyzer)
+        else:
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ⚠️ Verificação DIVAP DESATIVADA")
 
     # 3. Conecta o cliente Telegram
     #print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] 📱 Conectando cliente Telegram...")
-    await client.start()
+    with startup_timeline.phase("conexão Telegram"):
+        await client.start()
     print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ✅ Cliente Telegram conectado com sucesso")
 
     # Configurar tratamento de sinais
@@ -1503,7 +1688,8 @@ async def main():
         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ⚠️ Não foi possível configurar manipulador de sinais: {e}")
 
     # ✅ NOVA ETAPA: Verificar acesso aos grupos
-    grupos_acessiveis = await verificar_grupos_acessiveis()
+    with startup_timeline.phase("verificação de grupos"):
+        grupos_acessiveis = await verificar_grupos_acessiveis()
     if not grupos_acessiveis:
         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ❌ Falha na verificação de grupos! Encerrando...")
         return
@@ -1511,7 +1697,8 @@ async def main():
     # ✅ NOVA ETAPA: Verificação de integridade do sistema
     print(f"\n[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] 🛡️ Executando verificação de integridade...")
     
-    integridade_ok = await verificar_integridade_telegram()
+    with startup_timeline.phase("verificação de integridade"):
+        integridade_ok = await verificar_integridade_telegram()
     
     if not integridade_ok:
         print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] ❌ FALHA NA VERIFICAÇÃO DE INTEGRIDADE!")
@@ -1547,9 +1734,10 @@ async def main():
     print(f"   📱 Telegram: Conectado")
     print(f"   🛡️ Integridade: Verificada")
     print(f"   🔍 DIVAP: {'Ativado' if ENABLE_REVERSE_VERIFICATION else 'Desativado'}")
-    print(f"   📊 Brackets: Atualizados")
+    print(f"   📊 Brackets: {describe_brackets_startup()}")
     print(f"   👀 Monitorando: {len(grupos_acessiveis)} grupo(s)")
     print(f"   📤 Destino: {GRUPO_DESTINO_ID}")
+    print(f"\n{startup_timeline.report()}")
     print(f"\n{'='*80}\n")
 
     try:
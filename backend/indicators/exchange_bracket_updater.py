@@ -19,6 +19,8 @@ load_dotenv(dotenv_path=env_path)
 
 # Importar senhas após carregar o .env
 from senhas import API_KEY, API_SECRET, API_URL
+from payload_hashes import PayloadHashStore, content_hash
+from binance_http import get_binance_client
 
 # Configuração de logging
 logging.basicConfig(level=logging.ERROR)
@@ -35,6 +37,33 @@ DB_CONFIG = {
     'autocommit': True
 }
 
+BULK_BATCH_SIZE = 500  # Linhas por comando nas operações em lote
+
+# Hashes do último payload de brackets aplicado, por símbolo (persistidos em disco)
+bracket_hashes = PayloadHashStore('leverage_brackets_binance')
+
+# Funções chamadas sempre que uma atualização altera os brackets no banco
+_brackets_listeners = []
+
+def register_brackets_listener(callback):
+    """
+    Registra uma função (sem argumentos) chamada após uma atualização que
+    alterou os brackets, ex.: para recarregar um índice em memória.
+    """
+    _brackets_listeners.append(callback)
+
+def _notify_brackets_listeners():
+    for callback in _brackets_listeners:
+        try:
+            callback()
+        except Exception as e:
+            print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BRACKETS] ❌ Erro ao notificar atualização de brackets: {e}")
+
+def _chunks(items, size):
+    """Divide uma lista em fatias de no máximo size itens."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
 def get_database_connection():
     """
     Obtém conexão com o banco de dados MySQL.
@@ -64,20 +93,18 @@ def make_binance_request(endpoint, params=None):
         if params is None:
             params = {}
         
-        timestamp = int(time.time() * 1000)
-        params['timestamp'] = timestamp
-        
-        query_string = urlencode(params)
-        signature = create_binance_signature(query_string, API_SECRET)
-        
-        url = f"{API_URL}{endpoint}?{query_string}&signature={signature}"
+        def signed_params():
+            # Timestamp e assinatura renovados a cada tentativa do cliente
+            signed = dict(params, timestamp=int(time.time() * 1000))
+            signed['signature'] = create_binance_signature(urlencode(signed), API_SECRET)
+            return signed
         
         headers = {
             'X-MBX-APIKEY': API_KEY,
             'Content-Type': 'application/json'
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = get_binance_client().get(f"{API_URL}{endpoint}", params=signed_params, headers=headers)
         
         if response.status_code == 200:
             return response.json()
@@ -104,6 +131,14 @@ def update_leverage_brackets_database():
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BRACKETS] ❌ Resposta inválida da API Binance")
             return False
         
+        # FASE 1.5: HASHES DE CONTEÚDO - pula o banco se nada mudou desde o último payload aplicado
+        symbol_hashes = {s['symbol']: content_hash(s.get('brackets', [])) for s in brackets_data if s.get('symbol')}
+        full_reconcile = bracket_hashes.needs_full_reconcile()
+        overall_hash, changed_symbols, removed_symbols = bracket_hashes.diff(symbol_hashes)
+        if not full_reconcile and overall_hash == bracket_hashes.overall:
+            return True
+        changed_set = set(changed_symbols)
+        
         # FASE 2: CONECTAR AO BANCO
         conn = get_database_connection()
         if not conn:
@@ -112,8 +147,17 @@ def update_leverage_brackets_database():
         
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("SELECT symbol, bracket, initial_leverage, notional_cap, notional_floor, maint_margin_ratio, cum FROM exchange_leverage_brackets WHERE corretora = 'binance' ORDER BY symbol, bracket")
-        current_data = cursor.fetchall()
+        # FASE 3: OBTER DADOS DO BANCO (tudo na comparação completa, senão só os símbolos alterados)
+        columns = "symbol, bracket, initial_leverage, notional_cap, notional_floor, maint_margin_ratio, cum"
+        if full_reconcile:
+            cursor.execute(f"SELECT {columns} FROM exchange_leverage_brackets WHERE corretora = 'binance' ORDER BY symbol, bracket")
+            current_data = cursor.fetchall()
+        else:
+            current_data = []
+            for chunk in _chunks(changed_symbols, BULK_BATCH_SIZE):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"SELECT {columns} FROM exchange_leverage_brackets WHERE corretora = 'binance' AND symbol IN ({placeholders}) ORDER BY symbol, bracket", chunk)
+                current_data.extend(cursor.fetchall())
         
         current_brackets = {}
         for row in current_data:
@@ -122,14 +166,16 @@ def update_leverage_brackets_database():
                 current_brackets[symbol] = {}
             current_brackets[symbol][row['bracket']] = row
         
-        # FASE 4: PROCESSAR DIFERENÇAS
+        # FASE 4: PROCESSAR DIFERENÇAS (apenas em memória)
         binance_symbols, updates, inserts, deletes, processed_symbols = set(), 0, 0, 0, 0
+        upsert_rows, delete_keys = [], []
         
         for symbol_data in brackets_data:
             symbol = symbol_data.get('symbol')
             if not symbol: continue
                 
             binance_symbols.add(symbol)
+            if not full_reconcile and symbol not in changed_set: continue
             binance_brackets = {b.get('bracket'): b for b in symbol_data.get('brackets', []) if b.get('bracket') is not None}
             current_symbol_brackets = current_brackets.get(symbol, {})
             
@@ -139,32 +185,68 @@ def update_leverage_brackets_database():
                 values = (symbol, 'binance', bracket_id, bracket_data.get('initialLeverage'), bracket_data.get('notionalCap'), bracket_data.get('notionalFloor'), bracket_data.get('maintMarginRatio'), bracket_data.get('cum', 0))
                 
                 if not current_bracket:
-                    cursor.execute("INSERT INTO exchange_leverage_brackets (symbol, corretora, bracket, initial_leverage, notional_cap, notional_floor, maint_margin_ratio, cum, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())", values)
+                    upsert_rows.append(values)
                     inserts += 1
                 else:
                     needs_update = (current_bracket['initial_leverage'] != bracket_data.get('initialLeverage') or abs(float(current_bracket['notional_cap']) - float(bracket_data.get('notionalCap', 0))) > 0.01 or abs(float(current_bracket['notional_floor']) - float(bracket_data.get('notionalFloor', 0))) > 0.01 or abs(float(current_bracket['maint_margin_ratio']) - float(bracket_data.get('maintMarginRatio', 0))) > 0.000001 or abs(float(current_bracket['cum']) - float(bracket_data.get('cum', 0))) > 0.01)
                     if needs_update:
-                        cursor.execute("UPDATE exchange_leverage_brackets SET initial_leverage = %s, notional_cap = %s, notional_floor = %s, maint_margin_ratio = %s, cum = %s, updated_at = NOW() WHERE symbol = %s AND corretora = %s AND bracket = %s", values[3:] + (symbol, 'binance', bracket_id))
+                        upsert_rows.append(values)
                         updates += 1
             
             # DELETAR
             for bracket_id in current_symbol_brackets:
                 if bracket_id not in binance_brackets:
-                    cursor.execute("DELETE FROM exchange_leverage_brackets WHERE symbol = %s AND corretora = %s AND bracket = %s", (symbol, 'binance', bracket_id))
-                    deletes += 1
+                    delete_keys.append((symbol, bracket_id))
             
             processed_symbols += 1
         
-        # FASE 5: DELETAR símbolos obsoletos
-        obsolete_symbols = set(current_brackets.keys()) - binance_symbols
-        symbols_deleted = 0
-        for obsolete_symbol in obsolete_symbols:
-            cursor.execute("DELETE FROM exchange_leverage_brackets WHERE symbol = %s AND corretora = %s", (obsolete_symbol, 'binance'))
-            deletes += cursor.rowcount
-            symbols_deleted += 1
+        # Na comparação parcial o banco só foi lido para os símbolos alterados; os removidos vêm dos hashes
+        obsolete_symbols = sorted(set(current_brackets.keys()) - binance_symbols) if full_reconcile else removed_symbols
+        symbols_deleted = len(obsolete_symbols)
+        
+        # FASE 5: APLICAR EM LOTE NUMA ÚNICA TRANSAÇÃO
+        if upsert_rows or delete_keys or obsolete_symbols:
+            try:
+                conn.start_transaction()
+                
+                # Inserções e atualizações num único INSERT multi-linha por lote (chave única symbol/corretora/bracket)
+                for chunk in _chunks(upsert_rows, BULK_BATCH_SIZE):
+                    cursor.executemany("""
+                        INSERT INTO exchange_leverage_brackets
+                            (symbol, corretora, bracket, initial_leverage, notional_cap, notional_floor, maint_margin_ratio, cum, updated_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                        ON DUPLICATE KEY UPDATE
+                            initial_leverage = VALUES(initial_leverage),
+                            notional_cap = VALUES(notional_cap),
+                            notional_floor = VALUES(notional_floor),
+                            maint_margin_ratio = VALUES(maint_margin_ratio),
+                            cum = VALUES(cum),
+                            updated_at = NOW()
+                    """, chunk)
+                
+                # Brackets que deixaram de existir em símbolos ainda listados
+                for chunk in _chunks(delete_keys, BULK_BATCH_SIZE):
+                    placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+                    params = [value for key in chunk for value in key]
+                    cursor.execute(f"DELETE FROM exchange_leverage_brackets WHERE corretora = 'binance' AND (symbol, bracket) IN ({placeholders})", params)
+                    deletes += cursor.rowcount
+                
+                # FASE 6: DELETAR símbolos obsoletos
+                for chunk in _chunks(obsolete_symbols, BULK_BATCH_SIZE):
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(f"DELETE FROM exchange_leverage_brackets WHERE corretora = 'binance' AND symbol IN ({placeholders})", chunk)
+                    deletes += cursor.rowcount
+                
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                cursor.close()
+                conn.close()
+                raise
+        
+        bracket_hashes.save(symbol_hashes, full_reconcile)
         
-        # FASE 6: CONFIRMAR E REPORTAR
-        conn.commit()
+        # FASE 7: REPORTAR
         cursor.close()
         conn.close()
         
@@ -179,6 +261,7 @@ def update_leverage_brackets_database():
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BRACKETS]   - Símbolos removidos: {symbols_deleted}")
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BRACKETS] 🎯 Total de mudanças aplicadas: {total_changes}")
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BRACKETS] ✅ Processo de atualização de brackets bem-sucedido.")
+            _notify_brackets_listeners()
         
         return True
         
@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 import pathlib
 import warnings
 import logging
+from payload_hashes import PayloadHashStore, content_hash
+from binance_http import get_binance_client
 
 # Carregar variáveis de ambiente
 env_path = pathlib.Path(__file__).parents[1] / 'config' / '.env'
@@ -47,7 +49,7 @@ def make_binance_request(endpoint, params=None):
     """Faz requisição pública para a API Binance."""
     try:
         url = f"{API_URL}{endpoint}"
-        response = requests.get(url, params=params, timeout=30)
+        response = get_binance_client().get(url, params=params)
         
         if response.status_code == 200:
             return response.json()
@@ -62,8 +64,101 @@ def make_binance_request(endpoint, params=None):
         print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BINANCE] Erro na requisição: {e}")
         return None
 
+BULK_BATCH_SIZE = 500  # Linhas por comando nas operações em lote
+
+# Funções chamadas sempre que uma atualização altera símbolos ou filtros no banco
+_exchange_info_listeners = []
+
+def register_exchange_info_listener(callback):
+    """
+    Registra uma função (sem argumentos) chamada após uma atualização que
+    alterou símbolos ou filtros, ex.: para recarregar um registro em memória.
+    """
+    _exchange_info_listeners.append(callback)
+
+def _notify_exchange_info_listeners():
+    for callback in _exchange_info_listeners:
+        try:
+            callback()
+        except Exception as e:
+            print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [EXCHANGE-INFO] ❌ Erro ao notificar atualização de símbolos: {e}")
+
+# Colunas sincronizadas, na ordem das tuplas normalizadas
+SYMBOL_COLUMNS = ('status', 'pair', 'contract_type', 'base_asset', 'quote_asset', 'margin_asset',
+                  'price_precision', 'quantity_precision', 'base_asset_precision', 'quote_precision',
+                  'onboard_date', 'liquidation_fee', 'market_take_bound')
+FILTER_COLUMNS = ('min_price', 'max_price', 'tick_size', 'min_qty', 'max_qty', 'step_size', 'min_notional',
+                  'multiplier_up', 'multiplier_down', 'multiplier_decimal', 'limit_orders', 'limit_algo_orders')
+_INT_COLUMNS = {'price_precision', 'quantity_precision', 'base_asset_precision', 'quote_precision',
+                'onboard_date', 'multiplier_decimal', 'limit_orders', 'limit_algo_orders'}
+_DECIMAL_COLUMNS = {'liquidation_fee': 5, 'market_take_bound': 5}  # Escala das colunas decimal(10,5)
+
+def _normalize_value(column, value):
+    """Converte um valor (da API ou do banco) para a forma usada na comparação."""
+    if value is None:
+        return None
+    if column in _INT_COLUMNS:
+        return int(value)
+    if column in _DECIMAL_COLUMNS:
+        return round(float(value), _DECIMAL_COLUMNS[column])
+    return str(value)
+
+def _normalize_row(columns, row):
+    return tuple(_normalize_value(column, row.get(column)) for column in columns)
+
+def _api_symbol_values(symbol_data):
+    """Campos de exchange_symbols a partir de um símbolo da API."""
+    return {
+        'status': symbol_data.get('status'),
+        'pair': symbol_data.get('pair'),
+        'contract_type': symbol_data.get('contractType'),
+        'base_asset': symbol_data.get('baseAsset'),
+        'quote_asset': symbol_data.get('quoteAsset'),
+        'margin_asset': symbol_data.get('marginAsset'),
+        'price_precision': int(symbol_data.get('pricePrecision', 0)),
+        'quantity_precision': int(symbol_data.get('quantityPrecision', 0)),
+        'base_asset_precision': int(symbol_data.get('baseAssetPrecision', 0)),
+        'quote_precision': int(symbol_data.get('quotePrecision', 0)),
+        'onboard_date': int(symbol_data.get('onboardDate', 0)) if symbol_data.get('onboardDate') else None,
+        'liquidation_fee': float(symbol_data.get('liquidationFee', 0)) if symbol_data.get('liquidationFee') else None,
+        'market_take_bound': float(symbol_data.get('marketTakeBound', 0)) if symbol_data.get('marketTakeBound') else None
+    }
+
+def _api_filter_values(f):
+    """Campos de exchange_filters a partir de um filtro da API."""
+    filter_type = f.get('filterType')
+    return {
+        'min_price': f.get('minPrice'),
+        'max_price': f.get('maxPrice'),
+        'tick_size': f.get('tickSize'),
+        'min_qty': f.get('minQty'),
+        'max_qty': f.get('maxQty'),
+        'step_size': f.get('stepSize'),
+        'min_notional': f.get('notional'),
+        'multiplier_up': f.get('multiplierUp'),
+        'multiplier_down': f.get('multiplierDown'),
+        'multiplier_decimal': f.get('multiplierDecimal'),
+        'limit_orders': f.get('limit') if filter_type == 'MAX_NUM_ORDERS' else None,
+        'limit_algo_orders': f.get('limit') if filter_type == 'MAX_NUM_ALGO_ORDERS' else None
+    }
+
+def _chunks(items, size):
+    """Divide uma lista em fatias de no máximo size itens."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# Hashes do último exchangeInfo aplicado, por exchange (persistidos em disco)
+_info_hashes = {}
+
+def _get_info_hashes(exchange_name):
+    if exchange_name not in _info_hashes:
+        _info_hashes[exchange_name] = PayloadHashStore(f'exchange_info_{exchange_name}')
+    return _info_hashes[exchange_name]
+
 def update_exchange_info_database(exchange_name):
     """Atualiza as informações de símbolos e filtros no banco de dados para uma exchange específica."""
+    conn = None
+    cursor = None
     try:
         # FASE 1: OBTER DADOS DA BINANCE
         info_data = make_binance_request('/v1/exchangeInfo')
@@ -72,7 +167,31 @@ def update_exchange_info_database(exchange_name):
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [EXCHANGE-INFO] ❌ Resposta inválida da API Binance")
             return False
         
-        api_symbols_map = {s['symbol']: s for s in info_data['symbols']}
+        # Linhas da API normalizadas em tuplas comparáveis
+        api_symbols = {}
+        api_filters = {}
+        for symbol_data in info_data['symbols']:
+            symbol = symbol_data['symbol']
+            api_symbols[symbol] = _normalize_row(SYMBOL_COLUMNS, _api_symbol_values(symbol_data))
+            for f in symbol_data.get('filters', []):
+                if f.get('filterType'):
+                    api_filters[(symbol, f['filterType'])] = _normalize_row(FILTER_COLUMNS, _api_filter_values(f))
+
+        # FASE 1.5: HASHES DE CONTEÚDO - pula o banco se nada mudou desde o último payload aplicado
+        symbol_filters = {}
+        for (symbol, filter_type), values in api_filters.items():
+            symbol_filters.setdefault(symbol, []).append((filter_type, values))
+        symbol_hashes = {symbol: content_hash([values, sorted(symbol_filters.get(symbol, []))])
+                         for symbol, values in api_symbols.items()}
+        info_hashes = _get_info_hashes(exchange_name)
+        full_reconcile = info_hashes.needs_full_reconcile()
+        overall_hash, changed_symbols, removed_symbols = info_hashes.diff(symbol_hashes)
+        if not full_reconcile and overall_hash == info_hashes.overall:
+            return True
+        if not full_reconcile:
+            # Comparação parcial: só os símbolos alterados entram no diff
+            api_symbols = {symbol: api_symbols[symbol] for symbol in changed_symbols}
+            api_filters = {key: values for key, values in api_filters.items() if key[0] in api_symbols}
 
         # FASE 2: CONECTAR AO BANCO
         conn = get_database_connection()
@@ -81,162 +200,102 @@ def update_exchange_info_database(exchange_name):
         
         cursor = conn.cursor(dictionary=True)
         
-        # FASE 3: OBTER DADOS DO BANCO (TODOS OS CAMPOS RELEVANTES)
-        cursor.execute("""
-        SELECT id, symbol, status, pair, contract_type, base_asset, quote_asset, margin_asset,
-               price_precision, quantity_precision, base_asset_precision, quote_precision,
-               onboard_date, liquidation_fee, market_take_bound
-        FROM exchange_symbols WHERE exchange = %s
-        """, (exchange_name,))
-        db_symbols_map = {row['symbol']: row for row in cursor.fetchall()}
-        
-        # FASE 3.5: OBTER FILTROS EXISTENTES DO BANCO
-        cursor.execute("""
-        SELECT es.symbol, ef.filter_type, ef.min_price, ef.max_price, ef.tick_size, 
-               ef.min_qty, ef.max_qty, ef.step_size, ef.min_notional,
-               ef.multiplier_up, ef.multiplier_down, ef.multiplier_decimal,
-               ef.limit_orders, ef.limit_algo_orders
-        FROM exchange_symbols es
-        JOIN exchange_filters ef ON es.id = ef.symbol_id
-        WHERE es.exchange = %s
-        """, (exchange_name,))
+        # FASE 3: OBTER DADOS DO BANCO (tudo na comparação completa, senão só os símbolos alterados)
+        if full_reconcile:
+            scopes = [("", ())]
+        else:
+            scopes = [(f" AND es.symbol IN ({', '.join(['%s'] * len(chunk))})", tuple(chunk))
+                      for chunk in _chunks(changed_symbols, BULK_BATCH_SIZE)]
+        db_symbol_ids = {}
+        db_symbols = {}
+        db_filters = {}
+        for scope_sql, scope_params in scopes:
+            cursor.execute(f"""
+            SELECT es.id, es.symbol, {', '.join('es.' + c for c in SYMBOL_COLUMNS)}
+            FROM exchange_symbols es WHERE es.exchange = %s{scope_sql}
+            """, (exchange_name, *scope_params))
+            for row in cursor.fetchall():
+                db_symbol_ids[row['symbol']] = row['id']
+                db_symbols[row['symbol']] = _normalize_row(SYMBOL_COLUMNS, row)
+            
+            # FASE 3.5: OBTER FILTROS EXISTENTES DO BANCO
+            cursor.execute(f"""
+            SELECT es.symbol, ef.filter_type, {', '.join('ef.' + c for c in FILTER_COLUMNS)}
+            FROM exchange_symbols es
+            JOIN exchange_filters ef ON es.id = ef.symbol_id
+            WHERE es.exchange = %s{scope_sql}
+            """, (exchange_name, *scope_params))
+            db_filters.update({(row['symbol'], row['filter_type']): _normalize_row(FILTER_COLUMNS, row) for row in cursor.fetchall()})
         
-        db_filters_map = {}
-        for row in cursor.fetchall():
-            symbol = row['symbol']
-            if symbol not in db_filters_map:
-                db_filters_map[symbol] = {}
-            db_filters_map[symbol][row['filter_type']] = row
+        # FASE 4: DIFERENÇAS POR CONJUNTOS (uma passada, sem tocar no banco)
+        symbol_upserts = [symbol for symbol, values in api_symbols.items() if db_symbols.get(symbol) != values]
+        inserts = sum(1 for symbol in symbol_upserts if symbol not in db_symbols)
+        updates = len(symbol_upserts) - inserts
+        # Na comparação parcial o banco só foi lido para os símbolos alterados; os removidos vêm dos hashes
+        obsolete_symbols = sorted(db_symbols.keys() - api_symbols.keys()) if full_reconcile else removed_symbols
         
-        # FASE 4: PROCESSAR DIFERENÇAS
-        inserts, updates, deletes = 0, 0, 0
-        filter_inserts, filter_updates, filter_deletes = 0, 0, 0
+        filter_upserts = [key for key, values in api_filters.items() if db_filters.get(key) != values]
+        filter_inserts = sum(1 for key in filter_upserts if key not in db_filters)
+        filter_updates = len(filter_upserts) - filter_inserts
+        # Filtros de símbolos obsoletos saem junto com o símbolo (ON DELETE CASCADE)
+        filter_delete_keys = [key for key in db_filters.keys() - api_filters.keys() if key[0] in api_symbols]
+        filter_deletes = len(filter_delete_keys)
+        deletes = 0
         
-        for symbol, symbol_data in api_symbols_map.items():
-            # ✅ NORMALIZAR VALORES PARA COMPARAÇÃO CONSISTENTE
-            symbol_values = {
-                'status': symbol_data.get('status'),
-                'pair': symbol_data.get('pair'),
-                'contract_type': symbol_data.get('contractType'),
-                'base_asset': symbol_data.get('baseAsset'),
-                'quote_asset': symbol_data.get('quoteAsset'),
-                'margin_asset': symbol_data.get('marginAsset'),
-                'price_precision': int(symbol_data.get('pricePrecision', 0)),
-                'quantity_precision': int(symbol_data.get('quantityPrecision', 0)),
-                'base_asset_precision': int(symbol_data.get('baseAssetPrecision', 0)),
-                'quote_precision': int(symbol_data.get('quotePrecision', 0)),
-                'onboard_date': int(symbol_data.get('onboardDate', 0)) if symbol_data.get('onboardDate') else None,
-                'liquidation_fee': float(symbol_data.get('liquidationFee', 0)) if symbol_data.get('liquidationFee') else None,
-                'market_take_bound': float(symbol_data.get('marketTakeBound', 0)) if symbol_data.get('marketTakeBound') else None
-            }
-
-            if symbol not in db_symbols_map:
-                # INSERIR novo símbolo
-                cols = ', '.join(symbol_values.keys())
-                vals = ', '.join(['%s'] * len(symbol_values))
-                sql = f"INSERT INTO exchange_symbols (exchange, symbol, {cols}) VALUES (%s, %s, {vals})"
-                cursor.execute(sql, (exchange_name, symbol, *symbol_values.values()))
-                symbol_id = cursor.lastrowid
-                inserts += 1
-            else:
-                # ✅ COMPARAÇÃO MELHORADA - NORMALIZAR ANTES DE COMPARAR
-                symbol_id = db_symbols_map[symbol]['id']
-                db_row = db_symbols_map[symbol]
-                needs_update = False
+        # FASE 5: APLICAR EM LOTE NUMA ÚNICA TRANSAÇÃO
+        if symbol_upserts or obsolete_symbols or filter_upserts or filter_delete_keys:
+            try:
+                conn.start_transaction()
                 
-                for key, new_value in symbol_values.items():
-                    db_value = db_row.get(key)
-                    
-                    # Normalizar valores para comparação
-                    if isinstance(new_value, (int, float)) and db_value is not None:
-                        db_value = type(new_value)(db_value)
-                    elif new_value is None and db_value is None:
-                        continue  # Ambos são None, não há diferença
-                    elif str(new_value) != str(db_value):
-                        needs_update = True
-                        break
+                if symbol_upserts:
+                    cols = ', '.join(SYMBOL_COLUMNS)
+                    vals = ', '.join(['%s'] * len(SYMBOL_COLUMNS))
+                    update_cols = ', '.join(f"{c} = VALUES({c})" for c in SYMBOL_COLUMNS)
+                    sql = f"INSERT INTO exchange_symbols (exchange, symbol, {cols}) VALUES (%s, %s, {vals}) ON DUPLICATE KEY UPDATE {update_cols}"
+                    for chunk in _chunks(symbol_upserts, BULK_BATCH_SIZE):
+                        cursor.executemany(sql, [(exchange_name, symbol, *api_symbols[symbol]) for symbol in chunk])
                 
-                if needs_update:
-                    update_cols = ', '.join([f"{key} = %s" for key in symbol_values.keys()])
-                    sql = f"UPDATE exchange_symbols SET {update_cols} WHERE id = %s AND exchange = %s"
-                    cursor.execute(sql, (*symbol_values.values(), symbol_id, exchange_name))
-                    updates += 1
-
-            # ✅ SINCRONIZAR FILTROS DE FORMA INTELIGENTE (SÓ ATUALIZA O QUE MUDOU)
-            api_filters = symbol_data.get('filters', [])
-            db_filters = db_filters_map.get(symbol, {})
-            
-            # Mapear filtros da API
-            api_filters_map = {}
-            for f in api_filters:
-                filter_type = f.get('filterType')
-                if filter_type:
-                    api_filters_map[filter_type] = {
-                        'filter_type': filter_type,
-                        'min_price': f.get('minPrice'),
-                        'max_price': f.get('maxPrice'),
-                        'tick_size': f.get('tickSize'),
-                        'min_qty': f.get('minQty'),
-                        'max_qty': f.get('maxQty'),
-                        'step_size': f.get('stepSize'),
-                        'min_notional': f.get('notional'),
-                        'multiplier_up': f.get('multiplierUp'),
-                        'multiplier_down': f.get('multiplierDown'),
-                        'multiplier_decimal': f.get('multiplierDecimal'),
-                        'limit_orders': f.get('limit') if filter_type == 'MAX_NUM_ORDERS' else None,
-                        'limit_algo_orders': f.get('limit') if filter_type == 'MAX_NUM_ALGO_ORDERS' else None
-                    }
-            
-            # Comparar filtros existentes com novos
-            for filter_type, api_filter in api_filters_map.items():
-                db_filter = db_filters.get(filter_type)
+                # IDs dos símbolos recém-inseridos, necessários para os filtros
+                new_symbols = [symbol for symbol in symbol_upserts if symbol not in db_symbol_ids]
+                for chunk in _chunks(new_symbols, BULK_BATCH_SIZE):
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    cursor.execute(f"SELECT id, symbol FROM exchange_symbols WHERE exchange = %s AND symbol IN ({placeholders})",
+                                   (exchange_name, *chunk))
+                    db_symbol_ids.update({row['symbol']: row['id'] for row in cursor.fetchall()})
                 
-                if not db_filter:
-                    # INSERIR novo filtro
-                    filter_values = {**api_filter, 'symbol_id': symbol_id}
-                    cols = ', '.join(filter_values.keys())
-                    vals = ', '.join(['%s'] * len(filter_values))
-                    sql = f"INSERT INTO exchange_filters ({cols}) VALUES ({vals})"
-                    cursor.execute(sql, tuple(filter_values.values()))
-                    filter_inserts += 1
-                else:
-                    # VERIFICAR se filtro precisa ser atualizado
-                    needs_filter_update = False
-                    for key, new_val in api_filter.items():
-                        if key == 'filter_type':
-                            continue  # Já sabemos que são iguais
-                        db_val = db_filter.get(key)
-                        if str(new_val) != str(db_val):
-                            needs_filter_update = True
-                            break
-                    
-                    if needs_filter_update:
-                        # ATUALIZAR filtro existente
-                        update_cols = ', '.join([f"{key} = %s" for key in api_filter.keys() if key != 'filter_type'])
-                        update_values = [v for k, v in api_filter.items() if k != 'filter_type']
-                        sql = f"UPDATE exchange_filters SET {update_cols} WHERE symbol_id = %s AND filter_type = %s"
-                        cursor.execute(sql, (*update_values, symbol_id, filter_type))
-                        filter_updates += 1
-            
-            # DELETAR filtros obsoletos
-            for filter_type in db_filters.keys():
-                if filter_type not in api_filters_map:
-                    cursor.execute("DELETE FROM exchange_filters WHERE symbol_id = %s AND filter_type = %s", (symbol_id, filter_type))
-                    filter_deletes += 1
-
-        # FASE 5: DELETAR símbolos obsoletos (DA EXCHANGE ATUAL)
-        obsolete_symbols = set(db_symbols_map.keys()) - set(api_symbols_map.keys())
-        if obsolete_symbols:
-            placeholders = ', '.join(['%s'] * len(obsolete_symbols))
-            sql = f"DELETE FROM exchange_symbols WHERE exchange = %s AND symbol IN ({placeholders})"
-            params = [exchange_name] + list(obsolete_symbols)
-            cursor.execute(sql, tuple(params))
-            deletes = cursor.rowcount
+                if filter_upserts:
+                    cols = ', '.join(FILTER_COLUMNS)
+                    vals = ', '.join(['%s'] * len(FILTER_COLUMNS))
+                    update_cols = ', '.join(f"{c} = VALUES({c})" for c in FILTER_COLUMNS)
+                    sql = f"INSERT INTO exchange_filters (symbol_id, filter_type, {cols}) VALUES (%s, %s, {vals}) ON DUPLICATE KEY UPDATE {update_cols}"
+                    for chunk in _chunks(filter_upserts, BULK_BATCH_SIZE):
+                        cursor.executemany(sql, [(db_symbol_ids[symbol], filter_type, *api_filters[(symbol, filter_type)])
+                                                 for symbol, filter_type in chunk])
+                
+                # DELETAR filtros obsoletos
+                for chunk in _chunks(filter_delete_keys, BULK_BATCH_SIZE):
+                    placeholders = ', '.join(['(%s, %s)'] * len(chunk))
+                    params = [value for symbol, filter_type in chunk for value in (db_symbol_ids[symbol], filter_type)]
+                    cursor.execute(f"DELETE FROM exchange_filters WHERE (symbol_id, filter_type) IN ({placeholders})", params)
+                
+                # DELETAR símbolos obsoletos (DA EXCHANGE ATUAL)
+                for chunk in _chunks(obsolete_symbols, BULK_BATCH_SIZE):
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    cursor.execute(f"DELETE FROM exchange_symbols WHERE exchange = %s AND symbol IN ({placeholders})",
+                                   (exchange_name, *chunk))
+                    deletes += cursor.rowcount
+                
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        info_hashes.save(symbol_hashes, full_reconcile)
         
-        # FASE 6: CONFIRMAR E REPORTAR
-        conn.commit()
+        # FASE 6: REPORTAR (conexão liberada antes de avisar os listeners)
         cursor.close()
         conn.close()
+        cursor = conn = None
 
         total_changes = inserts + updates + deletes + filter_inserts + filter_updates + filter_deletes
         
@@ -250,15 +309,22 @@ def update_exchange_info_database(exchange_name):
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [EXCHANGE-INFO]   - Filtros atualizados: {filter_updates}")
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [EXCHANGE-INFO]   - Filtros removidos: {filter_deletes}")
             print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [EXCHANGE-INFO] 🎯 Total de mudanças aplicadas: {total_changes}")
+            _notify_exchange_info_listeners()
         
         return True
         
     except Exception as e:
         print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [EXCHANGE-INFO] ❌ Erro crítico na atualização: {e}")
         print(f"[{datetime.datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [EXCHANGE-INFO] Stack trace: {traceback.format_exc()}")
-        if 'conn' in locals() and conn.is_connected(): 
+        if conn is not None and conn.is_connected():
             conn.rollback()
         return False
+    finally:
+        # Cursor e conexão sempre fechados, inclusive quando o lote falha e é desfeito
+        if cursor is not None:
+            cursor.close()
+        if conn is not None:
+            conn.close()
 
 # Bloco para execução manual do script
 if __name__ == '__main__':
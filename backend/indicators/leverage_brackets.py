@@ -0,0 +1,230 @@
+"""
+Índice em memória dos brackets de alavancagem (exchange_leverage_brackets).
+
+A tabela é carregada uma vez e mantida no processo. Uma recarga monta um
+dicionário novo e só então troca a referência, de modo que leitores
+concorrentes sempre veem o índice antigo ou o novo por completo.
+
+Se a carga falhar (ou vier vazia), a falha é lembrada: consultas dentro de
+retry_backoff segundos respondem vazio sem tentar de novo, e com
+lazy_load=False as consultas nunca carregam, deixando a recarga para quem
+chama refresh() (ex.: a tarefa periódica do webhook).
+
+Cada símbolo também ganha uma BracketTable, que responde "qual a maior
+alavancagem permitida para este valor de ordem" com uma busca binária.
+"""
+import math
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+RETRY_BACKOFF_SECONDS = 60  # Espera entre tentativas de carga após uma falha
+
+# Distância relativa a um extremo de bracket abaixo da qual a elegibilidade é testada direto
+BREAKPOINT_REL_TOL = 1e-9
+
+
+class BracketTable:
+    """
+    Brackets de um símbolo em arrays ordenados para consulta por bisect.
+
+    Um bracket com alavancagem L, piso F e teto C é elegível para uma ordem de
+    valor V (margem) quando F <= V * L < C, ou seja, quando V está em
+    [F / L, C / L). Os extremos de todos os brackets dividem o eixo de V em
+    segmentos; para cada segmento guarda-se a maior alavancagem elegível.
+    """
+    __slots__ = ("floors", "caps", "leverages", "breakpoints", "segment_leverage", "_arrays")
+
+    def __init__(self, brackets: List[Dict]):
+        rows = sorted(
+            (float(b.get("notionalFloor", 0)), float(b.get("notionalCap", float('inf'))), int(b["initialLeverage"]))
+            for b in brackets if "initialLeverage" in b
+        )
+        self.floors = [r[0] for r in rows]
+        self.caps = [r[1] for r in rows]
+        self.leverages = [r[2] for r in rows]
+
+        # Intervalo de valores de ordem em que cada bracket é elegível
+        intervals = [(floor / lev, cap / lev, lev) for floor, cap, lev in rows if lev > 0]
+        self.breakpoints = sorted({v for start, end, _ in intervals for v in (start, end)})
+
+        # segment_leverage[i] vale para breakpoints[i-1] <= V < breakpoints[i]; 0 = nenhum elegível
+        self.segment_leverage = [0] * (len(self.breakpoints) + 1)
+        for i in range(1, len(self.breakpoints)):
+            lo, hi = self.breakpoints[i - 1], self.breakpoints[i]
+            self.segment_leverage[i] = max((lev for start, end, lev in intervals if start <= lo and end >= hi), default=0)
+        self._arrays = None
+
+    def _scan(self, order_value: float) -> int:
+        """Teste direto F <= V * L < C em todos os brackets."""
+        eligible = [lev for floor, cap, lev in zip(self.floors, self.caps, self.leverages)
+                    if floor <= order_value * lev < cap]
+        return max(eligible, default=0)
+
+    def _near_breakpoint(self, order_value: float, i: int) -> bool:
+        # F / L arredondado pode cair do outro lado de V * L >= F; perto de um extremo, testa direto
+        tol = BREAKPOINT_REL_TOL
+        return ((i > 0 and order_value - self.breakpoints[i - 1] <= tol * abs(self.breakpoints[i - 1]))
+                or (i < len(self.breakpoints) and math.isfinite(self.breakpoints[i])
+                    and self.breakpoints[i] - order_value <= tol * abs(self.breakpoints[i])))
+
+    def max_leverage(self, order_value: float) -> int:
+        """Maior alavancagem elegível para o valor da ordem (0 se nenhum bracket for elegível)."""
+        i = bisect_right(self.breakpoints, order_value)
+        if self._near_breakpoint(order_value, i):
+            return self._scan(order_value)
+        return self.segment_leverage[i]
+
+    def max_leverage_batch(self, order_values):
+        """Versão vetorizada de max_leverage para um array de valores de ordem."""
+        # numpy só é importado aqui para não pesar na inicialização do divap.py
+        import numpy as np
+        if self._arrays is None:
+            self._arrays = (np.asarray(self.breakpoints + [np.inf], dtype=np.float64),
+                            np.asarray(self.segment_leverage, dtype=np.int64))
+        breakpoints, segment_leverage = self._arrays
+        order_values = np.asarray(order_values, dtype=np.float64)
+        idx = np.searchsorted(breakpoints[:-1], order_values, side='right')
+        result = segment_leverage[idx]
+
+        # Mesmo tratamento de _near_breakpoint: valores colados a um extremo são testados direto
+        below = breakpoints[np.maximum(idx - 1, 0)]
+        above = breakpoints[idx]
+        with np.errstate(invalid='ignore'):
+            near = (((idx > 0) & (order_values - below <= BREAKPOINT_REL_TOL * np.abs(below)))
+                    | (np.isfinite(above) & (above - order_values <= BREAKPOINT_REL_TOL * np.abs(above))))
+        for j in np.flatnonzero(near):
+            result[j] = self._scan(float(order_values[j]))
+        return result
+
+
+class LeverageBracketIndex:
+    def __init__(self, loader: Callable[[], Dict[str, List[Dict]]], lazy_load: bool = True,
+                 retry_backoff: float = RETRY_BACKOFF_SECONDS):
+        """
+        Args:
+            loader: Função que retorna {símbolo: [brackets]} com todos os símbolos
+                    (ex.: get_leverage_brackets_from_database sem argumentos)
+            lazy_load: Se True, a primeira consulta sem índice tenta carregá-lo
+            retry_backoff: Segundos sem nova tentativa de carga após uma falha
+        """
+        self._loader = loader
+        self.lazy_load = lazy_load
+        self.retry_backoff = retry_backoff
+        self._snapshot: Optional[Tuple[Dict[str, List[Dict]], Dict[str, BracketTable]]] = None
+        self._refresh_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+
+    def refresh(self) -> bool:
+        """Recarrega a tabela inteira e troca o índice. Mantém o anterior se a carga vier vazia."""
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> bool:
+        try:
+            brackets = self._loader()
+        except Exception:
+            self.last_failure_at = time.monotonic()
+            raise
+        if not brackets:
+            self.last_failure_at = time.monotonic()
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BRACKETS] ⚠️ Carga vazia, mantendo índice de brackets anterior")
+            return False
+        tables = {symbol: BracketTable(symbol_brackets) for symbol, symbol_brackets in brackets.items()}
+        # Uma única atribuição troca brackets e tabelas juntos
+        self._snapshot = (brackets, tables)
+        self.loaded_at = time.time()
+        self.last_failure_at = None
+        return True
+
+    def _retry_due(self) -> bool:
+        return self.last_failure_at is None or time.monotonic() - self.last_failure_at >= self.retry_backoff
+
+    def _ensure_loaded(self) -> Tuple[Dict[str, List[Dict]], Dict[str, BracketTable]]:
+        snapshot = self._snapshot
+        if snapshot is None and self.lazy_load and self._retry_due():
+            # Sem esperar: se outra thread já está carregando, responde vazio
+            if self._refresh_lock.acquire(blocking=False):
+                try:
+                    if self._snapshot is None and self._retry_due():
+                        self._refresh_locked()
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [BRACKETS] ⚠️ Falha ao carregar índice de brackets, nova tentativa em {self.retry_backoff:.0f}s: {e}")
+                finally:
+                    self._refresh_lock.release()
+            snapshot = self._snapshot
+        return snapshot or ({}, {})
+
+    def _resolve_symbol(self, symbol: str, brackets: Dict) -> Optional[str]:
+        """
+        Símbolo cujos brackets valem para symbol. Sem dados para ele, tenta o
+        símbolo sem ".P", o símbolo base (ex.: BTCUSDT de BTCUSDT_210625) e,
+        por fim, BTCUSDT como referência.
+        """
+        if symbol in brackets:
+            return symbol
+
+        cleaned_symbol = symbol[:-2] if symbol.endswith(".P") else symbol
+        if cleaned_symbol in brackets:
+            return cleaned_symbol
+
+        base_symbol = cleaned_symbol.split('_')[0]
+        if base_symbol in brackets:
+            print(f"[INFO] Usando brackets de {base_symbol} para {symbol}")
+            return base_symbol
+
+        if "BTCUSDT" in brackets:
+            print(f"[INFO] Usando brackets de BTCUSDT como referência para {symbol}")
+            return "BTCUSDT"
+
+        return None
+
+    def get(self, symbol: str) -> List[Dict]:
+        """Retorna os brackets do símbolo (com os mesmos substitutos de _resolve_symbol)."""
+        brackets, _ = self._ensure_loaded()
+        resolved = self._resolve_symbol(symbol, brackets)
+        return brackets[resolved] if resolved else []
+
+    def get_all(self) -> Dict[str, List[Dict]]:
+        return self._ensure_loaded()[0]
+
+    def get_table(self, symbol: str) -> Optional[BracketTable]:
+        brackets, tables = self._ensure_loaded()
+        resolved = self._resolve_symbol(symbol, brackets)
+        return tables[resolved] if resolved else None
+
+    def max_leverage(self, symbol: str, order_value: float) -> int:
+        """Maior alavancagem elegível para a ordem no símbolo (0 se nenhuma)."""
+        table = self.get_table(symbol)
+        return table.max_leverage(order_value) if table else 0
+
+    def max_leverage_batch(self, symbols: Sequence[str], order_values: Sequence[float]):
+        """
+        Maior alavancagem elegível para cada par (símbolo, valor da ordem).
+
+        Args:
+            symbols: Símbolo de cada par
+            order_values: Valor da ordem (margem) de cada par
+
+        Returns:
+            Array numpy de int64 alinhado com os pares (0 quando não há bracket elegível)
+        """
+        import numpy as np
+        symbols = np.asarray(symbols)
+        order_values = np.asarray(order_values, dtype=np.float64)
+        result = np.zeros(len(order_values), dtype=np.int64)
+
+        unique_symbols, inverse = np.unique(symbols, return_inverse=True)
+        for i, symbol in enumerate(unique_symbols):
+            table = self.get_table(str(symbol))
+            if table is None:
+                continue
+            mask = inverse == i
+            result[mask] = table.max_leverage_batch(order_values[mask])
+        return result
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0]) if self._snapshot else 0
@@ -0,0 +1,96 @@
+"""
+Hashes de conteúdo dos payloads da Binance já aplicados no banco.
+
+Cada atualizador (brackets, exchange info) guarda o hash canônico de cada
+símbolo e um hash geral do último payload aplicado com sucesso. Na execução
+seguinte, símbolos com o mesmo hash são pulados e, se o hash geral não mudou,
+o banco nem é consultado. Os hashes ficam em disco para sobreviver a
+reinícios.
+
+Como o banco pode ser alterado por fora, de tempos em tempos
+(FULL_RECONCILE_SECONDS) o atualizador deve fazer a comparação completa
+contra o banco, ignorando os hashes.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+HASH_STORE_DIR = os.getenv('PAYLOAD_HASH_DIR', str(pathlib.Path(__file__).parent / 'data' / 'hashes'))
+FULL_RECONCILE_SECONDS = int(os.getenv('PAYLOAD_FULL_RECONCILE_SECONDS', 24 * 3600))
+
+
+def content_hash(value) -> str:
+    """SHA-256 da serialização JSON canônica (chaves ordenadas, sem espaços)."""
+    payload = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PayloadHashStore:
+    def __init__(self, name: str, directory: str = HASH_STORE_DIR,
+                 full_reconcile_seconds: float = FULL_RECONCILE_SECONDS):
+        """
+        Args:
+            name: Nome do arquivo de hashes (ex.: 'leverage_brackets_binance')
+            directory: Diretório onde o arquivo é gravado
+            full_reconcile_seconds: Intervalo máximo entre comparações completas com o banco
+        """
+        self.path = pathlib.Path(directory) / f"{name}.json"
+        self.full_reconcile_seconds = full_reconcile_seconds
+        self.overall: Optional[str] = None
+        self.symbols: Dict[str, str] = {}
+        self.reconciled_at: Optional[float] = None
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.overall = state.get('overall')
+            self.symbols = dict(state.get('symbols', {}))
+            self.reconciled_at = state.get('reconciled_at')
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            # Arquivo corrompido: começa do zero e força a comparação completa
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [HASHES] ⚠️ Ignorando {self.path.name}: {e}")
+
+    @staticmethod
+    def overall_hash(symbol_hashes: Dict[str, str]) -> str:
+        return content_hash(symbol_hashes)
+
+    def needs_full_reconcile(self) -> bool:
+        """True se não há hashes salvos ou se a última comparação completa é antiga demais."""
+        return (self.overall is None or self.reconciled_at is None
+                or time.time() - self.reconciled_at >= self.full_reconcile_seconds)
+
+    def diff(self, symbol_hashes: Dict[str, str]) -> Tuple[str, List[str], List[str]]:
+        """
+        Compara os hashes do payload atual com os salvos.
+
+        Returns:
+            (hash geral atual, símbolos novos ou alterados, símbolos que sumiram do payload)
+        """
+        changed = sorted(symbol for symbol, h in symbol_hashes.items() if self.symbols.get(symbol) != h)
+        removed = sorted(self.symbols.keys() - symbol_hashes.keys())
+        return self.overall_hash(symbol_hashes), changed, removed
+
+    def save(self, symbol_hashes: Dict[str, str], full_reconcile: bool) -> None:
+        """Grava os hashes do payload aplicado. Chamar só depois do commit no banco."""
+        self.symbols = dict(symbol_hashes)
+        self.overall = self.overall_hash(symbol_hashes)
+        if full_reconcile:
+            self.reconciled_at = time.time()
+        state = {'overall': self.overall, 'reconciled_at': self.reconciled_at, 'symbols': self.symbols}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Grava num temporário e troca, para nunca deixar um arquivo pela metade
+            tmp_path = self.path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [HASHES] ⚠️ Erro ao gravar {self.path.name}: {e}")
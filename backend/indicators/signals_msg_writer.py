@@ -0,0 +1,235 @@
+"""
+Gravação em segundo plano (write-behind) das mensagens na tabela signals_msg.
+
+save_message_to_database só enfileira a linha e retorna; uma thread grava o
+buffer com um único executemany quando ele atinge batch_size linhas ou
+quando passa flush_interval segundos desde a primeira linha pendente.
+
+Se o MySQL estiver indisponível, o lote vai para um arquivo local (uma linha
+JSON por mensagem, com fsync) e é regravado no banco no próximo flush bem
+sucedido ou na próxima inicialização. close() grava o que restar no buffer.
+
+Um lote recusado pelo próprio banco (IntegrityError/DataError, ex.: signal_id
+inexistente) é regravado linha a linha; as linhas que continuarem sendo
+recusadas vão para um arquivo .rejected ao lado do spill, em vez de voltarem
+ao spill e falharem em todo flush.
+"""
+import json
+import os
+import pathlib
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from mysql.connector import errors
+
+SIGNALS_MSG_COLUMNS = ('message_id', 'chat_id', 'text', 'is_reply', 'reply_to_message_id',
+                       'symbol', 'signal_id', 'created_at', 'message_source')
+SPILL_DIR = os.getenv('SIGNALS_MSG_SPILL_DIR', str(pathlib.Path(__file__).parent / 'data' / 'spill'))
+
+
+class SignalsMessageWriter:
+    def __init__(self, get_connection: Callable, batch_size: int = 100, flush_interval: float = 1.0,
+                 spill_path: str = None):
+        """
+        Args:
+            get_connection: Função que retorna uma conexão MySQL (ex.: db_pool.get_connection)
+            batch_size: Linhas no buffer que disparam um flush imediato
+            flush_interval: Espera máxima (segundos) de uma linha no buffer
+            spill_path: Arquivo local para os lotes que não puderam ser gravados
+        """
+        self._get_connection = get_connection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = pathlib.Path(spill_path or pathlib.Path(SPILL_DIR) / 'signals_msg.jsonl')
+        self._buffer: List[tuple] = []
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread = None
+        self._spill_lock = threading.Lock()
+        self.rows_written = 0
+        self.rows_spilled = 0
+        self.rows_rejected = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def start(self) -> None:
+        """Inicia a thread (e a regravação de spill pendente) sem esperar a primeira mensagem."""
+        with self._cond:
+            self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="signals-msg-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, row: Sequence) -> None:
+        """Enfileira uma linha na ordem de SIGNALS_MSG_COLUMNS. Não bloqueia em I/O."""
+        with self._cond:
+            if self._closing:
+                # Depois do close() não há thread para gravar; vai direto para o spill
+                self._spill([tuple(row)])
+                return
+            self._ensure_started()
+            self._buffer.append(tuple(row))
+            # Primeira linha inicia a contagem do intervalo; lote cheio grava na hora
+            if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self) -> None:
+        # Lotes que ficaram no disco desde a última execução
+        self._replay_spill()
+        while True:
+            with self._cond:
+                if not self._buffer and not self._closing:
+                    self._cond.wait()
+                if self._buffer and len(self._buffer) < self.batch_size and not self._closing:
+                    # Junta mais linhas até o lote encher ou o intervalo vencer
+                    self._cond.wait(self.flush_interval)
+                rows, self._buffer = self._buffer, []
+                closing = self._closing
+            if rows:
+                self._flush(rows)
+            if closing and not rows:
+                return
+
+    def _insert(self, rows: List[tuple]) -> None:
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(f"""
+                INSERT INTO signals_msg ({', '.join(SIGNALS_MSG_COLUMNS)})
+                VALUES ({', '.join(['%s'] * len(SIGNALS_MSG_COLUMNS))})
+            """, rows)
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+    def _write(self, rows: List[tuple]) -> Tuple[List[tuple], Optional[Exception]]:
+        """
+        Grava as linhas no banco; se o lote for recusado pelos dados, tenta linha a linha.
+
+        Returns:
+            (linhas não gravadas por falha de conexão, exceção), ou ([], None) se todas
+            foram gravadas ou rejeitadas
+        """
+        try:
+            self._insert(rows)
+            self.rows_written += len(rows)
+            return [], None
+        except (errors.IntegrityError, errors.DataError) as e:
+            if len(rows) == 1:
+                self._reject(rows, e)
+                return [], None
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ⚠️ Lote de {len(rows)} mensagem(ns) recusado pelo banco, gravando linha a linha: {e}")
+        except Exception as e:
+            return rows, e
+
+        for i, row in enumerate(rows):
+            try:
+                self._insert([row])
+                self.rows_written += 1
+            except (errors.IntegrityError, errors.DataError) as e:
+                self._reject([row], e)
+            except Exception as e:
+                return rows[i:], e
+        return [], None
+
+    def _flush(self, rows: List[tuple]) -> None:
+        remaining, error = self._write(rows)
+        if error is not None:
+            self.flush_errors += 1
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ⚠️ Falha ao gravar {len(remaining)} mensagem(ns), salvando em {self.spill_path.name}: {error}")
+            self._spill(remaining)
+            return
+        self.flushes += 1
+        if self.spill_path.exists() or self.spill_path.with_suffix('.replaying').exists():
+            self._replay_spill()
+
+    def _append_rows(self, path: pathlib.Path, rows: List[tuple]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _spill(self, rows: List[tuple]) -> None:
+        with self._spill_lock:
+            try:
+                self._append_rows(self.spill_path, rows)
+                self.rows_spilled += len(rows)
+            except OSError as e:
+                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ❌ {len(rows)} mensagem(ns) perdida(s), erro ao gravar spill: {e}")
+
+    def _reject(self, rows: List[tuple], error: Exception) -> None:
+        rejected_path = self.spill_path.with_suffix('.rejected')
+        self.rows_rejected += len(rows)
+        try:
+            self._append_rows(rejected_path, rows)
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ❌ {len(rows)} mensagem(ns) recusada(s) pelo banco, movida(s) para {rejected_path.name}: {error}")
+        except OSError as e:
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ❌ {len(rows)} mensagem(ns) recusada(s) pelo banco e perdida(s), erro ao gravar {rejected_path.name}: {e}")
+
+    def _rewrite_replay(self, replay_path: pathlib.Path, rows: List[tuple]) -> None:
+        # Arquivo temporário + fsync + os.replace: uma queda no meio não perde o que falta regravar
+        tmp_path = replay_path.with_suffix('.replaying.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(row, default=str) + '\n' for row in rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, replay_path)
+
+    def _replay_spill(self) -> None:
+        """Regrava no banco as linhas do arquivo de spill; mantém o arquivo se falhar."""
+        # O lock só protege a troca de arquivo: _spill continua anexando em spill_path
+        # enquanto esta thread (a única que mexe em .replaying) grava no banco
+        replay_path = self.spill_path.with_suffix('.replaying')
+        with self._spill_lock:
+            if not replay_path.exists():
+                if not self.spill_path.exists():
+                    return
+                os.replace(self.spill_path, replay_path)
+        try:
+            with open(replay_path, 'r', encoding='utf-8') as f:
+                # Última linha pode estar truncada se o processo morreu no meio da escrita
+                rows = []
+                for line in f:
+                    try:
+                        rows.append(tuple(json.loads(line)))
+                    except ValueError:
+                        pass
+            for start in range(0, len(rows), self.batch_size):
+                remaining, error = self._write(rows[start:start + self.batch_size])
+                # Linhas já gravadas (ou rejeitadas) saem do arquivo, para não duplicar numa nova tentativa
+                self._rewrite_replay(replay_path, remaining + rows[start + self.batch_size:])
+                if error is not None:
+                    print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ⚠️ Spill mantido em disco, banco ainda indisponível: {error}")
+                    return
+            os.remove(replay_path)
+            if rows:
+                print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ✅ {len(rows)} mensagem(ns) do spill processada(s)")
+        except OSError as e:
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SIGNALS_MSG] ⚠️ Erro ao regravar spill, arquivo mantido em disco: {e}")
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Grava o que restar no buffer e encerra a thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self):
+        with self._cond:
+            pending = len(self._buffer)
+        return {
+            "pending": pending,
+            "rows_written": self.rows_written,
+            "rows_spilled": self.rows_spilled,
+            "rows_rejected": self.rows_rejected,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
@@ -0,0 +1,56 @@
+"""
+Linha do tempo da inicialização do divap.py.
+
+Registra o tempo de importação de cada módulo e a duração de cada fase de
+inicialização (relativa ao início do processo), para o relatório exibido
+quando o bot fica ativo.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimeline:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.imports = []  # (módulo, segundos)
+        self.phases = {}   # fase -> [início relativo, duração ou None se em andamento]
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    @contextmanager
+    def importing(self, module_name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.imports.append((module_name, time.perf_counter() - start))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        with self._lock:
+            self.phases[name] = [start - self.t0, None]
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name][1] = time.perf_counter() - start
+
+    def phase_duration(self, name: str):
+        with self._lock:
+            return self.phases.get(name, [None, None])[1]
+
+    def report(self) -> str:
+        with self._lock:
+            lines = [f"⏱️ LINHA DO TEMPO DA INICIALIZAÇÃO (t+{self.elapsed():.2f}s)", "   Importações:"]
+            for module_name, seconds in self.imports:
+                lines.append(f"      {module_name:<28} {seconds * 1000:8.0f} ms")
+            lines.append("   Fases:")
+            for name, (start, duration) in self.phases.items():
+                status = f"{duration:7.2f}s" if duration is not None else "em andamento"
+                lines.append(f"      {name:<28} início t+{start:6.2f}s  {status}")
+        return "\n".join(lines)
@@ -0,0 +1,155 @@
+"""
+Registro em memória dos símbolos e filtros da exchange (exchange_symbols e
+exchange_filters).
+
+Permite validar um símbolo e arredondar preços/quantidades sem consultar o
+banco. Assim como o índice de brackets, uma recarga monta o dicionário novo
+por completo e só então troca a referência, e uma carga que falha só é
+tentada de novo depois de retry_backoff segundos.
+"""
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from typing import Callable, Dict, List, Optional
+
+RETRY_BACKOFF_SECONDS = 60  # Espera entre tentativas de carga após uma falha
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    if value is None or value == '':
+        return None
+    number = Decimal(str(value))
+    return number if number > 0 else None
+
+
+class SymbolInfo:
+    """Status e filtros de negociação de um símbolo."""
+    __slots__ = ("symbol", "status", "price_precision", "quantity_precision", "tick_size", "step_size", "min_notional")
+
+    def __init__(self, symbol: str, status: str, price_precision: Optional[int] = None,
+                 quantity_precision: Optional[int] = None):
+        self.symbol = symbol
+        self.status = status
+        self.price_precision = price_precision
+        self.quantity_precision = quantity_precision
+        self.tick_size: Optional[Decimal] = None
+        self.step_size: Optional[Decimal] = None
+        self.min_notional: Optional[Decimal] = None
+
+    @property
+    def is_trading(self) -> bool:
+        return self.status == 'TRADING'
+
+    def round_price(self, price: float) -> float:
+        """Arredonda para o múltiplo de tick_size mais próximo (sem filtro, usa price_precision)."""
+        if self.tick_size is None:
+            return round(price, self.price_precision) if self.price_precision is not None else price
+        ticks = (Decimal(str(price)) / self.tick_size).to_integral_value(rounding=ROUND_HALF_UP)
+        return float(ticks * self.tick_size)
+
+    def round_quantity(self, quantity: float) -> float:
+        """Trunca para um múltiplo de step_size (nunca arredonda para cima)."""
+        if self.step_size is None:
+            return quantity
+        steps = (Decimal(str(quantity)) / self.step_size).to_integral_value(rounding=ROUND_DOWN)
+        return float(steps * self.step_size)
+
+
+class SymbolRegistry:
+    def __init__(self, loader: Callable[[], List[Dict]], retry_backoff: float = RETRY_BACKOFF_SECONDS):
+        """
+        Args:
+            loader: Função que retorna as linhas de símbolos com seus filtros, com as
+                    chaves symbol, status, price_precision, quantity_precision,
+                    filter_type, tick_size, step_size e min_notional (uma linha por filtro)
+            retry_backoff: Segundos sem nova tentativa de carga após uma falha
+        """
+        self._loader = loader
+        self.retry_backoff = retry_backoff
+        self._symbols: Optional[Dict[str, SymbolInfo]] = None
+        self._refresh_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+
+    def refresh(self) -> bool:
+        """Recarrega o registro inteiro. Mantém o anterior se a carga vier vazia."""
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> bool:
+        try:
+            rows = self._loader()
+        except Exception:
+            self.last_failure_at = time.monotonic()
+            raise
+        if not rows:
+            self.last_failure_at = time.monotonic()
+            print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SYMBOLS] ⚠️ Carga vazia, mantendo registro de símbolos anterior")
+            return False
+        symbols = {}
+        for row in rows:
+            info = symbols.get(row['symbol'])
+            if info is None:
+                info = symbols[row['symbol']] = SymbolInfo(row['symbol'], row['status'],
+                                                           row.get('price_precision'), row.get('quantity_precision'))
+            filter_type = row.get('filter_type')
+            if filter_type == 'PRICE_FILTER':
+                info.tick_size = _to_decimal(row.get('tick_size'))
+            elif filter_type == 'LOT_SIZE':
+                info.step_size = _to_decimal(row.get('step_size'))
+            elif filter_type == 'MIN_NOTIONAL':
+                info.min_notional = _to_decimal(row.get('min_notional'))
+        self._symbols = symbols
+        self.loaded_at = time.time()
+        self.last_failure_at = None
+        return True
+
+    def _retry_due(self) -> bool:
+        return self.last_failure_at is None or time.monotonic() - self.last_failure_at >= self.retry_backoff
+
+    def _ensure_loaded(self) -> Dict[str, SymbolInfo]:
+        symbols = self._symbols
+        if symbols is None and self._retry_due():
+            # Sem esperar: se outra thread já está carregando, responde vazio
+            if self._refresh_lock.acquire(blocking=False):
+                try:
+                    if self._symbols is None and self._retry_due():
+                        self._refresh_locked()
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%d-%m-%Y | %H:%M:%S')}] [SYMBOLS] ⚠️ Falha ao carregar registro de símbolos, nova tentativa em {self.retry_backoff:.0f}s: {e}")
+                finally:
+                    self._refresh_lock.release()
+            symbols = self._symbols
+        return symbols or {}
+
+    def get(self, symbol: str) -> Optional[SymbolInfo]:
+        return self._ensure_loaded().get(symbol)
+
+    def status(self, symbol: str) -> Optional[str]:
+        info = self.get(symbol)
+        return info.status if info else None
+
+    def is_trading(self, symbol: str) -> bool:
+        info = self.get(symbol)
+        return info is not None and info.is_trading
+
+    def tick_size(self, symbol: str) -> Optional[Decimal]:
+        info = self.get(symbol)
+        return info.tick_size if info else None
+
+    def step_size(self, symbol: str) -> Optional[Decimal]:
+        info = self.get(symbol)
+        return info.step_size if info else None
+
+    def min_notional(self, symbol: str) -> Optional[Decimal]:
+        info = self.get(symbol)
+        return info.min_notional if info else None
+
+    def round_price(self, symbol: str, price: float) -> float:
+        """Preço arredondado ao tick do símbolo (inalterado se o símbolo não é conhecido)."""
+        info = self.get(symbol)
+        return info.round_price(price) if info else price
+
+    def __len__(self) -> int:
+        return len(self._symbols) if self._symbols else 0
@@ -0,0 +1,155 @@
+"""
+Equivalência entre os cálculos vetorizados do divap_check e os laços originais.
+
+Uso (a partir de backend/indicators):
+    python -m pytest -q tests
+"""
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / 'analysis'))
+
+pytest.importorskip("ccxt")
+pytest.importorskip("vectorbt")
+
+import divap_check  # noqa: E402
+
+SEEDS = range(20)
+
+
+def random_ohlc(seed: int, size: int = 300) -> pd.DataFrame:
+    """Candles aleatórios com preços arredondados, para provocar empates nas comparações."""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, size)), 1)
+    open_ = np.round(close + rng.normal(0, 1, size), 1)
+    # Alguns candles sem corpo (open == close)
+    flat = rng.random(size) < 0.05
+    open_[flat] = close[flat]
+    high = np.maximum(open_, close) + np.round(rng.exponential(0.5, size), 1)
+    low = np.minimum(open_, close) - np.round(rng.exponential(0.5, size), 1)
+    volume = np.round(rng.exponential(1000, size))
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume})
+
+
+def loop_engulfing(df: pd.DataFrame):
+    """Laço original de detect_candlestick_patterns."""
+    bull_engulfing = pd.Series(False, index=df.index)
+    bear_engulfing = pd.Series(False, index=df.index)
+
+    for i in range(1, len(df)):
+        prev = df.iloc[i-1]
+        curr = df.iloc[i]
+        if (prev['close'] < prev['open'] and curr['close'] > curr['open'] and
+            curr['open'] <= prev['close'] and curr['close'] >= prev['open']):
+            bull_engulfing.iloc[i] = True
+
+        if (prev['close'] > prev['open'] and curr['close'] < curr['open'] and
+            curr['open'] >= prev['close'] and curr['close'] <= prev['open']):
+            bear_engulfing.iloc[i] = True
+
+    return bull_engulfing, bear_engulfing
+
+
+@pytest.fixture
+def analyzer():
+    return divap_check.DIVAPAnalyzer({}, {})
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_engulfing_matches_loop(analyzer, seed):
+    df = random_ohlc(seed)
+    expected_bull, expected_bear = loop_engulfing(df)
+
+    result = analyzer.detect_candlestick_patterns(df.copy())
+
+    assert result['bull_engulfing'].dtype == bool
+    np.testing.assert_array_equal(result['bull_engulfing'].to_numpy(), expected_bull.to_numpy())
+    np.testing.assert_array_equal(result['bear_engulfing'].to_numpy(), expected_bear.to_numpy())
+
+
+@pytest.mark.parametrize("size", [0, 1, 2])
+def test_engulfing_short_frames(analyzer, size):
+    df = random_ohlc(0, size)
+    result = analyzer.detect_candlestick_patterns(df.copy())
+    expected_bull, expected_bear = loop_engulfing(df)
+    np.testing.assert_array_equal(result['bull_engulfing'].to_numpy(), expected_bull.to_numpy())
+    np.testing.assert_array_equal(result['bear_engulfing'].to_numpy(), expected_bear.to_numpy())
+
+
+def loop_divergences(df: pd.DataFrame):
+    """Laço original de calculate_indicators (pivôs e divergências), com as séries de pivô."""
+    columns = {name: pd.Series(np.nan, index=df.index) for name in (
+        'last_low_pivot_price', 'last_low_pivot_rsi', 'second_last_low_pivot_price', 'second_last_low_pivot_rsi',
+        'last_high_pivot_price', 'last_high_pivot_rsi', 'second_last_high_pivot_price', 'second_last_high_pivot_rsi')}
+    bull_div = pd.Series(False, index=df.index)
+    bear_div = pd.Series(False, index=df.index)
+
+    last_low_pivot_price, last_low_pivot_rsi = np.nan, np.nan
+    second_last_low_pivot_price, second_last_low_pivot_rsi = np.nan, np.nan
+    last_high_pivot_price, last_high_pivot_rsi = np.nan, np.nan
+    second_last_high_pivot_price, second_last_high_pivot_rsi = np.nan, np.nan
+
+    for i in range(len(df)):
+        if df["pivot_low"].iloc[i]:
+            second_last_low_pivot_price, second_last_low_pivot_rsi = last_low_pivot_price, last_low_pivot_rsi
+            last_low_pivot_price, last_low_pivot_rsi = df["low"].iloc[i], df["RSI"].iloc[i]
+
+        if df["pivot_high"].iloc[i]:
+            second_last_high_pivot_price, second_last_high_pivot_rsi = last_high_pivot_price, last_high_pivot_rsi
+            last_high_pivot_price, last_high_pivot_rsi = df["high"].iloc[i], df["RSI"].iloc[i]
+
+        for name, value in (('last_low_pivot_price', last_low_pivot_price), ('last_low_pivot_rsi', last_low_pivot_rsi),
+                            ('second_last_low_pivot_price', second_last_low_pivot_price),
+                            ('second_last_low_pivot_rsi', second_last_low_pivot_rsi),
+                            ('last_high_pivot_price', last_high_pivot_price), ('last_high_pivot_rsi', last_high_pivot_rsi),
+                            ('second_last_high_pivot_price', second_last_high_pivot_price),
+                            ('second_last_high_pivot_rsi', second_last_high_pivot_rsi)):
+            columns[name].iloc[i] = value
+
+        if not pd.isna(last_low_pivot_price) and not pd.isna(second_last_low_pivot_price):
+            if (last_low_pivot_price < second_last_low_pivot_price and
+                last_low_pivot_rsi > second_last_low_pivot_rsi):
+                bull_div.iloc[i] = True
+
+        if not pd.isna(last_high_pivot_price) and not pd.isna(second_last_high_pivot_price):
+            if (last_high_pivot_price > second_last_high_pivot_price and
+                last_high_pivot_rsi < second_last_high_pivot_rsi):
+                bear_div.iloc[i] = True
+
+    return columns, bull_div, bear_div
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_indicators_match_loop(analyzer, seed):
+    result = analyzer.calculate_indicators(random_ohlc(seed))
+    columns, expected_bull, expected_bear = loop_divergences(result)
+
+    for name, expected in columns.items():
+        np.testing.assert_array_equal(result[name].to_numpy(), expected.to_numpy(), err_msg=name)
+    np.testing.assert_array_equal(result['bull_div'].to_numpy(), expected_bull.to_numpy())
+    np.testing.assert_array_equal(result['bear_div'].to_numpy(), expected_bear.to_numpy())
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_last_two_pivots_random_masks(seed):
+    rng = np.random.default_rng(seed)
+    size = int(rng.integers(0, 200))
+    mask = rng.random(size) < rng.uniform(0, 0.5)
+    price = rng.normal(100, 5, size)
+    rsi = rng.uniform(0, 100, size)
+    rsi[rng.random(size) < 0.1] = np.nan  # RSI ainda sem valor no início da série
+
+    last_price, last_rsi, second_price, second_rsi = divap_check.last_two_pivots(mask, price, rsi)
+
+    expected = np.full((4, size), np.nan)
+    last, second = (np.nan, np.nan), (np.nan, np.nan)
+    for i in range(size):
+        if mask[i]:
+            second, last = last, (price[i], rsi[i])
+        expected[:, i] = (last[0], last[1], second[0], second[1])
+
+    np.testing.assert_array_equal(np.vstack([last_price, last_rsi, second_price, second_rsi]), expected)
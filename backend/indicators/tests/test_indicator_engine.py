@@ -0,0 +1,166 @@
+"""
+Equivalência entre o estado incremental (indicator_engine) e calculate_indicators,
+com o estado avançado candle a candle, após gaps e no caminho de catch-up.
+
+Uso (a partir de backend/indicators):
+    python -m pytest -q tests
+"""
+import pathlib
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / 'analysis'))
+
+pytest.importorskip("ccxt")
+pytest.importorskip("vectorbt")
+
+import divap_check  # noqa: E402
+from test_divap_check import random_ohlc  # noqa: E402
+
+SEEDS = range(10)
+SYMBOL = "BTCUSDT"
+TIMEFRAME = "15m"
+TF_MINUTES = 15
+
+FLOAT_COLUMNS = ("RSI", "VolSMA")
+BOOL_COLUMNS = ("high_volume", "pivot_low", "pivot_high", "bull_div", "bear_div")
+
+
+def ohlc_frame(seed: int, size: int = 300) -> pd.DataFrame:
+    df = random_ohlc(seed, size)
+    df.index = pd.date_range("2025-01-01", periods=size, freq=f"{TF_MINUTES}min")
+    return df
+
+
+def feed(engine, df: pd.DataFrame) -> pd.DataFrame:
+    """Entrega os candles um a um e junta os snapshots retornados."""
+    snapshots = [engine.update(SYMBOL, TIMEFRAME, TF_MINUTES, row.Index.to_pydatetime(),
+                               row.open, row.high, row.low, row.close, row.volume)
+                 for row in df.itertuples()]
+    return pd.DataFrame(snapshots, index=df.index)
+
+
+def assert_same_indicators(actual: pd.DataFrame, expected: pd.DataFrame):
+    for name in FLOAT_COLUMNS:
+        np.testing.assert_allclose(actual[name].to_numpy(dtype=float), expected[name].to_numpy(dtype=float),
+                                   rtol=1e-9, equal_nan=True, err_msg=name)
+    for name in BOOL_COLUMNS:
+        np.testing.assert_array_equal(actual[name].to_numpy(dtype=bool), expected[name].to_numpy(dtype=bool),
+                                      err_msg=name)
+
+
+def warm_mask(state, index) -> np.ndarray:
+    return np.array([state.is_warm(ts.to_pydatetime()) for ts in index])
+
+
+@pytest.fixture
+def analyzer():
+    return divap_check.DIVAPAnalyzer({}, {})
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_catch_up_matches_full_window(analyzer, seed):
+    df = ohlc_frame(seed)
+    expected = analyzer.calculate_indicators(df.copy())
+    engine = analyzer.indicator_engine
+
+    engine.seed(SYMBOL, TIMEFRAME, TF_MINUTES, df.iloc[:100])
+    snapshots = feed(engine, df.iloc[100:])
+
+    assert_same_indicators(snapshots, expected.iloc[100:])
+    assert warm_mask(engine.get_state(SYMBOL, TIMEFRAME), snapshots.index[-5:]).all()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_gap_restarts_state(analyzer, seed):
+    df = ohlc_frame(seed)
+    engine = analyzer.indicator_engine
+
+    engine.seed(SYMBOL, TIMEFRAME, TF_MINUTES, df.iloc[:100])
+    snapshots = feed(engine, df.iloc[110:])
+
+    # Depois do gap o estado recomeça: igual a calculate_indicators a partir do gap
+    after_gap = analyzer.calculate_indicators(df.iloc[110:].copy())
+    assert_same_indicators(snapshots, after_gap)
+
+    # Os candles marcados como aquecidos não dependem mais do início: iguais à janela completa
+    state = engine.get_state(SYMBOL, TIMEFRAME)
+    full = analyzer.calculate_indicators(df.copy())
+    tail = snapshots.iloc[-10:]
+    warm = warm_mask(state, tail.index)
+    assert warm.all()
+    assert_same_indicators(tail, full.loc[tail.index])
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_warm_snapshots_match_full_window(analyzer, seed):
+    df = ohlc_frame(seed, 120)
+    engine = divap_check.IndicatorEngine(divap_check.RSI_PERIODS, divap_check.VOLUME_SMA_PERIODS,
+                                         divap_check.PIVOT_LEFT, history_size=len(df))
+    snapshots = feed(engine, df.iloc[40:])
+    warm = warm_mask(engine.get_state(SYMBOL, TIMEFRAME), snapshots.index)
+
+    # Frio no início do estado, aquecido antes do fim
+    assert not warm[:divap_check.RSI_PERIODS].any()
+    assert warm[-1]
+    full = analyzer.calculate_indicators(df.copy())
+    assert_same_indicators(snapshots[warm], full.loc[snapshots.index[warm]])
+
+
+def test_cold_state_after_gap_uses_full_window(analyzer):
+    df = ohlc_frame(0)
+    engine = analyzer.indicator_engine
+    timeframe = analyzer._normalize_timeframe(TIMEFRAME)
+
+    engine.seed(SYMBOL, timeframe, TF_MINUTES, df.iloc[:100])
+    candle_times = [ts.to_pydatetime() for ts in df.index[99:96:-1]]
+    assert analyzer._get_candles_from_indicator_state(SYMBOL, TIMEFRAME, TF_MINUTES, candle_times) is not None
+
+    # O catch-up recebe candles com um buraco no meio: o estado recomeça frio
+    fetched = pd.concat([df.iloc[100:103], df.iloc[105:110]])
+    analyzer.fetch_ohlcv_data = lambda *args, **kwargs: fetched
+    candle_times = [ts.to_pydatetime() for ts in df.index[109:106:-1]]
+    assert analyzer._get_candles_from_indicator_state(SYMBOL, TIMEFRAME, TF_MINUTES, candle_times) is None
+    assert engine.get_state(SYMBOL, timeframe).last_open_time == df.index[109]
+
+
+def test_concurrent_seeds_publish_whole_states(analyzer):
+    df = ohlc_frame(1)
+    engine = analyzer.indicator_engine
+    shorter, longer = df.iloc[:150], df.iloc[20:200]
+    barrier = threading.Barrier(3)
+    seen = []
+
+    def seed(frame):
+        barrier.wait()
+        engine.seed(SYMBOL, TIMEFRAME, TF_MINUTES, frame)
+
+    def watch():
+        barrier.wait()
+        for _ in range(2000):
+            state = engine.get_state(SYMBOL, TIMEFRAME)
+            if state is not None:
+                seen.append(state.last_open_time)
+
+    for _ in range(5):
+        engine.reset(SYMBOL, TIMEFRAME)
+        seen.clear()
+        threads = [threading.Thread(target=seed, args=(frame,)) for frame in (shorter, longer)]
+        threads.append(threading.Thread(target=watch))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Só estados completos aparecem, e o mais adiantado vence
+        assert set(seen) <= {shorter.index[-1], longer.index[-1]}
+        state = engine.get_state(SYMBOL, TIMEFRAME)
+        assert state.last_open_time == longer.index[-1]
+        expected = analyzer.calculate_indicators(longer.copy())
+        snapshots = pd.DataFrame([state.get(ts.to_pydatetime()) for ts in longer.index[-10:]],
+                                 index=longer.index[-10:])
+        assert_same_indicators(snapshots, expected.iloc[-10:])
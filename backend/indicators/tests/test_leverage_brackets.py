@@ -0,0 +1,116 @@
+"""
+Equivalência entre a busca por bisect do BracketTable e o laço original de
+calculate_ideal_leverage, nos valores de ordem comuns e colados aos extremos.
+
+Uso (a partir de backend/indicators):
+    python -m pytest -q tests
+"""
+import importlib
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+
+from leverage_brackets import BREAKPOINT_REL_TOL, BracketTable  # noqa: E402
+
+SEEDS = range(30)
+
+
+def loop_max_leverage(brackets, order_value: float) -> int:
+    """Laço original de calculate_ideal_leverage; 0 quando nenhum bracket é elegível."""
+    bracket_leverage_limits = []
+    for bracket in brackets:
+        if "initialLeverage" not in bracket:
+            continue
+        bracket_leverage = int(bracket.get("initialLeverage", 1))
+        notional_floor = float(bracket.get("notionalFloor", 0))
+        notional_cap = float(bracket.get("notionalCap", float('inf')))
+        position_value = order_value * bracket_leverage
+        if position_value >= notional_floor and (notional_cap == float('inf') or position_value < notional_cap):
+            bracket_leverage_limits.append(bracket_leverage)
+    return max(bracket_leverage_limits, default=0)
+
+
+def random_brackets(rng):
+    """Brackets como os da Binance (contíguos, alavancagem decrescente), às vezes com buracos e sobreposições."""
+    count = int(rng.integers(1, 10))
+    leverages = sorted(rng.choice([1, 2, 3, 4, 5, 8, 10, 12, 15, 20, 25, 50, 75, 100, 125], count, replace=False),
+                       reverse=True)
+    caps = np.cumsum(np.round(rng.choice([5_000, 10_000, 25_000, 50_000, 250_000, 1_000_000], count)))
+    brackets = []
+    floor = 0.0
+    for i, (lev, cap) in enumerate(zip(leverages, caps)):
+        bracket = {"bracket": i + 1, "initialLeverage": int(lev), "notionalFloor": floor, "notionalCap": float(cap)}
+        if rng.random() < 0.15:
+            # Buraco ou sobreposição com o bracket anterior
+            bracket["notionalFloor"] = float(floor * rng.choice([0.5, 1.5]))
+        brackets.append(bracket)
+        floor = float(cap)
+    if rng.random() < 0.3:
+        del brackets[-1]["notionalCap"]  # último bracket sem teto
+    if rng.random() < 0.1:
+        brackets.append({"bracket": 0})  # linha sem initialLeverage é ignorada
+    return brackets
+
+
+def order_values(rng, brackets):
+    """Valores aleatórios, exatamente em cada extremo, a BREAKPOINT_REL_TOL dele e fora de todos os brackets."""
+    edges = []
+    for b in brackets:
+        if "initialLeverage" not in b:
+            continue
+        lev = b["initialLeverage"]
+        edges.append(b["notionalFloor"] / lev)
+        if "notionalCap" in b:
+            edges.append(b["notionalCap"] / lev)
+    edges = np.array(edges)
+    near = np.concatenate([edges * (1 + f * BREAKPOINT_REL_TOL) for f in (-2, -1, -0.5, 0.5, 1, 2)])
+    outside = [0.0, -1.0, edges.max() * 10, edges.max() * 1e6]
+    values = np.exp(rng.uniform(np.log(1), np.log(1e7), 500))
+    return np.concatenate([values, edges, near, outside])
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_table_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    brackets = random_brackets(rng)
+    values = order_values(rng, brackets)
+    table = BracketTable(brackets)
+
+    expected = np.array([loop_max_leverage(brackets, float(v)) for v in values])
+    scalar = np.array([table.max_leverage(float(v)) for v in values])
+    batch = table.max_leverage_batch(values)
+
+    np.testing.assert_array_equal(scalar, expected)
+    np.testing.assert_array_equal(batch, expected)
+
+
+def test_outside_all_brackets_is_zero():
+    brackets = [
+        {"initialLeverage": 20, "notionalFloor": 0.0, "notionalCap": 10_000.0},
+        {"initialLeverage": 10, "notionalFloor": 10_000.0, "notionalCap": 50_000.0},
+    ]
+    table = BracketTable(brackets)
+    # Elegível em [0, 500) com 20x e em [1000, 5000) com 10x; 500 fica no buraco entre os dois
+    for value, expected in ((100.0, 20), (500.0, 0), (999.0, 0), (1_000.0, 10), (5_000.0, 0), (1e9, 0)):
+        assert loop_max_leverage(brackets, value) == expected
+        assert table.max_leverage(value) == expected
+    assert list(table.max_leverage_batch([100.0, 500.0, 1_000.0, 5_000.0])) == [20, 0, 10, 0]
+
+
+@pytest.mark.parametrize("max_leverage, stop_loss, expected", [
+    (0, 98.0, 20),    # nenhum bracket elegível: conservadora, min(20, alvo de 50x)
+    (0, 90.0, 10),    # conservadora limitada pelo alvo de 10x
+    (25, 98.0, 25),   # bracket elegível limita o alvo
+])
+def test_calculate_ideal_leverage_without_eligible_bracket(monkeypatch, max_leverage, stop_loss, expected):
+    pytest.importorskip("telethon")
+    divap = importlib.import_module("divap")
+    monkeypatch.setattr(divap, "get_account_base_balance", lambda: 1000.0)
+    monkeypatch.setattr(divap.leverage_bracket_index, "max_leverage", lambda symbol, order_value: max_leverage)
+
+    leverage, _ = divap.calculate_ideal_leverage("BTCUSDT", 100.0, stop_loss, 5, "COMPRA")
+    assert leverage == expected
@@ -3,11 +3,15 @@ from telethon import TelegramClient
 from datetime import datetime
 from senhas import api_hash, api_id, Bearer_Token
 import asyncio
+import concurrent.futures
 import os
+import threading
 import mysql.connector
+from mysql.connector import pooling
 from urllib.parse import urlencode
 from dotenv import load_dotenv
 import pathlib
+from leverage_brackets import LeverageBracketIndex
 
 # Carregar variáveis de ambiente do arquivo .env na raiz do projeto
 env_path = pathlib.Path(__file__).parents[2] / 'config' / '.env'
@@ -32,9 +36,36 @@ stoploss_group_id = 4263252665
 # Cliente Telegram
 client = TelegramClient('divap', api_id, api_hash)
 
-# Cache para armazenar os resultados das chamadas à API
-leverage_brackets_cache = {}
-cache_expiry = {}  # Para controlar quanto tempo manter os dados em cache
+# Pool de conexões MySQL: as consultas rodam em threads (db_executor) para não
+# bloquear o event loop do Quart, reaproveitando conexões já abertas
+DB_POOL_SIZE = int(os.getenv('WEBHOOK_DB_POOL_SIZE', '5'))
+BRACKETS_REFRESH_SECONDS = 1800  # Recarga periódica do cache de brackets
+BRACKETS_RETRY_SECONDS = 30  # Nova tentativa enquanto o cache de brackets estiver vazio
+
+db_pool = None
+db_pool_lock = threading.Lock()
+db_executor = concurrent.futures.ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="webhook-db")
+
+def get_db_pool():
+    """Cria o pool de conexões na primeira chamada"""
+    global db_pool
+    with db_pool_lock:
+        if db_pool is None:
+            db_pool = pooling.MySQLConnectionPool(
+                pool_name="webhook",
+                pool_size=DB_POOL_SIZE,
+                host=DB_HOST,
+                port=int(DB_PORT) if DB_PORT else 3306,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                database=DB_NAME
+            )
+        return db_pool
+
+async def run_db(func, *args):
+    """Executa uma função de banco de dados em uma thread do db_executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, func, *args)
 
 # Normaliza números no formato string (ex.: "1.234,56" -> "1234.56")
 def normalize_number(value):
@@ -81,14 +112,8 @@ def get_leverage_brackets_from_database(symbol=None):
         dict: Dicionário com os brackets de alavancagem por símbolo
     """
     try:
-        # Configurar conexão MySQL usando variáveis do .env
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            port=int(DB_PORT),
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
+        # Conexão do pool (devolvida ao pool em conn.close())
+        conn = get_db_pool().get_connection()
         cursor = conn.cursor(dictionary=True)
         
         # Preparar a consulta SQL
@@ -158,9 +183,14 @@ def get_leverage_brackets_from_database(symbol=None):
             cursor.close()
             conn.close()
 
+# Cache de brackets compartilhado pelas requisições: carregado na inicialização
+# e recarregado a cada BRACKETS_REFRESH_SECONDS por refresh_brackets_periodically().
+# As consultas nunca carregam (lazy_load=False): o loop do Quart não espera pelo banco
+leverage_bracket_index = LeverageBracketIndex(get_leverage_brackets_from_database, lazy_load=False)
+
 def load_leverage_brackets(symbol=None):
     """
-    Carrega os brackets de alavancagem do banco de dados MySQL
+    Carrega os brackets de alavancagem do cache em memória
     
     Args:
         symbol (str, optional): Símbolo específico para buscar
@@ -168,28 +198,20 @@ def load_leverage_brackets(symbol=None):
     Returns:
         dict: Dicionário com os brackets de alavancagem por símbolo
     """
-    # Chama a função que busca do banco de dados
-    brackets_data = get_leverage_brackets_from_database(symbol)
-    
-    # Se foi solicitado um símbolo específico e ele não existir nos dados
-    if symbol and symbol not in brackets_data:
-        # Tenta limpar o símbolo (remover .P se presente)
-        cleaned_symbol = clean_symbol(symbol)
-        if cleaned_symbol != symbol and cleaned_symbol in brackets_data:
-            return {symbol: brackets_data[cleaned_symbol]}
-        
-        # Tenta encontrar um símbolo base (ex: BTCUSDT de BTCUSDT_210625)
-        base_symbol = symbol.split('_')[0]
-        if base_symbol != symbol and base_symbol in brackets_data:
-            print(f"[INFO] Usando brackets de {base_symbol} para {symbol}")
-            return {symbol: brackets_data[base_symbol]}
-        
-        # Se for um par com USDT e BTCUSDT existir nos dados
-        if "USDT" in symbol and "BTCUSDT" in brackets_data:
-            print(f"[INFO] Usando brackets de BTCUSDT como referência para {symbol}")
-            return {symbol: brackets_data["BTCUSDT"]}
-    
-    return brackets_data
+    if symbol:
+        symbol_brackets = leverage_bracket_index.get(symbol)
+        return {symbol: symbol_brackets} if symbol_brackets else {}
+    return leverage_bracket_index.get_all()
+
+async def refresh_brackets_periodically():
+    """Recarrega o cache de brackets periodicamente (o atualizador roda em outro processo)"""
+    while True:
+        # Enquanto a carga não deu certo, tenta de novo em intervalos curtos
+        await asyncio.sleep(BRACKETS_REFRESH_SECONDS if len(leverage_bracket_index) else BRACKETS_RETRY_SECONDS)
+        try:
+            await run_db(leverage_bracket_index.refresh)
+        except Exception as e:
+            print(f"[AVISO] Falha ao recarregar cache de brackets: {e}")
 
 # Calcula a alavancagem ideal para margem cruzada
 def calculate_ideal_leverage(symbol, entry_price, stop_loss, capital_percent, side_raw=None):
@@ -221,25 +243,8 @@ def calculate_ideal_leverage(symbol, entry_price, stop_loss, capital_percent, si
     
     # Buscar os brackets específicos para este símbolo apenas para conhecer a alavancagem máxima
     try:
-        leverage_brackets = load_leverage_brackets(cleaned_symbol)
-        
-        # Obter os brackets para o símbolo
-        symbol_brackets = []
-        if cleaned_symbol in leverage_brackets:
-            symbol_brackets = leverage_brackets[cleaned_symbol]
-        
-        # Se não encontrar brackets, tenta com outros métodos
-        if not symbol_brackets:
-            # Busca todos os brackets
-            all_brackets = load_leverage_brackets()
-            
-            # Tenta com símbolo base
-            base_symbol = cleaned_symbol.split('_')[0]
-            if base_symbol in all_brackets:
-                symbol_brackets = all_brackets[base_symbol]
-            # Ou com BTCUSDT como fallback
-            elif "BTCUSDT" in all_brackets:
-                symbol_brackets = all_brackets["BTCUSDT"]
+        # Cache em memória (com os substitutos: símbolo base ou BTCUSDT)
+        symbol_brackets = leverage_bracket_index.get(cleaned_symbol)
         
         # Encontrar a alavancagem máxima permitida para este símbolo
         max_leverage = 1  # Inicializar com valor mínimo em vez de valor máximo
@@ -270,14 +275,8 @@ def save_to_database(trade_data):
         trade_data (dict): Dicionário com informações da operação
     """
     try:
-        # Configurar conexão MySQL usando variáveis do .env
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
+        # Conexão do pool (devolvida ao pool em conn.close())
+        conn = get_db_pool().get_connection()
         cursor = conn.cursor()
         
         # Inserir na tabela webhook_signals
@@ -392,7 +391,7 @@ async def webhook():
             "stop_loss": stop_loss,
             "chat_id": entry_group_id
         }
-        save_to_database(trade_data)
+        await run_db(save_to_database, trade_data)
 
     elif message_type.startswith('update') or message_type.startswith('stop_update'):
         text = (
@@ -410,6 +409,11 @@ async def webhook():
     return jsonify({'status': 'success', 'id': trade_id, 'message_type': message_type}), 200
 
 async def main():
+    # Abre o pool e carrega os brackets antes de aceitar requisições
+    await run_db(get_db_pool)
+    await run_db(leverage_bracket_index.refresh)
+    asyncio.create_task(refresh_brackets_periodically())
+
     await client.start()
     await app.run_task(host='0.0.0.0', port=5050)
 
@@ -9,6 +9,17 @@ import plotly.graph_objects as go
 import requests
 import datetime
 from vectorbt.indicators.basic import MA, RSI
+import os
+import sys
+from pathlib import Path
+
+# Armazenamento local de candles compartilhado com o analisador DIVAP
+sys.path.append(str(Path(__file__).parents[3] / 'backend' / 'indicators' / 'analysis'))
+try:
+    from candle_store import CandleStore
+    candle_store = CandleStore(os.getenv('CANDLE_STORE_DIR', str(Path(__file__).parents[3] / 'backend' / 'indicators' / 'data' / 'candles')))
+except ImportError:
+    candle_store = None
 
 # Contador global para gerar chaves únicas
 key_counter = 0
@@ -77,6 +88,21 @@ def fetch_ohlcv(exchange, symbol, timeframe, since, until):
     since_ts = int(datetime.datetime.combine(since, datetime.time.min).timestamp() * 1000)
     until_ts = int(datetime.datetime.combine(until, datetime.time.max).timestamp() * 1000)
 
+    # Com o armazenamento local, apenas o trecho ainda não baixado é buscado na exchange
+    if candle_store is not None:
+        try:
+            candles = candle_store.get_candles(exchange, symbol, timeframe, since_ts, until_ts + 1)
+        except Exception as e:
+            st.error(f"Erro ao buscar dados: {e}")
+            return pd.DataFrame()
+        if len(candles) == 0:
+            st.error(f"Nenhum dado encontrado para {symbol} no período selecionado.")
+            return pd.DataFrame()
+        df = pd.DataFrame(candles[:, 1:], columns=["open", "high", "low", "close", "volume"],
+                          index=pd.to_datetime(candles[:, 0].astype("int64"), unit="ms"))
+        df.index.name = "timestamp"
+        return df
+
     # Inicializar lista vazia para armazenar os candles
     all_candles = []
 